@@ -0,0 +1,377 @@
+"""
+Load test for the API Gateway Cloud Functions (create_task, list_tasks,
+static_pages).
+
+Calls each function's `handler(event, context)` with API Gateway-shaped
+events at a configurable concurrency, against the in-memory YDB stand-in
+seeded with N tasks, an in-memory Message Queue stand-in and a local Disk
+API that answers create_task's metadata probe. Real boto3 is used for S3
+presigning (local computation).
+
+For every function, table size and concurrency it reports p50/p95/p99
+latency, throughput, tracemalloc peak allocation per request and the peak
+RSS of the worker processes, then suggests a Cloud Function memory tier.
+
+Concurrency runs in separate processes (`--mode process`, the default):
+one Cloud Function instance serves one request at a time, so processes
+model instances better than threads sharing a GIL. Each process holds its
+own copy of the seeded table.
+
+Usage:
+    python benchmarks/bench_functions.py --sizes 1000 100000 1000000 --concurrency 1 4 16
+"""
+import argparse
+import base64
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FUNCTIONS_DIR = os.path.join(BENCH_DIR, "..", "python_functions")
+sys.path.insert(0, BENCH_DIR)
+
+from standins.http_services import DiskService
+
+FUNCTIONS = ("create_task", "list_tasks", "static_pages")
+MEMORY_TIERS_MB = (128, 256, 512, 1024, 2048, 4096)
+
+ENV = {
+    "YDB_ENDPOINT": "grpc://localhost:2136",
+    "YDB_DATABASE": "/local",
+    "MQ_QUEUE_URL": "https://message-queue.api.cloud.yandex.net/b1g/dj6/bench-tasks-queue",
+    "MQ_ENDPOINT": "https://message-queue.api.cloud.yandex.net",
+    "S3_BUCKET": "bench-bucket",
+    "S3_ENDPOINT": "https://storage.yandexcloud.net",
+    "AWS_REGION": "ru-central1",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+}
+
+
+def api_gateway_event(method: str, path: str, body: str = "", content_type: str = "", base64_body: bool = False) -> dict:
+    headers = {
+        "Accept": "text/html,application/json",
+        "Host": "d5d0000000000000.apigw.yandexcloud.net",
+        "User-Agent": "bench-functions/1.0",
+        "X-Forwarded-For": "198.51.100.10",
+        "X-Real-Remote-Address": "[198.51.100.10]:51234",
+        "X-Request-Id": str(uuid.uuid4()),
+    }
+    if content_type:
+        headers["Content-Type"] = content_type
+    if base64_body:
+        body = base64.b64encode(body.encode("utf-8")).decode("ascii")
+    return {
+        "httpMethod": method,
+        "headers": headers,
+        "multiValueHeaders": {k: [v] for k, v in headers.items()},
+        "queryStringParameters": {},
+        "multiValueQueryStringParameters": {},
+        "requestContext": {
+            "identity": {"sourceIp": "198.51.100.10", "userAgent": "bench-functions/1.0"},
+            "httpMethod": method,
+            "requestId": headers["X-Request-Id"],
+            "requestTime": datetime.now(timezone.utc).strftime("%d/%b/%Y:%H:%M:%S +0000"),
+            "requestTimeEpoch": int(time.time()),
+        },
+        "path": path,
+        "url": path,
+        "params": {},
+        "pathParams": {},
+        "body": body,
+        "isBase64Encoded": base64_body,
+    }
+
+
+def make_event(function: str, n: int) -> dict:
+    if function == "create_task":
+        form = urlencode({"title": f"Лекция {n}", "video_link": f"https://disk.yandex.ru/i/video{n}"})
+        return api_gateway_event("POST", "/tasks", form, "application/x-www-form-urlencoded", base64_body=True)
+    if function == "list_tasks":
+        return api_gateway_event("GET", "/api/tasks")
+    return api_gateway_event("GET", "/tasks" if n % 2 else "/")
+
+
+class Context:
+    def __init__(self):
+        self.request_id = str(uuid.uuid4())
+        self.function_name = "bench"
+        self.memory_limit_in_mb = 256
+
+
+def load_function(name: str):
+    spec = importlib.util.spec_from_file_location(f"fn_{name}", os.path.join(FUNCTIONS_DIR, name, "index.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def seed_tasks(db, size: int) -> None:
+    table = db.create_table("tasks", ["task_id"])
+    statuses = ["completed"] * 7 + ["error", "queued", "processing"]
+    started = datetime.now(timezone.utc) - timedelta(days=365)
+    rng = random.Random(size)
+    for i in range(size):
+        task_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        status = statuses[i % len(statuses)]
+        created_at = (started + timedelta(seconds=i * 30)).isoformat()
+        row = {
+            "task_id": task_id,
+            "title": f"Лекция {i}: алгоритмы и структуры данных",
+            "video_link": f"https://disk.yandex.ru/i/{task_id[:12]}",
+            "status": status,
+            "created_at": created_at,
+            "updated_at": created_at,
+            "error_message": "Transcription failed: timeout" if status == "error" else None,
+            "pdf_key": None,
+            "summary_key": f"summaries/{task_id}.md" if status == "completed" else None,
+            "summary_sha256": None,
+        }
+        if status == "completed" and i % 3 == 0:
+            # Tasks completed before lazy rendering keep a presigned PDF link
+            row["summary_key"] = None
+            row["pdf_key"] = f"pdfs/{task_id}.pdf"
+        table.rows[(task_id,)] = row
+
+
+def prepare_process(config: dict) -> dict:
+    """Install stand-ins, seed the table and load the handler in the current process."""
+    os.environ.update(ENV)
+    os.environ["DISK_API_URL"] = config["disk_api_url"]
+    from standins import fake_ydb, fake_sqs
+    fake_ydb.install_global()
+    fake_ydb.DATABASE.query_latency = config["ydb_latency_ms"] / 1000
+    fake_ydb.DATABASE.connect_latency = config["ydb_connect_ms"] / 1000
+    fake_sqs.SQS.latency = config["mq_latency_ms"] / 1000
+    seed_tasks(fake_ydb.DATABASE, config["size"])
+    module = load_function(config["function"])
+    if hasattr(module, "boto3"):
+        fake_sqs.install(module)
+    return {"handler": module.handler, "db": fake_ydb.DATABASE}
+
+
+def call(handler, function: str, n: int) -> tuple:
+    event = make_event(function, n)
+    started = time.perf_counter()
+    response = handler(event, Context())
+    elapsed = time.perf_counter() - started
+    return elapsed, response.get("statusCode"), len(response.get("body") or "")
+
+
+def measure_allocations(handler, function: str, requests: int) -> dict:
+    peaks, blocks = [], []
+    tracemalloc.start()
+    try:
+        for n in range(requests):
+            tracemalloc.reset_peak()
+            start_size, _ = tracemalloc.get_traced_memory()
+            start_blocks = sys.getallocatedblocks()
+            call(handler, function, n)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - start_size)
+            blocks.append(sys.getallocatedblocks() - start_blocks)
+    finally:
+        tracemalloc.stop()
+    return {"peak_kb_per_request": statistics.mean(peaks) / 1024, "net_blocks_per_request": statistics.mean(blocks)}
+
+
+def run_worker(config: dict) -> dict:
+    """Process-mode entry point: one process = one function instance."""
+    state = prepare_process(config)
+    handler = state["handler"]
+    call(handler, config["function"], 0)  # warm-up, like a warm instance
+    latencies, statuses, body_bytes = [], {}, 0
+    offset = config["offset"]
+    for n in range(config["requests"]):
+        elapsed, status, size = call(handler, config["function"], offset + n)
+        latencies.append(elapsed)
+        statuses[status] = statuses.get(status, 0) + 1
+        body_bytes += size
+    return {
+        "latencies": latencies,
+        "statuses": statuses,
+        "body_bytes": body_bytes,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_threads(config: dict, concurrency: int) -> list:
+    state = prepare_process(config)
+    handler = state["handler"]
+    call(handler, config["function"], 0)
+    counter = iter(range(config["requests"] * concurrency))
+    lock = threading.Lock()
+
+    def worker(_):
+        result = {"latencies": [], "statuses": {}, "body_bytes": 0}
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                break
+            elapsed, status, size = call(handler, config["function"], n)
+            result["latencies"].append(elapsed)
+            result["statuses"][status] = result["statuses"].get(status, 0) + 1
+            result["body_bytes"] += size
+        result["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return result
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(worker, range(concurrency)))
+
+
+def run_allocations(config: dict) -> dict:
+    state = prepare_process(config)
+    call(state["handler"], config["function"], 0)
+    return measure_allocations(state["handler"], config["function"], config["alloc_requests"])
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def suggest_memory(peak_rss_kb: int) -> int:
+    needed_mb = peak_rss_kb / 1024 * 1.25
+    for tier in MEMORY_TIERS_MB:
+        if tier >= needed_mb:
+            return tier
+    return MEMORY_TIERS_MB[-1]
+
+
+def run_scenario(function: str, size: int, concurrency: int, args, context) -> dict:
+    base = {
+        "function": function,
+        "size": size,
+        "requests": args.requests,
+        "ydb_latency_ms": args.ydb_latency_ms,
+        "ydb_connect_ms": args.ydb_connect_ms,
+        "mq_latency_ms": args.mq_latency_ms,
+        "alloc_requests": args.alloc_requests,
+        "disk_api_url": args.disk_api_url,
+    }
+
+    started = time.perf_counter()
+    if args.mode == "process":
+        configs = [dict(base, offset=i * args.requests) for i in range(concurrency)]
+        with context.Pool(concurrency) as pool:
+            # Seeding happens inside each process before its clock starts; time the requests only.
+            results = pool.map(run_worker, configs)
+    else:
+        with context.Pool(1) as pool:
+            results = pool.apply(run_threads, (base, concurrency))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(l for r in results for l in r["latencies"])
+    busy = max(sum(r["latencies"]) for r in results)
+    statuses = {}
+    for r in results:
+        for status, count in r["statuses"].items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+
+    with context.Pool(1) as pool:
+        allocations = pool.apply(run_allocations, (base,))
+
+    peak_rss_kb = max(r["peak_rss_kb"] for r in results)
+    return {
+        "function": function,
+        "table_size": size,
+        "concurrency": concurrency,
+        "mode": args.mode,
+        "requests": len(latencies),
+        "statuses": statuses,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "throughput_rps": len(latencies) / busy if busy else 0.0,
+        "scenario_wall_s": wall,
+        "response_bytes_mean": sum(r["body_bytes"] for r in results) / max(len(latencies), 1),
+        "alloc_peak_kb_per_request": allocations["peak_kb_per_request"],
+        "alloc_net_blocks_per_request": allocations["net_blocks_per_request"],
+        "peak_rss_mb": peak_rss_kb / 1024,
+        "suggested_memory_mb": suggest_memory(peak_rss_kb),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--functions", nargs="+", default=list(FUNCTIONS), choices=FUNCTIONS)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Rows in the tasks table")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=50, help="Requests per concurrent caller")
+    parser.add_argument("--alloc-requests", type=int, default=10, help="Requests traced with tracemalloc")
+    parser.add_argument("--mode", choices=("process", "thread"), default="process")
+    parser.add_argument("--ydb-latency-ms", type=float, default=5.0, help="Simulated YDB round trip per query")
+    parser.add_argument("--ydb-connect-ms", type=float, default=50.0, help="Simulated YDB driver discovery time")
+    parser.add_argument("--mq-latency-ms", type=float, default=10.0, help="Simulated Message Queue call latency")
+    parser.add_argument("--output", default=None, help="JSON output path (default: benchmarks/results/functions-<commit>.json)")
+    args = parser.parse_args()
+
+    # create_task probes Disk metadata to pick a lane
+    disk = DiskService(synthetic_metadata=True).start()
+    args.disk_api_url = disk.url
+
+    commit = git_commit()
+    output = args.output or os.path.join(BENCH_DIR, "results", f"functions-{commit}.json")
+    context = multiprocessing.get_context("spawn")
+
+    print(f"{'function':<13} {'rows':>8} {'conc':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rps':>8} "
+          f"{'alloc KB':>9} {'RSS MB':>7} {'mem MB':>7}")
+    scenarios = []
+    for function in args.functions:
+        sizes = args.sizes if function != "static_pages" else args.sizes[:1]
+        for size in sizes:
+            for concurrency in args.concurrency:
+                result = run_scenario(function, size, concurrency, args, context)
+                scenarios.append(result)
+                print(f"{function:<13} {size:>8} {concurrency:>5} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                      f"{result['p99_ms']:>8.1f} {result['throughput_rps']:>8.1f} {result['alloc_peak_kb_per_request']:>9.0f} "
+                      f"{result['peak_rss_mb']:>7.0f} {result['suggested_memory_mb']:>7}")
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "mode": args.mode,
+            "requests_per_caller": args.requests,
+            "ydb_latency_ms": args.ydb_latency_ms,
+            "ydb_connect_ms": args.ydb_connect_ms,
+            "mq_latency_ms": args.mq_latency_ms,
+        },
+        "scenarios": scenarios,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to {output}")
+    disk.stop()
+
+
+if __name__ == "__main__":
+    main()
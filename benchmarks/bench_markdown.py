@@ -0,0 +1,98 @@
+"""
+Benchmark: scaling of the summary Markdown parser on large synthetic input.
+
+Generates summaries of doubling size and reports parse time (block
+tokenizer plus inline conversion) and story construction time per KB.
+Flat per-KB numbers across sizes indicate linear scaling.
+
+Usage:
+    python benchmarks/bench_markdown.py [--sections 250] [--steps 6]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "worker"))
+
+from markdown_parser import parse_blocks, render_inline
+
+
+SECTION_TEMPLATE = """## Раздел {n}: **ключевые** понятия
+
+Текст раздела {n} с *курсивом*, `inline_code()` и символами < > & в тексте.
+Продолжение абзаца со **вложенным *выделением*** и snake_case_identifier.
+
+- Пункт первого уровня {n}
+  - Вложенный пункт с **жирным**
+    1. Нумерованный пункт
+    2. Ещё один пункт
+- Второй пункт верхнего уровня
+
+| Термин | Определение |
+|--------|-------------|
+| A{n} | Значение & описание |
+| B{n} | `код` и <тег> |
+
+```
+def example_{n}(x):
+    return x < {n} and x > 0
+```
+
+"""
+
+
+def synthetic_summary(sections: int) -> str:
+    return "# Конспект\n\n" + "".join(SECTION_TEMPLATE.format(n=i) for i in range(sections))
+
+
+def parse(markdown: str) -> int:
+    count = 0
+    for block in parse_blocks(markdown):
+        if block.text:
+            render_inline(block.text)
+        if block.rows:
+            for row in block.rows:
+                for cell in row:
+                    render_inline(cell)
+        count += 1
+    return count
+
+
+def best_of(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=250, help="Sections in the smallest document")
+    parser.add_argument("--steps", type=int, default=6, help="Number of doublings")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--story", action="store_true", help="Also time ReportLab flowable construction")
+    args = parser.parse_args()
+
+    renderer = None
+    if args.story:
+        import pdf_generator
+        renderer = pdf_generator.get_renderer()
+
+    print(f"{'size KB':>10} {'blocks':>8} {'parse ms':>10} {'us/KB':>8}" + (f" {'story ms':>10} {'us/KB':>8}" if renderer else ""))
+    for step in range(args.steps):
+        markdown = synthetic_summary(args.sections * 2 ** step)
+        size_kb = len(markdown.encode("utf-8")) / 1024
+        blocks = parse(markdown)
+        parse_s = best_of(lambda: parse(markdown), args.repeats)
+        line = f"{size_kb:>10.0f} {blocks:>8} {parse_s * 1000:>10.1f} {parse_s * 1e6 / size_kb:>8.1f}"
+        if renderer:
+            story_s = best_of(lambda: renderer.build_story("Benchmark", markdown), args.repeats)
+            line += f" {story_s * 1000:>10.1f} {story_s * 1e6 / size_kb:>8.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Micro-benchmark: per-PDF render time of the worker's PDF generator.
+
+Compares the previous per-call setup (font registration, stylesheet and
+ParagraphStyle construction, file in /tmp) with the shared PDFRenderer
+rendering into an in-memory buffer.
+
+Usage:
+    python benchmarks/bench_pdf_render.py [--iterations 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "worker"))
+
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+import pdf_generator
+
+
+SAMPLE_SUMMARY = """# Введение в алгоритмы
+
+## Основные понятия
+
+**Алгоритм** — это *конечная* последовательность шагов.
+
+- Корректность
+- Эффективность
+- Понятность
+
+### Сложность
+
+1. Временная сложность
+2. Пространственная сложность
+
+Вывод: выбор алгоритма зависит от задачи & ограничений.
+"""
+
+
+def legacy_generate_pdf(title: str, summary_text: str, output_path: str) -> None:
+    """Reproduces the per-call setup the worker used before PDFRenderer."""
+    pdfmetrics.registerFont(TTFont('DejaVuSans', pdf_generator.FONT_PATH))
+    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', pdf_generator.BOLD_FONT_PATH))
+
+    doc = SimpleDocTemplate(output_path, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    styles = getSampleStyleSheet()
+    common = dict(textColor='#1a1a1a', alignment=TA_LEFT, fontName='DejaVuSans-Bold')
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor='#1a1a1a',
+                                 spaceAfter=30, alignment=TA_CENTER, fontName='DejaVuSans-Bold')
+    heading2_style = ParagraphStyle('Heading2', parent=styles['Heading2'], fontSize=18, spaceAfter=12, spaceBefore=12, **common)
+    heading3_style = ParagraphStyle('Heading3', parent=styles['Heading3'], fontSize=14, spaceAfter=10, spaceBefore=10, **common)
+    ParagraphStyle('Heading4', parent=styles['Heading4'], fontSize=12, spaceAfter=8, spaceBefore=8, **common)
+    body_style = ParagraphStyle('CustomBody', parent=styles['BodyText'], fontSize=11, textColor='#333333',
+                                spaceAfter=8, alignment=TA_LEFT, fontName='DejaVuSans', leading=14)
+    bullet_style = ParagraphStyle('Bullet', parent=styles['BodyText'], fontSize=11, textColor='#333333', spaceAfter=6,
+                                  alignment=TA_LEFT, fontName='DejaVuSans', leading=14, leftIndent=20, bulletIndent=10)
+
+    story = [Paragraph(title, title_style), Spacer(1, 0.2 * inch)]
+    for line in summary_text.split('\n'):
+        line = line.rstrip()
+        if not line.strip():
+            story.append(Spacer(1, 0.1 * inch))
+        elif line.startswith('### '):
+            story.append(Paragraph(pdf_generator.markdown_to_reportlab(line[4:]), heading3_style))
+        elif line.startswith('## ') or line.startswith('# '):
+            story.append(Paragraph(pdf_generator.markdown_to_reportlab(line.lstrip('#').strip()), heading2_style))
+        elif line.startswith('- ') or line.startswith('* '):
+            story.append(Paragraph(f'• {pdf_generator.markdown_to_reportlab(line[2:])}', bullet_style))
+        else:
+            story.append(Paragraph(pdf_generator.markdown_to_reportlab(line), body_style))
+    doc.build(story)
+
+
+def measure(fn, iterations: int) -> list:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(name: str, timings: list) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:<32} mean {statistics.mean(timings):8.2f} ms   median {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--repeat-summary", type=int, default=10, help="Multiply the sample summary to enlarge the document")
+    args = parser.parse_args()
+
+    summary = SAMPLE_SUMMARY * args.repeat_summary
+    title = "Бенчмарк рендеринга"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "bench.pdf")
+
+        def before():
+            legacy_generate_pdf(title, summary, pdf_path)
+            with open(pdf_path, "rb") as f:
+                f.read()
+            os.remove(pdf_path)
+
+        def after():
+            pdf_generator.generate_pdf_buffer(title, summary).getvalue()
+
+        # First call pays for font parsing; keep it out of steady-state numbers.
+        after()
+
+        report("before (per-call setup, /tmp)", measure(before, args.iterations))
+        report("after (shared renderer, BytesIO)", measure(after, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""
+Offline end-to-end benchmark of the worker pipeline (`processor.process_task`).
+
+Runs the real worker code against local stand-ins:
+- Yandex Disk public API and file host (HTTP, serves sample videos)
+- S3-compatible Object Storage (HTTP, in memory)
+- SpeechKit longRunningRecognize + operation API (HTTP, configurable latency)
+- YandexGPT (in-process fake of yandex_cloud_ml_sdk)
+- YDB (in-memory stand-in of the ydb SDK)
+
+Each video is processed in a fresh process so peak RSS is per run. For every
+pipeline stage the harness records wall time, worker and ffmpeg peak RSS,
+/tmp bytes and network bytes per service, and writes everything as JSON.
+
+Sample videos are generated with ffmpeg (lavfi test source + sine tone)
+unless `--video` is given.
+
+Usage:
+    python benchmarks/bench_pipeline.py --durations 60 300 900
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/pipeline-abc1234.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_DIR = os.path.join(BENCH_DIR, "..", "worker")
+sys.path.insert(0, BENCH_DIR)
+
+from standins.http_services import DiskService, S3Service, SpeechKitService, STATS_PATH
+
+BUCKET = "bench-bucket"
+FOLDER_ID = "bench-folder"
+
+# Names in processor's namespace (or StorageClient methods) timed as pipeline stages.
+PROCESSOR_STAGES = {
+    "validate_yandex_disk_link": "validate",
+    "get_download_url": "download_url",
+    "download_video": "download",
+    "extract_audio": "extract_audio",
+    "trim_silence": "vad",
+    "recognize_chunks": "transcribe",
+    "generate_summary": "summarize",
+}
+STORAGE_STAGES = {
+    "upload_file": "upload_audio",
+    "upload_bytes": "upload_summary",
+}
+
+
+def generate_video(path: str, duration: int, size: str) -> None:
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc=size={size}:rate=15",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+            "-t", str(duration),
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-b:a", "96k",
+            "-shortest", path,
+        ],
+        check=True,
+    )
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+class TmpSampler(threading.Thread):
+    """Polls /tmp for files belonging to the task and tracks the peak footprint per stage."""
+
+    def __init__(self, task_id: str, interval: float = 0.02):
+        super().__init__(daemon=True)
+        self.task_id = task_id
+        self.interval = interval
+        self.stage = None
+        self.peaks = {}
+        self.overall_peak = 0
+        self.running = True
+
+    def current_bytes(self) -> int:
+        total = 0
+        for root, _, files in os.walk(tempfile.gettempdir()):
+            for name in files:
+                if self.task_id in name or self.task_id in root:
+                    try:
+                        total += os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+        return total
+
+    def run(self) -> None:
+        while self.running:
+            self.sample()
+            time.sleep(self.interval)
+
+    def sample(self) -> None:
+        current = self.current_bytes()
+        self.overall_peak = max(self.overall_peak, current)
+        if self.stage:
+            self.peaks[self.stage] = max(self.peaks.get(self.stage, 0), current)
+
+
+def _service_stats(urls: dict) -> dict:
+    """Traffic of each stand-in seen from the worker, like StageTimer's bytes_in/bytes_out."""
+    import requests
+    stats = {}
+    for name, url in urls.items():
+        served = requests.get(f"{url}{STATS_PATH}", timeout=5).json()
+        # The stand-ins count what they received (in) and sent (out); the worker's in is their out
+        stats[name] = {"requests": served["requests"], "bytes_in": served["bytes_out"], "bytes_out": served["bytes_in"]}
+    return stats
+
+
+def _delta(after: dict, before: dict) -> dict:
+    return {
+        name: {key: after[name][key] - before[name][key] for key in after[name]}
+        for name in after
+    }
+
+
+def _load_create_task():
+    import importlib.util
+    path = os.path.join(BENCH_DIR, "..", "python_functions", "create_task", "index.py")
+    spec = importlib.util.spec_from_file_location("fn_create_task", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_pipeline(config: dict) -> dict:
+    """Child-process entry point: runs process_task once against the stand-ins."""
+    os.environ.update(config["env"])
+    sys.path.insert(0, WORKER_DIR)
+
+    from standins import fake_ydb, fake_yandexgpt
+    fake_ydb.install_global()
+    fake_yandexgpt.install_global()
+    fake_yandexgpt.SETTINGS.update(config["gpt"])
+
+    import processor
+    import storage_client
+
+    task_id = config["task_id"]
+    service_urls = config["service_urls"]
+    sampler = TmpSampler(task_id)
+    stages = {}
+
+    def timed(stage, fn):
+        def wrapper(*args, **kwargs):
+            sampler.stage = stage
+            network_before = _service_stats(service_urls)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                sampler.sample()
+                network = _delta(_service_stats(service_urls), network_before)
+                self_usage = resource.getrusage(resource.RUSAGE_SELF)
+                children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+                record = stages.setdefault(stage, {"calls": 0, "wall_s": 0.0, "network": {}})
+                record["calls"] += 1
+                record["wall_s"] += elapsed
+                record["peak_rss_kb"] = self_usage.ru_maxrss
+                record["peak_children_rss_kb"] = children_usage.ru_maxrss
+                record["tmp_peak_bytes"] = sampler.peaks.get(stage, 0)
+                for service, counters in network.items():
+                    totals = record["network"].setdefault(service, {"requests": 0, "bytes_in": 0, "bytes_out": 0})
+                    for key, value in counters.items():
+                        totals[key] += value
+                sampler.stage = None
+        return wrapper
+
+    for name, stage in PROCESSOR_STAGES.items():
+        setattr(processor, name, timed(stage, getattr(processor, name)))
+    for name, stage in STORAGE_STAGES.items():
+        setattr(storage_client.StorageClient, name, timed(stage, getattr(storage_client.StorageClient, name)))
+
+    # Create the schema the same way create_task does
+    create_task = _load_create_task()
+    create_task.ensure_table_exists(create_task.ydb.SessionPool(create_task.ydb.Driver()))
+
+    now = datetime.now(timezone.utc).isoformat()
+    fake_ydb.DATABASE.execute(
+        """
+        UPSERT INTO tasks (task_id, title, video_link, status, created_at, updated_at)
+        VALUES ($task_id, $title, $video_link, $status, $created_at, $updated_at);
+        """,
+        {"$task_id": task_id, "$title": config["title"], "$video_link": config["video_link"],
+         "$status": "queued", "$created_at": now, "$updated_at": now},
+    )
+
+    sampler.start()
+    network_before = _service_stats(service_urls)
+    started = time.perf_counter()
+    processor.process_task(task_id, profile=bool(config["profile_dir"]))
+    total_wall = time.perf_counter() - started
+    network_total = _delta(_service_stats(service_urls), network_before)
+    sampler.running = False
+
+    if config["profile_dir"]:
+        # Profile uploads go through the wrapped upload_bytes; they land after the task is done
+        os.makedirs(config["profile_dir"], exist_ok=True)
+        client = storage_client.StorageClient()
+        for filename in ("pipeline.prof", "pipeline.txt", "pipeline-allocations.txt"):
+            data = client.download_bytes(f"profiles/{task_id}/{filename}")
+            with open(os.path.join(config["profile_dir"], f"{task_id}-{filename}"), "wb") as f:
+                f.write(data)
+
+    task = fake_ydb.DATABASE.execute(
+        "SELECT status, error_message, stage_timings FROM tasks WHERE task_id = $task_id;", {"$task_id": task_id}
+    )[0].rows[0]
+
+    return {
+        "status": task.status,
+        "error_message": task.error_message,
+        "wall_s": total_wall,
+        "stages": stages,
+        "worker_stages": json.loads(task.stage_timings) if task.stage_timings else [],
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "peak_children_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        "tmp_peak_bytes": sampler.overall_peak,
+        "network": network_total,
+        "gpt": fake_yandexgpt.STATS.snapshot(),
+    }
+
+
+def print_run(run: dict) -> None:
+    print(f"\n{run['video']} ({run['duration_s']} s, {run['video_bytes'] / 1e6:.1f} MB): "
+          f"{run['status']} in {run['wall_s']:.2f} s, peak RSS {run['peak_rss_kb'] / 1024:.0f} MB, "
+          f"ffmpeg RSS {run['peak_children_rss_kb'] / 1024:.0f} MB, /tmp peak {run['tmp_peak_bytes'] / 1e6:.1f} MB")
+    if run.get("error_message"):
+        print(f"  error: {run['error_message']}")
+    print(f"  {'stage':<16} {'wall s':>8} {'tmp MB':>8} {'net in MB':>10} {'net out MB':>11}")
+    for stage, record in run["stages"].items():
+        net_in = sum(s["bytes_in"] for s in record["network"].values()) / 1e6
+        net_out = sum(s["bytes_out"] for s in record["network"].values()) / 1e6
+        print(f"  {stage:<16} {record['wall_s']:>8.3f} {record['tmp_peak_bytes'] / 1e6:>8.1f} {net_in:>10.2f} {net_out:>11.2f}")
+
+
+def print_comparison(current: dict, baseline: dict) -> None:
+    print(f"\nComparison against {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    baseline_runs = {run["duration_s"]: run for run in baseline.get("runs", [])}
+    for run in current["runs"]:
+        previous = baseline_runs.get(run["duration_s"])
+        if not previous:
+            continue
+        print(f"  {run['duration_s']} s video: total {previous['wall_s']:.2f} -> {run['wall_s']:.2f} s, "
+              f"peak RSS {previous['peak_rss_kb'] / 1024:.0f} -> {run['peak_rss_kb'] / 1024:.0f} MB")
+        for stage, record in run["stages"].items():
+            before = previous["stages"].get(stage)
+            if before and before["wall_s"] > 0:
+                change = (record["wall_s"] - before["wall_s"]) / before["wall_s"] * 100
+                print(f"    {stage:<16} {before['wall_s']:>8.3f} -> {record['wall_s']:>8.3f} s ({change:+.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=int, nargs="+", default=[60, 300, 900], help="Generated video lengths, seconds")
+    parser.add_argument("--video", nargs="*", default=[], help="Use existing video files instead of generated ones")
+    parser.add_argument("--video-size", default="640x360", help="Resolution of generated videos")
+    parser.add_argument("--video-dir", default=None, help="Where to keep generated videos (default: temporary)")
+    parser.add_argument("--stt-latency", type=float, default=0.5, help="Fixed SpeechKit operation latency, seconds")
+    parser.add_argument("--stt-latency-per-second", type=float, default=0.01, help="SpeechKit latency per audio second")
+    parser.add_argument("--stt-poll-interval", type=float, default=0.2)
+    parser.add_argument("--gpt-latency", type=float, default=0.5, help="Fixed YandexGPT latency, seconds")
+    parser.add_argument("--gpt-latency-per-1k-tokens", type=float, default=0.02)
+    parser.add_argument("--gpt-lite-latency-factor", type=float, default=0.4, help="yandexgpt-lite latency relative to yandexgpt")
+    parser.add_argument("--profile-dir", default=None, help="Profile each run and copy the reports from profiles/<task_id>/ here")
+    parser.add_argument("--output", default=None, help="JSON output path (default: benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Previous JSON result to compare against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    output = args.output or os.path.join(BENCH_DIR, "results", f"pipeline-{commit}.json")
+
+    disk = DiskService().start()
+    s3 = S3Service().start()
+    speechkit = SpeechKitService(s3, args.stt_latency, args.stt_latency_per_second).start()
+    service_urls = {"disk": disk.url, "s3": s3.url, "speechkit": speechkit.url}
+
+    video_dir_context = tempfile.TemporaryDirectory() if not args.video_dir else None
+    video_dir = args.video_dir or video_dir_context.name
+    os.makedirs(video_dir, exist_ok=True)
+
+    videos = [(path, None) for path in args.video]
+    if not videos:
+        for duration in args.durations:
+            path = os.path.join(video_dir, f"sample_{duration}s.mp4")
+            if not os.path.exists(path):
+                print(f"Generating {duration} s sample video...")
+                generate_video(path, duration, args.video_size)
+            videos.append((path, duration))
+
+    env = {
+        "DISK_API_URL": disk.url,
+        "S3_ENDPOINT": s3.url,
+        "S3_BUCKET": BUCKET,
+        "STT_API_URL": speechkit.url,
+        "OPERATION_API_URL": speechkit.url,
+        "STT_POLL_INTERVAL": str(args.stt_poll_interval),
+        "YDB_ENDPOINT": "grpc://localhost:2136",
+        "YDB_DATABASE": "/local",
+        "FOLDER_ID": FOLDER_ID,
+        "YANDEX_API_KEY": "bench-key",
+        "AWS_ACCESS_KEY_ID": "bench",
+        "AWS_SECRET_ACCESS_KEY": "bench",
+        "AWS_REGION": "ru-central1",
+    }
+    gpt = {
+        "base_latency": args.gpt_latency,
+        "latency_per_1k_tokens": args.gpt_latency_per_1k_tokens,
+        "lite_latency_factor": args.gpt_lite_latency_factor,
+    }
+
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    try:
+        for path, duration in videos:
+            task_id = str(uuid.uuid4())
+            config = {
+                "env": env,
+                "gpt": gpt,
+                "task_id": task_id,
+                "title": f"Benchmark {os.path.basename(path)}",
+                "video_link": disk.add_file(path, duration),
+                "service_urls": service_urls,
+                "profile_dir": args.profile_dir,
+            }
+            with context.Pool(1) as pool:
+                result = pool.apply(run_pipeline, (config,))
+            result.update({
+                "video": os.path.basename(path),
+                "duration_s": duration,
+                "video_bytes": os.path.getsize(path),
+            })
+            runs.append(result)
+            print_run(result)
+    finally:
+        for service in (disk, s3, speechkit):
+            service.stop()
+        if video_dir_context:
+            video_dir_context.cleanup()
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "stt_latency": args.stt_latency,
+            "stt_latency_per_second": args.stt_latency_per_second,
+            "stt_poll_interval": args.stt_poll_interval,
+            "gpt": gpt,
+        },
+        "runs": runs,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
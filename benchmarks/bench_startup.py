@@ -0,0 +1,234 @@
+"""
+Cold start benchmark of the worker container.
+
+Two measurements:
+- Import profile: `python -X importtime -c "import <module>"` for the
+  worker entry points, reporting total import time and the packages that
+  dominate it (self time summed per top-level package). Uses the real
+  installed dependencies.
+- Cold start: starts `worker/main.py` in a fresh process and records the
+  time until the server answers `/health` at all (listening), until it
+  answers 200 (ready, after pre-warm), and until the first trigger request
+  (`POST /` for an unknown task) gets its response - the time-to-first-byte
+  a message delivered to a scaled-from-zero container sees. Runs with
+  WORKER_PREWARM off and on. YDB is the in-memory stand-in with simulated
+  discovery time (`--ydb-connect-ms`), so the real ydb import is not part
+  of these numbers; the import profile covers it.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --modules main processor
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_DIR = os.path.join(BENCH_DIR, "..", "worker")
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+ENV = {
+    "YDB_ENDPOINT": "grpc://localhost:2136",
+    "YDB_DATABASE": "/local",
+    "MQ_QUEUE_URL": "https://message-queue.api.cloud.yandex.net/b1g/dj6/bench-tasks-queue",
+    "MQ_ENDPOINT": "https://message-queue.api.cloud.yandex.net",
+    "S3_BUCKET": "bench-bucket",
+    "S3_ENDPOINT": "https://storage.yandexcloud.net",
+    "AWS_REGION": "ru-central1",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "FOLDER_ID": "bench-folder",
+    "YANDEX_API_KEY": "bench",
+}
+
+# Runs main.py as __main__ with the YDB stand-in registered as `ydb`
+LAUNCHER = """
+import runpy, sys
+sys.path[:0] = [{bench_dir!r}, {worker_dir!r}]
+from standins import fake_ydb
+fake_ydb.install_global()
+fake_ydb.DATABASE.connect_latency = {connect_latency!r}
+sys.argv = ["main.py"]
+runpy.run_path({main_path!r}, run_name="__main__")
+"""
+
+
+def import_profile(module: str) -> Tuple[float, Dict[str, float]]:
+    """Total import time of module and self time per top-level package, milliseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=WORKER_DIR, env={**os.environ, **ENV}, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {result.stderr[-500:]}")
+    total_us = 0
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us / 1000
+        if name == module and len(indent) == 1:
+            total_us = cumulative_us
+    return total_us / 1000, packages
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(url: str, body: Optional[bytes] = None, timeout: float = 60) -> Optional[int]:
+    """HTTP status of the response, or None if nothing is listening yet."""
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"} if body else {})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (ConnectionError, urllib.error.URLError):
+        return None
+
+
+def start_worker(prewarm: bool, connect_latency: float) -> Tuple[subprocess.Popen, str, float]:
+    port = free_port()
+    launcher = LAUNCHER.format(
+        bench_dir=BENCH_DIR, worker_dir=WORKER_DIR, connect_latency=connect_latency,
+        main_path=os.path.join(WORKER_DIR, "main.py"),
+    )
+    env = {**os.environ, **ENV, "PORT": str(port), "WORKER_PREWARM": "1" if prewarm else "0"}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", launcher], cwd=WORKER_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return process, f"http://127.0.0.1:{port}", started
+
+
+def stop_worker(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def measure_health(prewarm: bool, connect_latency: float, deadline: float = 60) -> Dict[str, float]:
+    process, url, started = start_worker(prewarm, connect_latency)
+    listening = ready = None
+    try:
+        while time.perf_counter() - started < deadline:
+            status = request(f"{url}/health", timeout=5)
+            now = time.perf_counter() - started
+            if status is not None and listening is None:
+                listening = now
+            if status == 200:
+                ready = now
+                break
+            time.sleep(0.005)
+    finally:
+        stop_worker(process)
+    return {"listening_s": listening, "ready_s": ready}
+
+
+def measure_first_trigger(prewarm: bool, connect_latency: float, deadline: float = 60) -> float:
+    process, url, started = start_worker(prewarm, connect_latency)
+    message = {"details": {"message": {"body": json.dumps({"task_id": str(uuid.uuid4()), "lane": "short"})}}}
+    body = json.dumps({"messages": [message]}).encode("utf-8")
+    try:
+        while time.perf_counter() - started < deadline:
+            if request(f"{url}/", body) is not None:
+                return time.perf_counter() - started
+            time.sleep(0.005)
+        raise RuntimeError("worker did not answer the trigger in time")
+    finally:
+        stop_worker(process)
+
+
+def median(values: List[Optional[float]]) -> Optional[float]:
+    present = [v for v in values if v is not None]
+    return statistics.median(present) if present else None
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=["main", "processor"], help="Worker modules to import-profile")
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions per measurement (medians are reported)")
+    parser.add_argument("--top", type=int, default=12, help="Packages listed per import profile")
+    parser.add_argument("--ydb-connect-ms", type=float, default=300.0, help="Simulated YDB driver discovery time")
+    parser.add_argument("--output", default=None, help="JSON output path (default: benchmarks/results/startup-<commit>.json)")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    output = args.output or os.path.join(BENCH_DIR, "results", f"startup-{commit}.json")
+
+    imports = {}
+    for module in args.modules:
+        totals, per_package = [], {}
+        for _ in range(args.runs):
+            total, packages = import_profile(module)
+            totals.append(total)
+            for package, ms in packages.items():
+                per_package.setdefault(package, []).append(ms)
+        top = sorted(((statistics.median(v), k) for k, v in per_package.items()), reverse=True)[:args.top]
+        imports[module] = {"total_ms": statistics.median(totals), "top_packages_ms": {k: round(v, 1) for v, k in top}}
+        print(f"import {module}: {imports[module]['total_ms']:.0f} ms")
+        for v, k in top:
+            print(f"  {k:<28} {v:8.1f} ms")
+
+    connect_latency = args.ydb_connect_ms / 1000
+    cold = {}
+    for prewarm in (False, True):
+        health = [measure_health(prewarm, connect_latency) for _ in range(args.runs)]
+        triggers = [measure_first_trigger(prewarm, connect_latency) for _ in range(args.runs)]
+        name = "prewarm" if prewarm else "no_prewarm"
+        cold[name] = {
+            "listening_s": median([h["listening_s"] for h in health]),
+            "ready_s": median([h["ready_s"] for h in health]),
+            "first_trigger_s": median(triggers),
+        }
+    print(f"\n{'cold start':<12} {'listening s':>12} {'ready s':>10} {'1st trigger s':>14}")
+    for name, row in cold.items():
+        print(f"{name:<12} {row['listening_s']:>12.3f} {row['ready_s']:>10.3f} {row['first_trigger_s']:>14.3f}")
+
+    report = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "runs": args.runs,
+        "ydb_connect_ms": args.ydb_connect_ms,
+        "imports": imports,
+        "cold_start": cold,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+In-memory stand-in for the boto3 SQS client calls made against Yandex
+Message Queue.
+
+`install(module)` replaces the module-level `boto3` reference of an
+imported module with a shim whose `client("sqs", ...)` returns
+`FakeSQSClient`; other services fall through to the real boto3.
+"""
+import threading
+import time
+import types
+import uuid
+from typing import Dict, List
+
+
+class FakeQueue:
+    def __init__(self, url: str):
+        self.url = url
+        self.messages: List[Dict] = []
+        self.in_flight: Dict[str, Dict] = {}
+
+
+class FakeSQS:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.queues: Dict[str, FakeQueue] = {}
+        self.lock = threading.Lock()
+        self.sent = 0
+
+    def queue(self, url: str) -> FakeQueue:
+        with self.lock:
+            if url not in self.queues:
+                self.queues[url] = FakeQueue(url)
+            return self.queues[url]
+
+
+SQS = FakeSQS()
+
+
+class FakeSQSClient:
+    def __init__(self, state: FakeSQS):
+        self.state = state
+
+    def _wait(self) -> None:
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+    def send_message(self, QueueUrl, MessageBody, DelaySeconds=0, MessageAttributes=None, **kwargs):
+        self._wait()
+        queue = self.state.queue(QueueUrl)
+        message_id = str(uuid.uuid4())
+        with self.state.lock:
+            queue.messages.append({
+                "MessageId": message_id,
+                "Body": MessageBody,
+                "MessageAttributes": MessageAttributes or {},
+                "visible_at": time.time() + DelaySeconds,
+                "sent_at": time.time(),
+            })
+            self.state.sent += 1
+        return {"MessageId": message_id}
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, VisibilityTimeout=30, **kwargs):
+        self._wait()
+        queue = self.state.queue(QueueUrl)
+        now = time.time()
+        received = []
+        with self.state.lock:
+            for message in list(queue.messages):
+                if len(received) >= MaxNumberOfMessages:
+                    break
+                if message["visible_at"] <= now:
+                    receipt = str(uuid.uuid4())
+                    message["visible_at"] = now + VisibilityTimeout
+                    queue.in_flight[receipt] = message
+                    received.append({
+                        "MessageId": message["MessageId"],
+                        "ReceiptHandle": receipt,
+                        "Body": message["Body"],
+                        "MessageAttributes": message["MessageAttributes"],
+                        "Attributes": {"SentTimestamp": str(int(message["sent_at"] * 1000))},
+                    })
+        return {"Messages": received} if received else {}
+
+    def delete_message(self, QueueUrl, ReceiptHandle, **kwargs):
+        self._wait()
+        queue = self.state.queue(QueueUrl)
+        with self.state.lock:
+            message = queue.in_flight.pop(ReceiptHandle, None)
+            if message in queue.messages:
+                queue.messages.remove(message)
+        return {}
+
+    def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout, **kwargs):
+        self._wait()
+        queue = self.state.queue(QueueUrl)
+        with self.state.lock:
+            message = queue.in_flight.get(ReceiptHandle)
+            if message:
+                message["visible_at"] = time.time() + VisibilityTimeout
+        return {}
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames=None, **kwargs):
+        self._wait()
+        queue = self.state.queue(QueueUrl)
+        now = time.time()
+        with self.state.lock:
+            visible = sum(1 for m in queue.messages if m["visible_at"] <= now)
+            delayed_or_in_flight = len(queue.messages) - visible
+        return {"Attributes": {
+            "ApproximateNumberOfMessages": str(visible),
+            "ApproximateNumberOfMessagesNotVisible": str(delayed_or_in_flight),
+            "ApproximateNumberOfMessagesDelayed": "0",
+        }}
+
+
+def build_boto3_shim(real_boto3=None) -> types.ModuleType:
+    shim = types.ModuleType("boto3")
+
+    def client(service_name, *args, **kwargs):
+        if service_name == "sqs":
+            return FakeSQSClient(SQS)
+        if real_boto3 is None:
+            raise RuntimeError(f"boto3 is required for the {service_name} client")
+        return real_boto3.client(service_name, *args, **kwargs)
+
+    shim.client = client
+    return shim
+
+
+def install(*modules: types.ModuleType) -> None:
+    for module in modules:
+        module.boto3 = build_boto3_shim(getattr(module, "boto3", None))
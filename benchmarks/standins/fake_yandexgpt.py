@@ -0,0 +1,168 @@
+"""
+In-process stand-in for `yandex_cloud_ml_sdk.YCloudML` completions (and
+`AsyncYCloudML`, whose `run` is a coroutine).
+
+The SDK talks gRPC, so instead of a network fake the benchmarks register
+this module as `yandex_cloud_ml_sdk` (`install_global`), which `summary`
+imports when it runs. Latency is
+`base_latency + latency_per_1k_tokens * prompt_tokens / 1000` (scaled by
+`lite_latency_factor` for `yandexgpt-lite`) and the
+returned summary is a deterministic Markdown document sized to the prompt.
+"""
+import sys
+import asyncio
+import threading
+import time
+import types
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+
+@dataclass(frozen=True)
+class Usage:
+    input_text_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+
+@dataclass(frozen=True)
+class Alternative:
+    role: str
+    text: str
+    status: int = 3
+
+
+class GPTModelResult(tuple):
+    """Tuple of alternatives with `usage`, like the SDK's GPTModelResult."""
+
+    def __new__(cls, alternatives: Tuple[Alternative, ...], usage: Usage, model_version: str = "fake"):
+        result = super().__new__(cls, alternatives)
+        result.alternatives = alternatives
+        result.usage = usage
+        result.model_version = model_version
+        return result
+
+
+class FakeGPTStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.prompt_bytes = 0
+        self.response_bytes = 0
+        self.models: Dict[str, int] = {}
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "prompt_bytes": self.prompt_bytes,
+                "response_bytes": self.response_bytes,
+                "models": dict(self.models),
+            }
+
+
+STATS = FakeGPTStats()
+SETTINGS = {"base_latency": 0.5, "latency_per_1k_tokens": 0.05, "lite_latency_factor": 0.4}
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def synthetic_summary(prompt_tokens: int, max_tokens=None) -> str:
+    sections = max(1, min(prompt_tokens // 2000, 20))
+    parts = ["# Конспект лекции\n"]
+    for n in range(1, sections + 1):
+        parts.append(
+            f"## Раздел {n}\n\n"
+            f"**Ключевая идея {n}**: алгоритмы и *структуры данных*.\n\n"
+            "- Определение\n- Пример\n  - Вложенный пункт\n\n"
+            "1. Вывод первый\n2. Вывод второй\n"
+        )
+    text = "\n".join(parts)
+    if max_tokens:
+        text = text[:int(max_tokens) * 4]
+    return text
+
+
+class FakeModel:
+    def __init__(self, name: str):
+        self.name = name
+        self.config = {}
+
+    def configure(self, **kwargs) -> "FakeModel":
+        model = type(self)(self.name)
+        model.config = {**self.config, **kwargs}
+        return model
+
+    def latency(self, prompt: str) -> float:
+        latency = SETTINGS["base_latency"] + SETTINGS["latency_per_1k_tokens"] * estimate_tokens(prompt) / 1000
+        if self.name.endswith("-lite"):
+            latency *= SETTINGS["lite_latency_factor"]
+        return latency
+
+    def run(self, prompt) -> GPTModelResult:
+        prompt = _prompt_text(prompt)
+        time.sleep(self.latency(prompt))
+        return self.result(prompt)
+
+    def result(self, prompt: str) -> GPTModelResult:
+        prompt_tokens = estimate_tokens(prompt)
+        text = synthetic_summary(prompt_tokens, self.config.get("max_tokens"))
+        completion_tokens = estimate_tokens(text)
+
+        with STATS.lock:
+            STATS.calls += 1
+            STATS.prompt_bytes += len(prompt.encode("utf-8"))
+            STATS.response_bytes += len(text.encode("utf-8"))
+            STATS.models[self.name] = STATS.models.get(self.name, 0) + 1
+
+        usage = Usage(prompt_tokens, completion_tokens, prompt_tokens + completion_tokens)
+        return GPTModelResult((Alternative("assistant", text),), usage)
+
+
+class FakeAsyncModel(FakeModel):
+    async def run(self, prompt) -> GPTModelResult:
+        prompt = _prompt_text(prompt)
+        await asyncio.sleep(self.latency(prompt))
+        return self.result(prompt)
+
+
+def _prompt_text(prompt) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    return "\n".join(m.get("text", "") if isinstance(m, dict) else str(m) for m in prompt)
+
+
+class _Completions:
+    def __init__(self, model_class=FakeModel):
+        self.model_class = model_class
+
+    def __call__(self, model_name: str, model_version: str = "latest") -> FakeModel:
+        return self.model_class(model_name)
+
+
+class _Models:
+    def __init__(self, model_class=FakeModel):
+        self.completions = _Completions(model_class)
+
+
+class FakeYCloudML:
+    def __init__(self, folder_id=None, auth=None, **kwargs):
+        self.folder_id = folder_id
+        self.models = _Models()
+
+
+class FakeAsyncYCloudML:
+    def __init__(self, folder_id=None, auth=None, **kwargs):
+        self.folder_id = folder_id
+        self.models = _Models(FakeAsyncModel)
+
+
+def install_global() -> types.ModuleType:
+    """Register the stand-in as `yandex_cloud_ml_sdk` in sys.modules."""
+    module = types.ModuleType("yandex_cloud_ml_sdk")
+    module.YCloudML = FakeYCloudML
+    module.AsyncYCloudML = FakeAsyncYCloudML
+    sys.modules["yandex_cloud_ml_sdk"] = module
+    return module
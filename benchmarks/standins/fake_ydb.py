@@ -0,0 +1,578 @@
+"""
+In-memory stand-in for the parts of the `ydb` SDK used by the worker and
+the Cloud Functions.
+
+It implements Driver/SessionPool/Session/Transaction over a tiny YQL
+interpreter that understands the statement shapes this repository issues:
+SELECT (optionally through a secondary index VIEW) with WHERE/GROUP BY/ORDER BY/LIMIT, UPSERT/REPLACE/INSERT ... VALUES,
+UPSERT ... SELECT * FROM AS_TABLE($rows), UPSERT ... SELECT ... FROM
+AS_TABLE($rows) AS d LEFT JOIN <table> AS c ON ..., UPDATE ... SET ... WHERE,
+UPDATE ... ON SELECT * FROM AS_TABLE($rows), DELETE FROM ... WHERE, and
+CREATE/ALTER TABLE. `ydb.aio` gets async Driver/SessionPool over the same
+tables. Install it with
+`install(module)` to replace the module-level `ydb` reference of an
+imported module, or `install_global()` before importing a module that does
+`import ydb`.
+"""
+import re
+import sys
+import asyncio
+import threading
+import time
+import types
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Row(dict):
+    def __getattr__(self, name):
+        return self.get(name)
+
+
+class ResultSet:
+    def __init__(self, rows: List[Row]):
+        self.rows = rows
+        self.truncated = False
+
+
+class Table:
+    def __init__(self, name: str, primary_key: List[str]):
+        self.name = name
+        self.primary_key = primary_key
+        self.rows: Dict[Tuple, Dict[str, Any]] = {}
+
+    def key_of(self, row: Dict[str, Any]) -> Tuple:
+        return tuple(row.get(column) for column in self.primary_key)
+
+
+class Database:
+    """Tables shared by every driver created from this stand-in."""
+
+    def __init__(self):
+        self.tables: Dict[str, Table] = {}
+        self.lock = threading.RLock()
+        self.statements = 0
+        # Simulated network round trip per query and driver discovery time, seconds
+        self.query_latency = 0.0
+        self.connect_latency = 0.0
+
+    def create_table(self, name: str, primary_key: List[str]) -> Table:
+        with self.lock:
+            if name not in self.tables:
+                self.tables[name] = Table(name, primary_key)
+            return self.tables[name]
+
+    def table(self, name: str, first_column: Optional[str] = None) -> Table:
+        table = self.tables.get(name)
+        if table is None:
+            table = self.create_table(name, [first_column or "id"])
+        return table
+
+    def execute(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[ResultSet]:
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        return self.run(query, params)
+
+    async def execute_async(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[ResultSet]:
+        if self.query_latency:
+            await asyncio.sleep(self.query_latency)
+        return self.run(query, params)
+
+    def run(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[ResultSet]:
+        params = params or {}
+        results = []
+        with self.lock:
+            for statement in _split_statements(query):
+                self.statements += 1
+                result = _execute_statement(self, statement, params)
+                if result is not None:
+                    results.append(result)
+        return results
+
+
+DATABASE = Database()
+
+# YDB truncates data query results to 1000 rows (ResultSet.truncated is set).
+RESULT_ROW_LIMIT = 1000
+
+
+# --- YQL subset interpreter -------------------------------------------------
+
+_COMMENT_RE = re.compile(r'--[^\n]*')
+_SELECT_RE = re.compile(
+    r'^SELECT\s+(?P<columns>.+?)\s+FROM\s+(?P<table>`?[\w/]+`?)'
+    r'(?:\s+VIEW\s+\w+)?'
+    r'(?:\s+WHERE\s+(?P<where>.+?))?'
+    r'(?:\s+GROUP\s+BY\s+(?P<group>\w+))?'
+    r'(?:\s+ORDER\s+BY\s+(?P<order>.+?))?'
+    r'(?:\s+LIMIT\s+(?P<limit>\S+))?$',
+    re.IGNORECASE | re.DOTALL,
+)
+_VALUES_RE = re.compile(
+    r'^(?P<verb>UPSERT|REPLACE|INSERT)\s+INTO\s+(?P<table>`?[\w/]+`?)\s*\((?P<columns>[^)]*)\)\s*VALUES\s*(?P<values>.+)$',
+    re.IGNORECASE | re.DOTALL,
+)
+_AS_TABLE_RE = re.compile(
+    r'^(?P<verb>UPSERT|REPLACE|INSERT)\s+INTO\s+(?P<table>`?[\w/]+`?)\s+SELECT\s+\*\s+FROM\s+AS_TABLE\((?P<param>\$\w+)\)$',
+    re.IGNORECASE | re.DOTALL,
+)
+_AS_TABLE_JOIN_RE = re.compile(
+    r'^(?P<verb>UPSERT|REPLACE)\s+INTO\s+(?P<table>`?[\w/]+`?)\s+SELECT\s+(?P<columns>.+?)\s+'
+    r'FROM\s+AS_TABLE\((?P<param>\$\w+)\)\s+AS\s+(?P<source>\w+)\s+'
+    r'LEFT\s+JOIN\s+`?[\w/]+`?\s+AS\s+(?P<target>\w+)\s+ON\s+(?P<on>.+)$',
+    re.IGNORECASE | re.DOTALL,
+)
+_UPDATE_ON_RE = re.compile(
+    r'^UPDATE\s+(?P<table>`?[\w/]+`?)\s+ON\s+SELECT\s+\*\s+FROM\s+AS_TABLE\((?P<param>\$\w+)\)$',
+    re.IGNORECASE | re.DOTALL,
+)
+_UPDATE_RE = re.compile(
+    r'^UPDATE\s+(?P<table>`?[\w/]+`?)\s+SET\s+(?P<assignments>.+?)\s+WHERE\s+(?P<where>.+)$',
+    re.IGNORECASE | re.DOTALL,
+)
+_DELETE_RE = re.compile(
+    r'^DELETE\s+FROM\s+(?P<table>`?[\w/]+`?)(?:\s+WHERE\s+(?P<where>.+))?$',
+    re.IGNORECASE | re.DOTALL,
+)
+_CREATE_RE = re.compile(
+    r'^CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?P<table>`?[\w/]+`?)\s*\((?P<body>.+)\)$',
+    re.IGNORECASE | re.DOTALL,
+)
+_PRIMARY_KEY_RE = re.compile(r'PRIMARY\s+KEY\s*\(([^)]*)\)', re.IGNORECASE)
+_CONDITION_RE = re.compile(r'^(\w+)\s*(=|==|!=|<>|<=|>=|<|>)\s*(.+)$')
+_ALIAS_RE = re.compile(r'^(.+?)\s+AS\s+(\w+)$', re.IGNORECASE)
+_COUNT_RE = re.compile(r'^COUNT\s*\(\s*\*\s*\)$', re.IGNORECASE)
+_COALESCE_RE = re.compile(r'^COALESCE\s*\((.+),(.+)\)$', re.IGNORECASE)
+_ARITHMETIC_RE = re.compile(r'^(.+?)\s*([+-])\s*(.+)$')
+
+
+def _split_statements(query: str) -> List[str]:
+    query = _COMMENT_RE.sub('', query)
+    statements = []
+    for part in _split_top_level(query, ';'):
+        part = ' '.join(part.split())
+        upper = part.upper()
+        if not part or upper.startswith('DECLARE ') or upper.startswith('PRAGMA '):
+            continue
+        statements.append(part)
+    return statements
+
+
+def _split_top_level(text: str, separator: str) -> List[str]:
+    parts, depth, quote, current = [], 0, '', []
+    for ch in text:
+        if quote:
+            if ch == quote:
+                quote = ''
+        elif ch in '\'"':
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == separator and depth == 0:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(ch)
+    parts.append(''.join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _table_name(raw: str) -> str:
+    return raw.strip('`').rsplit('/', 1)[-1]
+
+
+def _literal(token: str, params: Dict[str, Any], row: Optional[Dict[str, Any]] = None):
+    token = token.strip()
+    if token.startswith('$'):
+        return params.get(token)
+    if token.upper() == 'NULL':
+        return None
+    if token.upper() in ('TRUE', 'FALSE'):
+        return token.upper() == 'TRUE'
+    if len(token) >= 2 and token[0] == token[-1] and token[0] in '\'"':
+        return token[1:-1]
+    match = _COALESCE_RE.match(token)
+    if match:
+        first = _literal(match.group(1), params, row)
+        return first if first is not None else _literal(match.group(2), params, row)
+    if token.startswith('(') and token.endswith(')'):
+        return _literal(token[1:-1], params, row)
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        pass
+    match = _ARITHMETIC_RE.match(token)
+    if match and row is not None:
+        left = _literal(match.group(1), params, row) or 0
+        right = _literal(match.group(3), params, row) or 0
+        return left + right if match.group(2) == '+' else left - right
+    if row is not None and re.match(r'^[\w.]+$', token):
+        return row.get(token)
+    raise ValueError(f"Unsupported expression in stand-in YQL: {token}")
+
+
+def _conditions(where: Optional[str], params: Dict[str, Any]):
+    if not where:
+        return []
+    conditions = []
+    for clause in re.split(r'\s+AND\s+', where, flags=re.IGNORECASE):
+        match = _CONDITION_RE.match(clause.strip().strip('()'))
+        if not match:
+            raise ValueError(f"Unsupported condition in stand-in YQL: {clause}")
+        column, op, value = match.groups()
+        conditions.append((column, op, _literal(value, params)))
+    return conditions
+
+
+def _matches(row: Dict[str, Any], conditions) -> bool:
+    for column, op, expected in conditions:
+        actual = row.get(column)
+        if op in ('=', '=='):
+            ok = actual == expected
+        elif op in ('!=', '<>'):
+            ok = actual != expected
+        elif actual is None or expected is None:
+            ok = False
+        elif op == '<':
+            ok = actual < expected
+        elif op == '>':
+            ok = actual > expected
+        elif op == '<=':
+            ok = actual <= expected
+        else:
+            ok = actual >= expected
+        if not ok:
+            return False
+    return True
+
+
+def _candidate_rows(table: Table, conditions):
+    # Point lookups by full primary key avoid scanning the table.
+    equalities = {column: value for column, op, value in conditions if op in ('=', '==')}
+    if table.primary_key and all(column in equalities for column in table.primary_key):
+        row = table.rows.get(tuple(equalities[column] for column in table.primary_key))
+        return [row] if row is not None else []
+    return table.rows.values()
+
+
+def _execute_statement(db: Database, statement: str, params: Dict[str, Any]) -> Optional[ResultSet]:
+    upper = statement.upper()
+
+    if upper.startswith('SELECT'):
+        match = _SELECT_RE.match(statement)
+        if not match:
+            raise ValueError(f"Unsupported SELECT in stand-in YQL: {statement}")
+        table = db.table(_table_name(match.group('table')))
+        conditions = _conditions(match.group('where'), params)
+        rows = [row for row in _candidate_rows(table, conditions) if _matches(row, conditions)]
+
+        if match.group('order'):
+            for order in reversed(_split_top_level(match.group('order'), ',')):
+                parts = order.split()
+                descending = len(parts) > 1 and parts[1].upper() == 'DESC'
+                rows.sort(key=lambda r, c=parts[0]: (r.get(c) is not None, r.get(c)), reverse=descending)
+        if match.group('limit'):
+            rows = rows[:int(_literal(match.group('limit'), params))]
+
+        columns = _split_top_level(match.group('columns'), ',')
+        truncated = False
+        if not any(_COUNT_RE.match(_ALIAS_RE.sub(r'\1', column).strip()) for column in columns) and len(rows) > RESULT_ROW_LIMIT:
+            rows = rows[:RESULT_ROW_LIMIT]
+            truncated = True
+        if len(columns) == 1 and columns[0] == '*':
+            return _result([Row(row) for row in rows], truncated)
+
+        projected_aggregate = []
+        projections = []
+        for column in columns:
+            alias_match = _ALIAS_RE.match(column)
+            expression, alias = (alias_match.group(1), alias_match.group(2)) if alias_match else (column, column)
+            if _COUNT_RE.match(expression.strip()):
+                projected_aggregate.append((alias, len(rows)))
+            else:
+                projections.append((expression.strip(), alias))
+        if match.group('group'):
+            # One row per group; COUNT(*) counts its rows, other columns come from its first row
+            groups: Dict[Any, List[Dict[str, Any]]] = {}
+            for row in rows:
+                groups.setdefault(row.get(match.group('group')), []).append(row)
+            return ResultSet([
+                Row([(alias, group[0].get(expression)) for expression, alias in projections]
+                    + [(alias, len(group)) for alias, _ in projected_aggregate])
+                for group in groups.values()
+            ])
+        if projected_aggregate:
+            return ResultSet([Row(projected_aggregate)])
+        return _result([Row((alias, row.get(expression)) for expression, alias in projections) for row in rows], truncated)
+
+    match = _VALUES_RE.match(statement)
+    if match:
+        table_name = _table_name(match.group('table'))
+        columns = [column.strip() for column in match.group('columns').split(',')]
+        table = db.table(table_name, columns[0])
+        for values in _split_top_level(match.group('values'), ','):
+            row = dict(zip(columns, (_literal(value, params) for value in _split_top_level(values.strip()[1:-1], ','))))
+            _write_row(table, row, match.group('verb').upper())
+        return None
+
+    match = _AS_TABLE_RE.match(statement)
+    if match:
+        rows = params.get(match.group('param')) or []
+        table = db.table(_table_name(match.group('table')), next(iter(rows[0])) if rows else None)
+        for row in rows:
+            _write_row(table, dict(row), match.group('verb').upper())
+        return None
+
+    match = _AS_TABLE_JOIN_RE.match(statement)
+    if match:
+        # Each parameter row joined to the table row it points at: "d.x" / "c.x" columns
+        table = db.table(_table_name(match.group('table')))
+        source, target = match.group('source'), match.group('target')
+        pairs = []
+        for clause in re.split(r'\s+AND\s+', match.group('on'), flags=re.IGNORECASE):
+            left, right = (side.strip() for side in clause.split('='))
+            if left.startswith(f'{target}.'):
+                left, right = right, left
+            pairs.append((left[len(source) + 1:], right[len(target) + 1:]))
+        columns = []
+        for column in _split_top_level(match.group('columns'), ','):
+            expression, alias = _ALIAS_RE.match(column).groups()
+            columns.append((expression.strip(), alias))
+        for param_row in params.get(match.group('param')) or []:
+            key = {target_column: param_row[source_column] for source_column, target_column in pairs}
+            existing = table.rows.get(tuple(key.get(column) for column in table.primary_key)) or {}
+            scope = {f'{source}.{k}': v for k, v in param_row.items()}
+            scope.update({f'{target}.{k}': v for k, v in existing.items()})
+            _write_row(table, {alias: _literal(expression, params, scope) for expression, alias in columns},
+                       match.group('verb').upper())
+        return None
+
+    match = _UPDATE_ON_RE.match(statement)
+    if match:
+        # Updates existing rows only; parameter rows without a table row are ignored
+        table = db.table(_table_name(match.group('table')))
+        for row in params.get(match.group('param')) or []:
+            existing = table.rows.get(table.key_of(row))
+            if existing is not None:
+                existing.update(row)
+        return None
+
+    match = _UPDATE_RE.match(statement)
+    if match:
+        table = db.table(_table_name(match.group('table')))
+        conditions = _conditions(match.group('where'), params)
+        assignments = []
+        for assignment in _split_top_level(match.group('assignments'), ','):
+            column, expression = assignment.split('=', 1)
+            assignments.append((column.strip(), expression.strip()))
+        for row in list(_candidate_rows(table, conditions)):
+            if _matches(row, conditions):
+                updates = {column: _literal(expression, params, row) for column, expression in assignments}
+                row.update(updates)
+        return None
+
+    match = _DELETE_RE.match(statement)
+    if match:
+        table = db.table(_table_name(match.group('table')))
+        conditions = _conditions(match.group('where'), params)
+        for key, row in list(table.rows.items()):
+            if _matches(row, conditions):
+                del table.rows[key]
+        return None
+
+    raise ValueError(f"Unsupported statement in stand-in YQL: {statement}")
+
+
+def _result(rows: List[Row], truncated: bool) -> ResultSet:
+    result = ResultSet(rows)
+    result.truncated = truncated
+    return result
+
+
+def _write_row(table: Table, row: Dict[str, Any], verb: str) -> None:
+    key = table.key_of(row)
+    existing = table.rows.get(key)
+    if verb == 'INSERT' and existing is not None:
+        raise PreconditionFailed(f"Duplicate key {key} in table {table.name}")
+    if verb == 'UPSERT' and existing is not None:
+        existing.update(row)
+    else:
+        table.rows[key] = dict(row)
+
+
+def _execute_scheme(db: Database, ddl: str) -> None:
+    for statement in _split_statements(ddl):
+        match = _CREATE_RE.match(statement)
+        if match:
+            primary_key = _PRIMARY_KEY_RE.search(match.group('body'))
+            columns = [column.strip() for column in primary_key.group(1).split(',')] if primary_key else ['id']
+            db.create_table(_table_name(match.group('table')), columns)
+        elif statement.upper().startswith('ALTER TABLE') or statement.upper().startswith('DROP TABLE'):
+            continue
+        else:
+            raise ValueError(f"Unsupported scheme statement in stand-in YQL: {statement}")
+
+
+# --- SDK surface -------------------------------------------------------------
+
+class PreconditionFailed(Exception):
+    pass
+
+
+class Transaction:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def execute(self, query, parameters=None, commit_tx=False, settings=None):
+        return self.db.execute(query, parameters)
+
+    def commit(self, settings=None):
+        return None
+
+    def rollback(self, settings=None):
+        return None
+
+
+class Session:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def prepare(self, query, settings=None):
+        return query
+
+    def transaction(self, tx_mode=None):
+        return Transaction(self.db)
+
+    def execute_scheme(self, ddl, settings=None):
+        _execute_scheme(self.db, ddl)
+
+    def delete(self):
+        return None
+
+
+class Driver:
+    def __init__(self, driver_config=None, endpoint=None, database=None, credentials=None, **kwargs):
+        self.db = DATABASE
+
+    def wait(self, timeout=None, fail_fast=False):
+        if self.db.connect_latency:
+            time.sleep(self.db.connect_latency)
+        return True
+
+    def stop(self, timeout=None):
+        return None
+
+
+class SessionPool:
+    def __init__(self, driver, size=100, **kwargs):
+        self.db = driver.db
+
+    def retry_operation_sync(self, callee, retry_settings=None, *args, **kwargs):
+        return callee(Session(self.db), *args, **kwargs)
+
+    def stop(self, timeout=None):
+        return None
+
+
+class AsyncTransaction(Transaction):
+    async def execute(self, query, parameters=None, commit_tx=False, settings=None):
+        return await self.db.execute_async(query, parameters)
+
+    async def commit(self, settings=None):
+        return None
+
+    async def rollback(self, settings=None):
+        return None
+
+
+class AsyncSession(Session):
+    async def prepare(self, query, settings=None):
+        return query
+
+    def transaction(self, tx_mode=None):
+        return AsyncTransaction(self.db)
+
+
+class AsyncDriver(Driver):
+    async def wait(self, timeout=None, fail_fast=False):
+        if self.db.connect_latency:
+            await asyncio.sleep(self.db.connect_latency)
+        return True
+
+    async def stop(self, timeout=None):
+        return None
+
+
+class AsyncSessionPool(SessionPool):
+    async def retry_operation(self, callee, *args, retry_settings=None, **kwargs):
+        return await callee(AsyncSession(self.db), *args, **kwargs)
+
+    async def stop(self, timeout=None):
+        return None
+
+
+class DriverConfig:
+    def __init__(self, endpoint=None, database=None, credentials=None, **kwargs):
+        self.endpoint = endpoint
+        self.database = database
+        self.credentials = credentials
+
+
+class TableClientSettings:
+    def with_client_query_cache(self, enabled):
+        return self
+
+
+class SerializableReadWrite:
+    pass
+
+
+class OnlineReadOnly:
+    pass
+
+
+class StaleReadOnly:
+    pass
+
+
+class MetadataUrlCredentials:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+def build_module() -> types.ModuleType:
+    module = types.ModuleType('ydb')
+    iam = types.ModuleType('ydb.iam')
+    iam.MetadataUrlCredentials = MetadataUrlCredentials
+    module.iam = iam
+    aio = types.ModuleType('ydb.aio')
+    aio.Driver = AsyncDriver
+    aio.SessionPool = AsyncSessionPool
+    module.aio = aio
+    for name in ('Driver', 'DriverConfig', 'SessionPool', 'SerializableReadWrite', 'OnlineReadOnly',
+                 'StaleReadOnly', 'PreconditionFailed', 'Row', 'ResultSet', 'TableClientSettings'):
+        setattr(module, name, globals()[name])
+    module.DATABASE = DATABASE
+    return module
+
+
+def install(*modules: types.ModuleType) -> types.ModuleType:
+    """Replace the `ydb` attribute of already imported modules with the stand-in."""
+    fake = build_module()
+    for module in modules:
+        module.ydb = fake
+    return fake
+
+
+def install_global() -> types.ModuleType:
+    """Register the stand-in as `ydb`/`ydb.iam`/`ydb.aio` in sys.modules for modules imported afterwards."""
+    fake = build_module()
+    sys.modules['ydb'] = fake
+    sys.modules['ydb.iam'] = fake.iam
+    sys.modules['ydb.aio'] = fake.aio
+    return fake
@@ -0,0 +1,420 @@
+"""
+Local HTTP stand-ins for the external services the worker talks to.
+
+- DiskService: the public Yandex Disk API (`cloud-api.yandex.net`) plus the
+  file download host it redirects to.
+- S3Service: a path-style S3-compatible object store covering the calls
+  boto3 makes for this repository (put/get/head/delete, ranged gets,
+  multipart uploads, ListObjectsV2).
+- SpeechKitService: `longRunningRecognize` and the operation API with
+  configurable recognition latency.
+
+Every service counts requests and body bytes in both directions so the
+benchmarks can report network volume per stage.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import escape as xml_escape
+
+S3_NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+STATS_PATH = "/__stats"
+
+SAMPLE_WORDS = (
+    "сегодня мы рассмотрим основные понятия алгоритмов и структур данных "
+    "сложность операций зависит от выбранного представления например массив "
+    "или связный список позволяют по разному реализовать вставку и поиск"
+).split()
+
+
+class TrafficStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def add(self, bytes_in: int = 0, bytes_out: int = 0, requests: int = 0) -> None:
+        with self.lock:
+            self.requests += requests
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {"requests": self.requests, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+    def reset(self) -> None:
+        with self.lock:
+            self.requests = self.bytes_in = self.bytes_out = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service: "LocalService" = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.service.stats.add(bytes_in=len(body))
+        return body
+
+    def respond(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None,
+                content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD" and body:
+            self.wfile.write(body)
+            if self.path != STATS_PATH:
+                self.service.stats.add(bytes_out=len(body))
+
+    def respond_json(self, status: int, payload) -> None:
+        self.respond(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+    def dispatch(self) -> None:
+        if self.path == STATS_PATH:
+            # Out-of-band counters for harnesses running in another process; not counted as traffic.
+            body = json.dumps(self.service.stats.snapshot()).encode("utf-8")
+            return self.respond(200, body)
+        self.service.stats.add(requests=1)
+        try:
+            self.service.handle(self)
+        except Exception as e:
+            self.respond_json(500, {"error": str(e)})
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = dispatch
+
+
+class LocalService:
+    """Base class: a threaded HTTP server on 127.0.0.1 with an ephemeral port."""
+
+    def __init__(self):
+        self.stats = TrafficStats()
+        handler = type(f"{type(self).__name__}Handler", (_Handler,), {"service": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "LocalService":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, request: _Handler) -> None:
+        raise NotImplementedError
+
+
+class DiskService(LocalService):
+    """
+    Public Yandex Disk API backed by local files; links look like https://disk.yandex.ru/i/<name>.
+
+    With `synthetic_metadata` unknown links still get resource metadata
+    (size and duration derived from the link), for load tests that only
+    probe metadata.
+    """
+
+    def __init__(self, synthetic_metadata: bool = False):
+        super().__init__()
+        self.files: Dict[str, str] = {}
+        self.durations: Dict[str, float] = {}
+        self.synthetic_metadata = synthetic_metadata
+
+    def add_file(self, path: str, duration: Optional[float] = None) -> str:
+        name = os.path.basename(path)
+        self.files[name] = path
+        if duration is not None:
+            self.durations[name] = duration
+        return f"https://disk.yandex.ru/i/{name}"
+
+    def _synthetic_resource(self, public_key: str) -> dict:
+        # 5-180 minute lectures at ~1 MB per minute
+        minutes = 5 + zlib.crc32(public_key.encode("utf-8")) % 176
+        return {
+            "name": public_key.rsplit("/", 1)[-1] + ".mp4",
+            "public_key": public_key,
+            "mime_type": "video/mp4",
+            "media_type": "video",
+            "size": minutes * 1024 * 1024,
+            "type": "file",
+            "video_metadata": {"duration": minutes * 60 * 1000},
+        }
+
+    def _resolve(self, public_key: str) -> Optional[str]:
+        return self.files.get(public_key.rstrip("/").rsplit("/", 1)[-1])
+
+    def handle(self, request: _Handler) -> None:
+        parsed = urlparse(request.path)
+        query = parse_qs(parsed.query)
+        public_key = query.get("public_key", [""])[0]
+
+        if parsed.path == "/v1/disk/public/resources":
+            path = self._resolve(public_key)
+            if not path:
+                if self.synthetic_metadata and public_key:
+                    return request.respond_json(200, self._synthetic_resource(public_key))
+                return request.respond_json(404, {"error": "DiskNotFoundError"})
+            name = os.path.basename(path)
+            resource = {
+                "name": name,
+                "public_key": public_key,
+                "mime_type": "video/mp4",
+                "media_type": "video",
+                "size": os.path.getsize(path),
+                "type": "file",
+            }
+            if name in self.durations:
+                resource["video_metadata"] = {"duration": int(self.durations[name] * 1000)}
+            return request.respond_json(200, resource)
+
+        if parsed.path == "/v1/disk/public/resources/download":
+            path = self._resolve(public_key)
+            if not path:
+                return request.respond_json(404, {"error": "DiskNotFoundError"})
+            return request.respond_json(200, {"href": f"{self.url}/files/{os.path.basename(path)}", "method": "GET"})
+
+        if parsed.path.startswith("/files/"):
+            path = self.files.get(unquote(parsed.path[len("/files/"):]))
+            if not path:
+                return request.respond_json(404, {"error": "not found"})
+            size = os.path.getsize(path)
+            request.send_response(200)
+            request.send_header("Content-Type", "video/mp4")
+            request.send_header("Content-Length", str(size))
+            request.end_headers()
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    request.wfile.write(chunk)
+                    self.stats.add(bytes_out=len(chunk))
+            return None
+
+        request.respond_json(404, {"error": "unknown path"})
+
+
+class S3Service(LocalService):
+    """Path-style S3 subset: objects live in memory as bytes."""
+
+    def __init__(self):
+        super().__init__()
+        self.objects: Dict[str, Dict[str, bytes]] = {}
+        self.uploads: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def get_object(self, bucket: str, key: str) -> Optional[bytes]:
+        return self.objects.get(bucket, {}).get(key)
+
+    def object_url(self, bucket: str, key: str) -> str:
+        return f"{self.url}/{bucket}/{key}"
+
+    def _xml(self, request: _Handler, status: int, root: str, fields: str) -> None:
+        body = f'<?xml version="1.0" encoding="UTF-8"?><{root} xmlns="{S3_NS}">{fields}</{root}>'
+        request.respond(status, body.encode("utf-8"), content_type="application/xml")
+
+    def _error(self, request: _Handler, status: int, code: str) -> None:
+        body = f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code><Message>{code}</Message></Error>'
+        request.respond(status, body.encode("utf-8"), content_type="application/xml")
+
+    def handle(self, request: _Handler) -> None:
+        parsed = urlparse(request.path)
+        query = parse_qs(parsed.query, keep_blank_values=True)
+        bucket, _, key = unquote(parsed.path).lstrip("/").partition("/")
+        method = request.command
+
+        if method == "GET" and not key:
+            return self._list(request, bucket, query)
+        if method == "GET" and "uploadId" in query:
+            return self._list_parts(request, bucket, key, query["uploadId"][0])
+
+        if method == "PUT":
+            body = request.read_body()
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if "uploadId" in query:
+                with self.lock:
+                    self.uploads[query["uploadId"][0]]["parts"][int(query["partNumber"][0])] = body
+            else:
+                with self.lock:
+                    self.objects.setdefault(bucket, {})[key] = body
+            return request.respond(200, headers={"ETag": etag}, content_type="application/xml")
+
+        if method == "POST":
+            request.read_body()
+            if "uploads" in query:
+                upload_id = uuid.uuid4().hex
+                with self.lock:
+                    self.uploads[upload_id] = {"bucket": bucket, "key": key, "parts": {}}
+                return self._xml(request, 200, "InitiateMultipartUploadResult",
+                                 f"<Bucket>{bucket}</Bucket><Key>{xml_escape(key)}</Key><UploadId>{upload_id}</UploadId>")
+            if "uploadId" in query:
+                with self.lock:
+                    upload = self.uploads.pop(query["uploadId"][0], None)
+                    if upload is None:
+                        return self._error(request, 404, "NoSuchUpload")
+                    body = b"".join(upload["parts"][number] for number in sorted(upload["parts"]))
+                    self.objects.setdefault(bucket, {})[key] = body
+                etag = f'"{hashlib.md5(body).hexdigest()}-{len(upload["parts"])}"'
+                return self._xml(request, 200, "CompleteMultipartUploadResult",
+                                 f"<Bucket>{bucket}</Bucket><Key>{xml_escape(key)}</Key><ETag>{xml_escape(etag)}</ETag>")
+            return self._error(request, 400, "NotImplemented")
+
+        if method == "DELETE":
+            with self.lock:
+                if "uploadId" in query:
+                    self.uploads.pop(query["uploadId"][0], None)
+                else:
+                    self.objects.get(bucket, {}).pop(key, None)
+            return request.respond(204, content_type="application/xml")
+
+        data = self.get_object(bucket, key)
+        if data is None:
+            if method == "HEAD":
+                return request.respond(404, content_type="application/xml")
+            return self._error(request, 404, "NoSuchKey")
+
+        headers = {
+            "ETag": f'"{hashlib.md5(data).hexdigest()}"',
+            "Last-Modified": formatdate(usegmt=True),
+            "Accept-Ranges": "bytes",
+        }
+        if method == "HEAD":
+            request.send_response(200)
+            request.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                request.send_header(name, value)
+            request.end_headers()
+            return None
+
+        byte_range = request.headers.get("Range")
+        if byte_range and byte_range.startswith("bytes="):
+            start_text, _, end_text = byte_range[len("bytes="):].partition("-")
+            start = int(start_text)
+            end = min(int(end_text) if end_text else len(data) - 1, len(data) - 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            return request.respond(206, data[start:end + 1], headers, "application/octet-stream")
+        request.respond(200, data, headers, "application/octet-stream")
+
+    def _list(self, request: _Handler, bucket: str, query) -> None:
+        prefix = query.get("prefix", [""])[0]
+        with self.lock:
+            items = sorted((key, len(value)) for key, value in self.objects.get(bucket, {}).items() if key.startswith(prefix))
+        contents = "".join(
+            f"<Contents><Key>{xml_escape(key)}</Key><Size>{size}</Size>"
+            f"<LastModified>2026-01-01T00:00:00.000Z</LastModified><ETag>&quot;0&quot;</ETag></Contents>"
+            for key, size in items
+        )
+        self._xml(request, 200, "ListBucketResult",
+                  f"<Name>{bucket}</Name><Prefix>{xml_escape(prefix)}</Prefix><KeyCount>{len(items)}</KeyCount>"
+                  f"<MaxKeys>1000</MaxKeys><IsTruncated>false</IsTruncated>{contents}")
+
+
+    def _list_parts(self, request: _Handler, bucket: str, key: str, upload_id: str) -> None:
+        with self.lock:
+            upload = self.uploads.get(upload_id)
+            parts = sorted(upload["parts"].items()) if upload else None
+        if parts is None:
+            return self._error(request, 404, "NoSuchUpload")
+        contents = "".join(
+            f"<Part><PartNumber>{number}</PartNumber><ETag>&quot;{hashlib.md5(body).hexdigest()}&quot;</ETag>"
+            f"<Size>{len(body)}</Size></Part>"
+            for number, body in parts
+        )
+        self._xml(request, 200, "ListPartsResult",
+                  f"<Bucket>{bucket}</Bucket><Key>{xml_escape(key)}</Key><UploadId>{upload_id}</UploadId>"
+                  f"<IsTruncated>false</IsTruncated>{contents}")
+
+
+class SpeechKitService(LocalService):
+    """
+    SpeechKit v2 long-running recognition plus the operation API.
+
+    An operation completes `base_latency + latency_per_audio_second * duration`
+    seconds after submission. Audio duration is derived from the 16 kHz mono
+    PCM WAV object the worker uploaded to the S3 stand-in.
+    """
+
+    def __init__(self, s3: S3Service, base_latency: float = 0.5, latency_per_audio_second: float = 0.0):
+        super().__init__()
+        self.s3 = s3
+        self.base_latency = base_latency
+        self.latency_per_audio_second = latency_per_audio_second
+        self.operations: Dict[str, Dict] = {}
+        self.polls = 0
+
+    def _audio_duration(self, uri: str) -> float:
+        bucket, _, key = urlparse(uri).path.lstrip("/").partition("/")
+        data = self.s3.get_object(bucket, unquote(key)) or b""
+        return max(len(data) - 44, 0) / (16000 * 2)
+
+    def handle(self, request: _Handler) -> None:
+        parsed = urlparse(request.path)
+
+        if request.command == "POST" and parsed.path.endswith("/longRunningRecognize"):
+            payload = json.loads(request.read_body() or b"{}")
+            duration = self._audio_duration(payload.get("audio", {}).get("uri", ""))
+            operation_id = uuid.uuid4().hex
+            self.operations[operation_id] = {
+                "ready_at": time.monotonic() + self.base_latency + self.latency_per_audio_second * duration,
+                "duration": duration,
+            }
+            return request.respond_json(200, {"id": operation_id, "done": False})
+
+        if request.command == "GET" and parsed.path.startswith("/operations/"):
+            self.polls += 1
+            operation = self.operations.get(parsed.path.rsplit("/", 1)[-1])
+            if not operation:
+                return request.respond_json(404, {"error": "operation not found"})
+            if time.monotonic() < operation["ready_at"]:
+                return request.respond_json(200, {"id": parsed.path.rsplit("/", 1)[-1], "done": False})
+            return request.respond_json(200, {"done": True, "response": {"chunks": synthetic_chunks(operation["duration"])}})
+
+        request.respond_json(404, {"error": "unknown path"})
+
+
+def synthetic_chunks(duration: float, chunk_seconds: float = 10.0, words_per_second: float = 2.0):
+    chunks = []
+    start = 0.0
+    word_index = 0
+    while start < duration:
+        end = min(start + chunk_seconds, duration)
+        count = max(1, int((end - start) * words_per_second))
+        step = (end - start) / count
+        words = []
+        for i in range(count):
+            word = SAMPLE_WORDS[word_index % len(SAMPLE_WORDS)]
+            word_index += 1
+            words.append({
+                "startTime": f"{start + i * step:.3f}s",
+                "endTime": f"{start + (i + 1) * step:.3f}s",
+                "word": word,
+                "confidence": 1,
+            })
+        chunks.append({
+            "alternatives": [{"words": words, "text": " ".join(w["word"] for w in words), "confidence": 1}],
+            "channelTag": "1",
+        })
+        start = end
+    return chunks
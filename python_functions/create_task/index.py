@@ -1,20 +1,93 @@
 """
 Cloud Function: Create Task
-Handles POST /tasks requests
+Handles POST /tasks requests and direct video uploads:
+POST /api/uploads, GET /api/uploads/{task_id}, POST /api/uploads/{task_id}/complete
 """
 import json
+import math
 import os
+import time
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+from urllib.request import urlopen
 import ydb
 import ydb.iam
 import boto3
+from botocore.exceptions import ClientError
+
+
+TASKS_ADDED_COLUMNS = [
+    ('summary_key', 'Utf8'),
+    ('summary_sha256', 'Utf8'),
+    ('stage_timings', 'Utf8'),
+    ('size_bytes', 'Uint64'),
+    ('duration_seconds', 'Double'),
+    ('lane', 'Utf8'),
+    ('summary_model', 'Utf8'),
+    ('summary_input_tokens', 'Uint64'),
+    ('summary_output_tokens', 'Uint64'),
+    ('summary_latency_ms', 'Double'),
+    ('upload_key', 'Utf8'),
+    ('upload_id', 'Utf8'),
+    ('progress', 'Utf8'),
+]
+
+# Secondary index on (lane, status, created_at), read by the worker's scheduler
+TASKS_LANE_INDEX = 'idx_lane_status_created'
+
+DISK_API_URL = os.environ.get('DISK_API_URL', 'https://cloud-api.yandex.net')
+DISK_PROBE_TIMEOUT_SECONDS = 3
+
+# Tasks at or under these limits go to the short lane; duration wins when Disk reports it
+SHORT_LANE_MAX_SECONDS = float(os.environ.get('SHORT_LANE_MAX_SECONDS', '1800'))
+SHORT_LANE_MAX_BYTES = int(os.environ.get('SHORT_LANE_MAX_BYTES', str(100 * 1024 * 1024)))
+
+# Direct uploads: the client PUTs parts straight to Object Storage with presigned URLs
+UPLOAD_PART_SIZE = int(os.environ.get('UPLOAD_PART_SIZE', str(16 * 1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', str(200 * 1024 * 1024)))
+UPLOAD_URL_EXPIRES_SECONDS = 3600
+
+# Admission control: estimated wait = tasks waiting in the lane's queue * average task time
+# / tasks the lane processes at once. Over MAX_BACKLOG_SECONDS new tasks get 429; 0 turns it off
+MAX_BACKLOG_SECONDS = int(os.environ.get('MAX_BACKLOG_SECONDS', '7200'))
+LANE_PARALLELISM = {
+    'short': int(os.environ.get('SHORT_LANE_PARALLELISM', '4')),
+    'long': int(os.environ.get('LONG_LANE_PARALLELISM', '2')),
+}
+# Used until the worker has recorded task durations in task_counters
+DEFAULT_TASK_SECONDS = {'short': 300.0, 'long': 1200.0}
+TASK_DURATION_DAYS = 3
+BACKLOG_CACHE_SECONDS = 15
+
+# Adds each delta to its task_counters row (a missing row counts as 0), as the worker does
+UPSERT_COUNTERS = """
+    UPSERT INTO task_counters
+    SELECT d.period AS period, d.name AS name, COALESCE(c.value, 0) + d.delta AS value
+    FROM AS_TABLE($counters) AS d
+    LEFT JOIN task_counters AS c ON d.period = c.period AND d.name = c.name;
+"""
+
+# task_counters row marking that the "current" status counts were seeded from the tasks table
+STATUSES_SEEDED = 'statuses_seeded'
+
+_schema_ready = False
+# Lane -> (expires at, tasks waiting, average task seconds), per warm instance
+_backlog_cache = {}
+
+
+class BacklogFull(Exception):
+    """The lane's backlog is over MAX_BACKLOG_SECONDS; retry_after is in seconds"""
+    
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 def ensure_table_exists(pool):
     """
-    Ensure the tasks table exists in YDB.
-    Creates it if it doesn't exist.
+    Ensure the tasks, task_stages, rate_limits, task_counters and search_segments tables exist in YDB.
+    Creates them if they don't exist.
     """
     def create_table(session):
         session.execute_scheme("""
@@ -27,7 +100,62 @@ def ensure_table_exists(pool):
                 updated_at Utf8,
                 error_message Utf8,
                 pdf_key Utf8,
-                PRIMARY KEY (task_id)
+                summary_key Utf8,
+                summary_sha256 Utf8,
+                stage_timings Utf8,
+                size_bytes Uint64,
+                duration_seconds Double,
+                lane Utf8,
+                summary_model Utf8,
+                summary_input_tokens Uint64,
+                summary_output_tokens Uint64,
+                summary_latency_ms Double,
+                upload_key Utf8,
+                upload_id Utf8,
+                progress Utf8,
+                PRIMARY KEY (task_id),
+                INDEX idx_lane_status_created GLOBAL ASYNC ON (lane, status, created_at)
+            );
+        """)
+        session.execute_scheme("""
+            CREATE TABLE IF NOT EXISTS task_stages (
+                task_id Utf8,
+                stage Utf8,
+                started_at Utf8,
+                status Utf8,
+                wall_ms Double,
+                cpu_ms Double,
+                bytes_in Uint64,
+                bytes_out Uint64,
+                peak_rss_kb Uint64,
+                children_peak_rss_kb Uint64,
+                PRIMARY KEY (task_id, stage)
+            );
+        """)
+        session.execute_scheme("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                bucket Utf8,
+                tokens Double,
+                refreshed_at Double,
+                PRIMARY KEY (bucket)
+            );
+        """)
+        session.execute_scheme("""
+            CREATE TABLE IF NOT EXISTS task_counters (
+                period Utf8,
+                name Utf8,
+                value Int64,
+                PRIMARY KEY (period, name)
+            );
+        """)
+        session.execute_scheme("""
+            CREATE TABLE IF NOT EXISTS search_segments (
+                segment Utf8,
+                level Uint32,
+                docs Uint32,
+                size_bytes Uint64,
+                created_at Utf8,
+                PRIMARY KEY (segment)
             );
         """)
     
@@ -36,6 +164,102 @@ def ensure_table_exists(pool):
     except Exception as e:
         # Table might already exist, that's okay
         print(f"Table creation note: {e}")
+    
+    # Columns added after the initial schema; existing tables need them too
+    for column, column_type in TASKS_ADDED_COLUMNS:
+        def add_column(session):
+            session.execute_scheme(f"ALTER TABLE tasks ADD COLUMN {column} {column_type};")
+        
+        try:
+            pool.retry_operation_sync(add_column)
+        except Exception as e:
+            # Column already exists, that's okay
+            print(f"Column migration note: {e}")
+    
+    # Lets the worker's scheduler find aged queued tasks of a lane without scanning tasks
+    def add_index(session):
+        session.execute_scheme(f"ALTER TABLE tasks ADD INDEX {TASKS_LANE_INDEX} GLOBAL ASYNC ON (lane, status, created_at);")
+    
+    try:
+        pool.retry_operation_sync(add_index)
+    except Exception as e:
+        # Index already exists, that's okay
+        print(f"Index migration note: {e}")
+    
+    try:
+        seed_status_counters(pool)
+    except Exception as e:
+        print(f"Counter seeding note: {e}")
+
+
+def seed_status_counters(pool) -> bool:
+    """
+    Set the "current" status counts from the tasks table, once per database.
+    
+    The counts are otherwise only changed by deltas, so tasks created before
+    task_counters existed would drive them negative as they move on. Runs in
+    one serializable transaction: a concurrent status change aborts it and
+    the retry counts again.
+    """
+    def callee(session):
+        tx = session.transaction(ydb.SerializableReadWrite())
+        select_query = session.prepare(
+            """
+            SELECT name, value FROM task_counters WHERE period = 'current';
+            SELECT status, COUNT(*) AS tasks FROM tasks GROUP BY status;
+            """
+        )
+        counter_rows, status_rows = tx.execute(select_query, {})
+        current = {row.name for row in counter_rows.rows}
+        if STATUSES_SEEDED in current:
+            tx.commit()
+            return False
+        
+        counts = {f'status:{row.status}': row.tasks for row in status_rows.rows if row.status}
+        names = counts.keys() | {name for name in current if name.startswith('status:')}
+        rows = [{'period': 'current', 'name': name, 'value': counts.get(name, 0)} for name in sorted(names)]
+        rows.append({'period': 'current', 'name': STATUSES_SEEDED, 'value': 1})
+        upsert_query = session.prepare(
+            """
+            DECLARE $rows AS List<Struct<period: Utf8, name: Utf8, value: Int64>>;
+            UPSERT INTO task_counters SELECT * FROM AS_TABLE($rows);
+            """
+        )
+        tx.execute(upsert_query, {'$rows': rows}, commit_tx=True)
+        return True
+    
+    return pool.retry_operation_sync(callee)
+
+
+def probe_video_metadata(video_link: str):
+    """
+    Fetch size and duration of a public Disk resource.
+    
+    Returns:
+        tuple: (size in bytes, duration in seconds); either is None when unknown
+    """
+    query = urlencode({'public_key': video_link, 'fields': 'size,video_metadata'})
+    try:
+        with urlopen(f'{DISK_API_URL}/v1/disk/public/resources?{query}', timeout=DISK_PROBE_TIMEOUT_SECONDS) as response:
+            metadata = json.loads(response.read())
+    except Exception as e:
+        # The worker validates the link and reports the error; routing just falls back
+        print(f"Disk metadata probe failed: {e}")
+        return None, None
+    
+    size = metadata.get('size')
+    # Disk reports video duration in milliseconds
+    duration_ms = (metadata.get('video_metadata') or {}).get('duration')
+    return size, duration_ms / 1000 if duration_ms else None
+
+
+def choose_lane(size_bytes, duration_seconds) -> str:
+    """Route a task to the short or long lane; unknown sizes go to the long lane"""
+    if duration_seconds is not None:
+        return 'short' if duration_seconds <= SHORT_LANE_MAX_SECONDS else 'long'
+    if size_bytes is not None:
+        return 'short' if size_bytes <= SHORT_LANE_MAX_BYTES else 'long'
+    return 'long'
 
 
 def validate_non_empty(value: str, field_name: str) -> None:
@@ -44,150 +268,578 @@ def validate_non_empty(value: str, field_name: str) -> None:
         raise ValueError(f"{field_name} cannot be empty")
 
 
-def handler(event, context):
+def json_response(status_code: int, payload: dict) -> dict:
+    return {
+        'statusCode': status_code,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps(payload),
+    }
+
+
+def parse_request(event) -> dict:
+    """Decode the request body - handles both JSON and form-urlencoded"""
+    body = event.get('body', '')
+    is_base64 = event.get('isBase64Encoded', False)
+    
+    # Decode base64 if needed
+    if is_base64 and isinstance(body, str):
+        import base64
+        body = base64.b64decode(body).decode('utf-8')
+    
+    headers = event.get('headers', {}) or {}
+    
+    # Normalize header keys to lowercase
+    headers_lower = {k.lower(): v for k, v in headers.items()}
+    content_type = headers_lower.get('content-type', '')
+    
+    if 'application/x-www-form-urlencoded' in content_type or not content_type:
+        # Parse form data
+        from urllib.parse import parse_qs
+        if isinstance(body, str) and body:
+            return {key: values[0] for key, values in parse_qs(body).items()}
+        return {}
+    
+    # Parse JSON
+    if isinstance(body, str) and body:
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError:
+            return {}
+    return body if body else {}
+
+
+def connect_ydb():
+    """Open a YDB driver and session pool, creating the schema once per warm instance"""
+    driver = ydb.Driver(
+        endpoint=os.environ['YDB_ENDPOINT'],
+        database=os.environ['YDB_DATABASE'],
+        credentials=ydb.iam.MetadataUrlCredentials(),
+    )
+    driver.wait(fail_fast=True, timeout=5)
+    pool = ydb.SessionPool(driver)
+    
+    # Ensure table exists (idempotent operation)
+    global _schema_ready
+    if not _schema_ready:
+        ensure_table_exists(pool)
+        _schema_ready = True
+    return driver, pool
+
+
+def sqs_client():
+    return boto3.client(
+        'sqs',
+        endpoint_url=os.environ.get('MQ_ENDPOINT', 'https://message-queue.api.cloud.yandex.net'),
+        region_name=os.environ.get('AWS_REGION', 'ru-central1'),
+    )
+
+
+def lane_queue_url(lane: str) -> str:
+    queue_url = os.environ['MQ_QUEUE_URL']
+    return queue_url if lane == 'short' else os.environ.get('MQ_LONG_QUEUE_URL') or queue_url
+
+
+def enqueue_task(task_id: str, lane: str) -> None:
+    """Send the task to the Message Queue of its lane"""
+    sqs_client().send_message(
+        QueueUrl=lane_queue_url(lane),
+        MessageBody=json.dumps({'task_id': task_id, 'lane': lane}),
+    )
+
+
+def average_task_seconds(pool, lane: str) -> float:
+    """Mean processing time of the lane's tasks over the last TASK_DURATION_DAYS, from task_counters"""
+    today = datetime.now(timezone.utc).date()
+    
+    def callee(session):
+        prepared_query = session.prepare(
+            """
+            DECLARE $since AS Utf8;
+            DECLARE $until AS Utf8;
+            SELECT name, value FROM task_counters WHERE period >= $since AND period <= $until;
+            """
+        )
+        return session.transaction(ydb.OnlineReadOnly()).execute(
+            prepared_query,
+            {
+                '$since': (today - timedelta(days=TASK_DURATION_DAYS - 1)).isoformat(),
+                '$until': today.isoformat(),
+            },
+            commit_tx=True,
+        )[0].rows
+    
+    runs = wall_ms = 0
+    for row in pool.retry_operation_sync(callee):
+        if row.name == f'task_runs:{lane}':
+            runs += row.value
+        elif row.name == f'task_wall_ms:{lane}':
+            wall_ms += row.value
+    return wall_ms / runs / 1000 if runs else DEFAULT_TASK_SECONDS[lane]
+
+
+def lane_backlog(pool, lane: str):
+    """(tasks waiting in the lane's queue, average task seconds), cached for BACKLOG_CACHE_SECONDS"""
+    cached = _backlog_cache.get(lane)
+    if cached and cached[0] > time.monotonic():
+        return cached[1], cached[2]
+    
+    attributes = sqs_client().get_queue_attributes(
+        QueueUrl=lane_queue_url(lane),
+        AttributeNames=['ApproximateNumberOfMessages'],
+    )['Attributes']
+    waiting = int(attributes.get('ApproximateNumberOfMessages', 0))
+    task_seconds = average_task_seconds(pool, lane)
+    _backlog_cache[lane] = (time.monotonic() + BACKLOG_CACHE_SECONDS, waiting, task_seconds)
+    return waiting, task_seconds
+
+
+def admit_task(pool, lane: str) -> dict:
     """
-    Main handler for Cloud Function
+    Estimate when a new task in the lane would start and finish.
+    
+    Raises:
+        BacklogFull: the estimated wait is over MAX_BACKLOG_SECONDS
     
-    Args:
-        event: Request event from API Gateway
-        context: Function execution context
-        
     Returns:
-        dict: HTTP response with status code, headers, and body
+        dict: estimated_start and estimated_finish (ISO), estimated_wait_seconds
     """
+    waiting, task_seconds = lane_backlog(pool, lane)
+    wait_seconds = waiting * task_seconds / LANE_PARALLELISM[lane]
+    if MAX_BACKLOG_SECONDS and wait_seconds > MAX_BACKLOG_SECONDS:
+        retry_after = int(min(3600, max(60, wait_seconds - MAX_BACKLOG_SECONDS)))
+        raise BacklogFull(
+            f"Too many tasks in the {lane} queue ({waiting} waiting, about {wait_seconds / 60:.0f} min). "
+            f"Please try again in {math.ceil(retry_after / 60)} min",
+            retry_after,
+        )
+    
+    now = datetime.now(timezone.utc)
+    return {
+        'estimated_start': (now + timedelta(seconds=wait_seconds)).isoformat(),
+        'estimated_finish': (now + timedelta(seconds=wait_seconds + task_seconds)).isoformat(),
+        'estimated_wait_seconds': round(wait_seconds),
+    }
+
+
+def insert_task(pool, task: dict) -> None:
+    """Insert a new task row and count it in task_counters; task holds the column values"""
+    day = task['created_at'][:10]
+    counters = [
+        {'period': 'current', 'name': f"status:{task['status']}", 'delta': 1},
+        {'period': day, 'name': f"status:{task['status']}", 'delta': 1},
+        {'period': day, 'name': 'created', 'delta': 1},
+    ]
+    
+    def callee(session):
+        prepared_query = session.prepare(
+            """
+            DECLARE $task_id AS Utf8;
+            DECLARE $title AS Utf8;
+            DECLARE $video_link AS Utf8;
+            DECLARE $status AS Utf8;
+            DECLARE $created_at AS Utf8;
+            DECLARE $updated_at AS Utf8;
+            DECLARE $size_bytes AS Optional<Uint64>;
+            DECLARE $duration_seconds AS Optional<Double>;
+            DECLARE $lane AS Utf8;
+            DECLARE $upload_key AS Optional<Utf8>;
+            DECLARE $upload_id AS Optional<Utf8>;
+            DECLARE $counters AS List<Struct<period: Utf8, name: Utf8, delta: Int64>>;
+            
+            UPSERT INTO tasks (task_id, title, video_link, status, created_at, updated_at, size_bytes, duration_seconds, lane, upload_key, upload_id)
+            VALUES ($task_id, $title, $video_link, $status, $created_at, $updated_at, $size_bytes, $duration_seconds, $lane, $upload_key, $upload_id);
+            """ + UPSERT_COUNTERS
+        )
+        params = {f'${column}': value for column, value in task.items()}
+        params['$counters'] = counters
+        session.transaction(ydb.SerializableReadWrite()).execute(prepared_query, params, commit_tx=True)
+    
+    pool.retry_operation_sync(callee)
+
+
+def create_task(event) -> dict:
+    """POST /tasks: create a task for a Yandex Disk link"""
+    request_data = parse_request(event)
+    title = request_data.get('title', '')
+    video_link = request_data.get('video_link', '')
+    
+    # Validate input
+    validate_non_empty(title, 'title')
+    validate_non_empty(video_link, 'video_link')
+    
+    # Generate unique task ID
+    task_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc).isoformat()
+    
+    # Probe the video before queuing so long lectures don't block short ones
+    size_bytes, duration_seconds = probe_video_metadata(video_link)
+    lane = choose_lane(size_bytes, duration_seconds)
+    
+    driver, pool = connect_ydb()
     try:
-        # Parse request body - handle both JSON and form-urlencoded
-        body = event.get('body', '')
-        is_base64 = event.get('isBase64Encoded', False)
-        
-        # Decode base64 if needed
-        if is_base64 and isinstance(body, str):
-            import base64
-            body = base64.b64decode(body).decode('utf-8')
-        
-        headers = event.get('headers', {})
-        
-        # Normalize header keys to lowercase
-        headers_lower = {k.lower(): v for k, v in headers.items()}
-        content_type = headers_lower.get('content-type', '')
+        eta = admit_task(pool, lane)
+        insert_task(pool, {
+            'task_id': task_id,
+            'title': title,
+            'video_link': video_link,
+            'status': 'queued',
+            'created_at': now,
+            'updated_at': now,
+            'size_bytes': size_bytes,
+            'duration_seconds': duration_seconds,
+            'lane': lane,
+            'upload_key': None,
+            'upload_id': None,
+        })
+        enqueue_task(task_id, lane)
+    finally:
+        driver.stop()
+    
+    # Return redirect to /tasks
+    return {
+        'statusCode': 302,
+        'headers': {
+            'Location': '/tasks',
+            'Content-Type': 'application/json',
+        },
+        'body': json.dumps({
+            'task_id': task_id,
+            'status': 'queued',
+            'lane': lane,
+            **eta,
+        }),
+    }
+
+
+def s3_client():
+    return boto3.client(
+        's3',
+        endpoint_url=os.environ.get('S3_ENDPOINT', 'https://storage.yandexcloud.net'),
+        region_name=os.environ.get('AWS_REGION', 'ru-central1'),
+    )
+
+
+def part_count(size_bytes: int) -> int:
+    return max(1, math.ceil(size_bytes / UPLOAD_PART_SIZE))
+
+
+def presign_parts(s3, bucket: str, upload_key: str, upload_id: str, part_numbers) -> list:
+    return [
+        {
+            'part_number': part_number,
+            'url': s3.generate_presigned_url(
+                'upload_part',
+                Params={'Bucket': bucket, 'Key': upload_key, 'UploadId': upload_id, 'PartNumber': part_number},
+                ExpiresIn=UPLOAD_URL_EXPIRES_SECONDS,
+            ),
+        }
+        for part_number in part_numbers
+    ]
+
+
+def list_uploaded_parts(s3, bucket: str, upload_key: str, upload_id: str) -> dict:
+    """Part number -> part (ETag, Size) of the parts already stored"""
+    parts = {}
+    marker = 0
+    while True:
+        response = s3.list_parts(Bucket=bucket, Key=upload_key, UploadId=upload_id, PartNumberMarker=marker)
+        for part in response.get('Parts', []):
+            parts[part['PartNumber']] = part
+        if not response.get('IsTruncated'):
+            return parts
+        marker = response['NextPartNumberMarker']
+
+
+def get_upload_task(pool, task_id: str):
+    def callee(session):
+        prepared_query = session.prepare(
+            """
+            DECLARE $task_id AS Utf8;
+            SELECT task_id, status, size_bytes, lane, upload_key, upload_id
+            FROM tasks
+            WHERE task_id = $task_id;
+            """
+        )
+        rows = session.transaction().execute(prepared_query, {'$task_id': task_id}, commit_tx=True)[0].rows
+        return rows[0] if rows and rows[0].upload_key else None
+    
+    return pool.retry_operation_sync(callee)
+
+
+def stored_size(s3, bucket: str, upload_key: str):
+    """Size of the assembled object, or None if there is none"""
+    try:
+        return s3.head_object(Bucket=bucket, Key=upload_key)['ContentLength']
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+            raise
+        return None
+
+
+def size_error(size: int, declared: int):
+    """Why an upload of size bytes is refused, or None"""
+    if size > MAX_UPLOAD_BYTES:
+        return f"Video file is too large ({size / (1024 * 1024):.1f} MB). Maximum supported size is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+    if size != declared:
+        return f"Uploaded {size} bytes, but the upload was started for {declared}"
+    return None
+
+
+def mark_upload_queued(pool, task_id: str) -> bool:
+    """Move an uploading task to queued; False if another request already did"""
+    return finish_upload(pool, task_id, 'queued')
+
+
+def mark_upload_failed(pool, task_id: str, error_message: str) -> bool:
+    """Move an uploading task to error; False if it was no longer uploading"""
+    return finish_upload(pool, task_id, 'error', error_message)
+
+
+def finish_upload(pool, task_id: str, status: str, error_message: str = None) -> bool:
+    """Move an uploading task to status, with its counters, in one transaction"""
+    def callee(session):
+        tx = session.transaction(ydb.SerializableReadWrite())
+        select_query = session.prepare(
+            """
+            DECLARE $task_id AS Utf8;
+            SELECT status FROM tasks WHERE task_id = $task_id;
+            """
+        )
+        rows = tx.execute(select_query, {'$task_id': task_id})[0].rows
+        if not rows or rows[0].status != 'uploading':
+            tx.commit()
+            return False
         
-        if 'application/x-www-form-urlencoded' in content_type or not content_type:
-            # Parse form data
-            from urllib.parse import parse_qs
-            if isinstance(body, str) and body:
-                parsed = parse_qs(body)
-                title = parsed.get('title', [''])[0]
-                video_link = parsed.get('video_link', [''])[0]
-            else:
-                title = ''
-                video_link = ''
-        else:
-            # Parse JSON
-            if isinstance(body, str) and body:
-                try:
-                    request_data = json.loads(body)
-                except json.JSONDecodeError:
-                    request_data = {}
-            else:
-                request_data = body if body else {}
+        update_query = session.prepare(
+            """
+            DECLARE $task_id AS Utf8;
+            DECLARE $status AS Utf8;
+            DECLARE $error_message AS Optional<Utf8>;
+            DECLARE $updated_at AS Utf8;
+            DECLARE $counters AS List<Struct<period: Utf8, name: Utf8, delta: Int64>>;
             
-            title = request_data.get('title', '')
-            video_link = request_data.get('video_link', '')
-        
-        # Validate input
-        validate_non_empty(title, 'title')
-        validate_non_empty(video_link, 'video_link')
-        
-        # Generate unique task ID
-        task_id = str(uuid.uuid4())
-        now = datetime.now(timezone.utc).isoformat()
-        
-        # Get environment variables
-        ydb_endpoint = os.environ['YDB_ENDPOINT']
-        ydb_database = os.environ['YDB_DATABASE']
-        queue_url = os.environ['MQ_QUEUE_URL']
-        
-        # Initialize YDB driver
-        driver = ydb.Driver(
-            endpoint=ydb_endpoint,
-            database=ydb_database,
-            credentials=ydb.iam.MetadataUrlCredentials(),
+            UPDATE tasks
+            SET status = $status, error_message = $error_message, updated_at = $updated_at
+            WHERE task_id = $task_id;
+            """ + UPSERT_COUNTERS
+        )
+        updated_at = datetime.now(timezone.utc).isoformat()
+        tx.execute(
+            update_query,
+            {
+                '$task_id': task_id,
+                '$status': status,
+                '$error_message': error_message,
+                '$updated_at': updated_at,
+                '$counters': [
+                    {'period': 'current', 'name': 'status:uploading', 'delta': -1},
+                    {'period': 'current', 'name': f'status:{status}', 'delta': 1},
+                    {'period': updated_at[:10], 'name': f'status:{status}', 'delta': 1},
+                ],
+            },
+            commit_tx=True,
         )
-        driver.wait(fail_fast=True, timeout=5)
-        pool = ydb.SessionPool(driver)
+        return True
+    
+    return pool.retry_operation_sync(callee)
+
+
+def start_upload(event) -> dict:
+    """
+    POST /api/uploads: create a task and a multipart upload for its video.
+    
+    The client PUTs each part to its presigned URL (in parallel, in any order)
+    and then calls /api/uploads/{task_id}/complete.
+    """
+    request_data = parse_request(event)
+    title = request_data.get('title', '')
+    filename = request_data.get('filename', '')
+    validate_non_empty(title, 'title')
+    validate_non_empty(filename, 'filename')
+    try:
+        size_bytes = int(request_data.get('size'))
+    except (TypeError, ValueError):
+        raise ValueError("size must be the file size in bytes")
+    if size_bytes <= 0:
+        raise ValueError("size must be the file size in bytes")
+    if size_bytes > MAX_UPLOAD_BYTES:
+        raise ValueError(f"Video file is too large ({size_bytes / (1024 * 1024):.1f} MB). Maximum supported size is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    
+    task_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc).isoformat()
+    extension = os.path.splitext(filename)[1].lower()[:10]
+    upload_key = f'uploads/{task_id}/video{extension}'
+    bucket = os.environ['S3_BUCKET']
+    
+    # Duration is unknown until the worker reads the file; route by size
+    lane = choose_lane(size_bytes, None)
+    
+    driver, pool = connect_ydb()
+    try:
+        # Checked before the upload starts, so a full backlog costs the client no transfer
+        eta = admit_task(pool, lane)
         
-        # Ensure table exists (idempotent operation)
-        ensure_table_exists(pool)
+        s3 = s3_client()
+        upload_id = s3.create_multipart_upload(
+            Bucket=bucket,
+            Key=upload_key,
+            ContentType=request_data.get('content_type') or 'application/octet-stream',
+        )['UploadId']
         
-        # Insert task into YDB
-        def insert_task(session):
-            prepared_query = session.prepare(
-                """
-                DECLARE $task_id AS Utf8;
-                DECLARE $title AS Utf8;
-                DECLARE $video_link AS Utf8;
-                DECLARE $status AS Utf8;
-                DECLARE $created_at AS Utf8;
-                DECLARE $updated_at AS Utf8;
-                
-                UPSERT INTO tasks (task_id, title, video_link, status, created_at, updated_at)
-                VALUES ($task_id, $title, $video_link, $status, $created_at, $updated_at);
-                """
-            )
-            session.transaction(ydb.SerializableReadWrite()).execute(
-                prepared_query,
-                {
-                    '$task_id': task_id,
-                    '$title': title,
-                    '$video_link': video_link,
-                    '$status': 'queued',
-                    '$created_at': now,
-                    '$updated_at': now,
-                },
-                commit_tx=True,
-            )
+        insert_task(pool, {
+            'task_id': task_id,
+            'title': title,
+            'video_link': filename,
+            'status': 'uploading',
+            'created_at': now,
+            'updated_at': now,
+            'size_bytes': size_bytes,
+            'duration_seconds': None,
+            'lane': lane,
+            'upload_key': upload_key,
+            'upload_id': upload_id,
+        })
+    finally:
+        driver.stop()
+    
+    return json_response(201, {
+        'task_id': task_id,
+        'status': 'uploading',
+        'part_size': UPLOAD_PART_SIZE,
+        'parts': presign_parts(s3, bucket, upload_key, upload_id, range(1, part_count(size_bytes) + 1)),
+        **eta,
+    })
+
+
+def upload_status(task_id: str) -> dict:
+    """GET /api/uploads/{task_id}: stored parts and fresh URLs for the missing ones, to resume"""
+    driver, pool = connect_ydb()
+    try:
+        task = get_upload_task(pool, task_id)
+    finally:
+        driver.stop()
+    if task is None:
+        return json_response(404, {'error': 'Upload not found'})
+    if task.status != 'uploading':
+        return json_response(200, {'task_id': task_id, 'status': task.status, 'parts': []})
+    
+    s3 = s3_client()
+    bucket = os.environ['S3_BUCKET']
+    try:
+        uploaded = list_uploaded_parts(s3, bucket, task.upload_key, task.upload_id)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'NoSuchUpload':
+            raise
+        # Nothing left to resume: completed by another request, or expired
+        return complete_upload(task_id)
+    missing = [n for n in range(1, part_count(task.size_bytes) + 1) if n not in uploaded]
+    return json_response(200, {
+        'task_id': task_id,
+        'status': 'uploading',
+        'part_size': UPLOAD_PART_SIZE,
+        'uploaded_parts': sorted(uploaded),
+        'parts': presign_parts(s3, bucket, task.upload_key, task.upload_id, missing),
+    })
+
+
+def complete_upload(task_id: str) -> dict:
+    """POST /api/uploads/{task_id}/complete: assemble the parts and queue the task"""
+    driver, pool = connect_ydb()
+    try:
+        task = get_upload_task(pool, task_id)
+        if task is None:
+            return json_response(404, {'error': 'Upload not found'})
+        if task.status != 'uploading':
+            # Already completed by an earlier (retried) request
+            return json_response(200, {'task_id': task_id, 'status': task.status, 'lane': task.lane})
         
-        pool.retry_operation_sync(insert_task)
+        s3 = s3_client()
+        bucket = os.environ['S3_BUCKET']
+        # NoSuchUpload: a concurrent complete request finished the upload first, or the
+        # bucket's lifecycle rule aborted it; only the stored object tells them apart
+        try:
+            # ETags come from Object Storage itself, so the client does not have to keep them
+            uploaded = list_uploaded_parts(s3, bucket, task.upload_key, task.upload_id)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'NoSuchUpload':
+                raise
+            uploaded = None
         
-        # Send message to Message Queue
-        sqs = boto3.client(
-            'sqs',
-            endpoint_url=os.environ.get('MQ_ENDPOINT', 'https://message-queue.api.cloud.yandex.net'),
-            region_name=os.environ.get('AWS_REGION', 'ru-central1'),
-        )
+        if uploaded is not None:
+            missing = [n for n in range(1, part_count(task.size_bytes) + 1) if n not in uploaded]
+            if missing:
+                return json_response(409, {'error': 'Upload is incomplete', 'missing_parts': missing})
+            
+            # The declared size only picked the lane and the part URLs; parts can be any size
+            error = size_error(sum(part['Size'] for part in uploaded.values()), task.size_bytes)
+            if error:
+                s3.abort_multipart_upload(Bucket=bucket, Key=task.upload_key, UploadId=task.upload_id)
+                mark_upload_failed(pool, task_id, error)
+                return json_response(413, {'error': error})
+            
+            try:
+                s3.complete_multipart_upload(
+                    Bucket=bucket,
+                    Key=task.upload_key,
+                    UploadId=task.upload_id,
+                    MultipartUpload={'Parts': [{'PartNumber': n, 'ETag': uploaded[n]['ETag']} for n in sorted(uploaded)]},
+                )
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'NoSuchUpload':
+                    raise
         
-        sqs.send_message(
-            QueueUrl=queue_url,
-            MessageBody=json.dumps({'task_id': task_id}),
-        )
+        size = stored_size(s3, bucket, task.upload_key)
+        if size is None:
+            error = 'Upload expired, please upload the video again'
+            mark_upload_failed(pool, task_id, error)
+            return json_response(410, {'error': error})
+        error = size_error(size, task.size_bytes)
+        if error:
+            s3.delete_object(Bucket=bucket, Key=task.upload_key)
+            mark_upload_failed(pool, task_id, error)
+            return json_response(413, {'error': error})
         
-        # Close driver
+        if mark_upload_queued(pool, task_id):
+            enqueue_task(task_id, task.lane)
+    finally:
         driver.stop()
+    
+    return json_response(200, {'task_id': task_id, 'status': 'queued', 'lane': task.lane})
+
+
+def handler(event, context):
+    """
+    Main handler for Cloud Function
+    
+    Args:
+        event: Request event from API Gateway
+        context: Function execution context
         
-        # Return redirect to /tasks
-        return {
-            'statusCode': 302,
-            'headers': {
-                'Location': '/tasks',
-                'Content-Type': 'application/json',
-            },
-            'body': json.dumps({
-                'task_id': task_id,
-                'status': 'queued',
-            }),
-        }
+    Returns:
+        dict: HTTP response with status code, headers, and body
+    """
+    try:
+        path = event.get('path') or '/tasks'
+        path_params = event.get('pathParams') or event.get('params') or {}
+        
+        if path.startswith('/api/uploads'):
+            task_id = path_params.get('task_id')
+            if not task_id:
+                return start_upload(event)
+            if path.endswith('/complete'):
+                return complete_upload(task_id)
+            return upload_status(task_id)
+        
+        return create_task(event)
         
+    except BacklogFull as e:
+        # Saturated: the client should come back later instead of piling up work
+        response = json_response(429, {'error': str(e), 'retry_after': e.retry_after})
+        response['headers']['Retry-After'] = str(e.retry_after)
+        return response
     except ValueError as e:
         # Validation error
-        return {
-            'statusCode': 400,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'error': str(e)}),
-        }
+        return json_response(400, {'error': str(e)})
     except Exception as e:
         # Infrastructure error
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'error': f'Internal server error: {str(e)}'}),
-        }
+        return json_response(500, {'error': f'Internal server error: {str(e)}'})
@@ -42,7 +42,8 @@ def handler(event, context):
         def query_tasks(session):
             result_sets = session.transaction().execute(
                 """
-                SELECT task_id, title, video_link, status, created_at, updated_at, error_message, pdf_key
+                SELECT task_id, title, video_link, status, created_at, updated_at, error_message, pdf_key, summary_key,
+                       stage_timings, progress
                 FROM tasks
                 ORDER BY created_at DESC;
                 """,
@@ -73,8 +74,20 @@ def handler(event, context):
             if row.error_message:
                 task['error_message'] = row.error_message.decode('utf-8') if isinstance(row.error_message, bytes) else row.error_message
             
-            # Generate presigned URL for completed tasks
-            if task['status'] == 'completed' and row.pdf_key:
+            # Stage the worker is in; written behind, so it may lag a couple of seconds
+            if task['status'] == 'processing' and row.progress:
+                task['progress'] = row.progress.decode('utf-8') if isinstance(row.progress, bytes) else row.progress
+            
+            # Per-stage wall/CPU time, bytes and peak RSS recorded by the worker
+            if row.stage_timings:
+                stage_timings = row.stage_timings.decode('utf-8') if isinstance(row.stage_timings, bytes) else row.stage_timings
+                task['stages'] = json.loads(stage_timings)
+            
+            # Completed tasks with a stored summary are rendered on first download by the worker
+            if task['status'] == 'completed' and row.summary_key:
+                task['pdf_url'] = f"/api/tasks/{task['task_id']}/pdf"
+            # Generate presigned URL for tasks completed before lazy rendering
+            elif task['status'] == 'completed' and row.pdf_key:
                 pdf_key = row.pdf_key.decode('utf-8') if isinstance(row.pdf_key, bytes) else row.pdf_key
                 try:
                     # Use title as-is for filename (RFC 5987 encoding handles special characters)
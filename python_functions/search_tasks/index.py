@@ -0,0 +1,198 @@
+"""
+Cloud Function: Search Tasks
+Handles GET /api/search?q= requests (JSON API)
+
+Searches the inverted index the worker builds from summaries and
+transcripts (worker/search_index.py). The live segments are listed in the
+search_segments table; each is downloaded once per warm instance into /tmp,
+memory-mapped and kept, since segments never change. A query looks each
+term up by binary search and ranks the lectures with BM25.
+
+Queries are tokenized and segments read by search_text.py, which is not a
+copy: terraform packs worker/search_text.py into this function's archive.
+"""
+import json
+import math
+import mmap
+import os
+import time
+import ydb
+import ydb.iam
+import boto3
+from botocore.exceptions import ClientError
+from search_text import SEGMENT_PREFIX, Segment, tokenize
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MANIFEST_CACHE_SECONDS = 10
+CACHE_DIR = '/tmp/search-segments'
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_pool = None
+_s3 = None
+# Live segment names and when to list them again, per warm instance
+_manifest = {'expires_at': 0.0, 'segments': []}
+# Segment name -> Segment over the memory-mapped file
+_segments = {}
+
+
+def get_pool():
+    """Session pool kept for the life of the warm instance, so a query costs no connection setup"""
+    global _pool
+    if _pool is None:
+        driver = ydb.Driver(
+            endpoint=os.environ['YDB_ENDPOINT'],
+            database=os.environ['YDB_DATABASE'],
+            credentials=ydb.iam.MetadataUrlCredentials(),
+        )
+        driver.wait(fail_fast=True, timeout=5)
+        _pool = ydb.SessionPool(driver)
+    return _pool
+
+
+def get_s3():
+    global _s3
+    if _s3 is None:
+        _s3 = boto3.client(
+            's3',
+            endpoint_url=os.environ.get('S3_ENDPOINT', 'https://storage.yandexcloud.net'),
+            region_name=os.environ.get('AWS_REGION', 'ru-central1'),
+        )
+    return _s3
+
+
+def list_segments(force: bool = False) -> list:
+    if not force and _manifest['expires_at'] > time.monotonic():
+        return _manifest['segments']
+    
+    def callee(session):
+        prepared_query = session.prepare('SELECT segment FROM search_segments;')
+        result_sets = session.transaction(ydb.OnlineReadOnly()).execute(prepared_query, {}, commit_tx=True)
+        return sorted(row.segment for row in result_sets[0].rows)
+    
+    segments = get_pool().retry_operation_sync(callee)
+    _manifest['segments'] = segments
+    _manifest['expires_at'] = time.monotonic() + MANIFEST_CACHE_SECONDS
+    return segments
+
+
+def open_segment(s3, name: str) -> Segment:
+    if name not in _segments:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = os.path.join(CACHE_DIR, f'{name}.seg')
+        if not os.path.exists(path):
+            s3.download_file(os.environ['S3_BUCKET'], f'{SEGMENT_PREFIX}{name}.seg', path + '.part')
+            os.replace(path + '.part', path)
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _segments[name] = Segment(mapped)
+    return _segments[name]
+
+
+def load_segments(s3) -> list:
+    """Open every live segment; merged-away ones are dropped from the cache and /tmp"""
+    names = list_segments()
+    try:
+        segments = [open_segment(s3, name) for name in names]
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+            raise
+        # Merged and deleted after our listing was cached
+        names = list_segments(force=True)
+        segments = [open_segment(s3, name) for name in names]
+    
+    for name in set(_segments) - set(names):
+        # The mapping goes away with the last view into it
+        del _segments[name]
+        try:
+            os.remove(os.path.join(CACHE_DIR, f'{name}.seg'))
+        except OSError:
+            pass
+    return segments
+
+
+def search(segments: list, query: str, limit: int):
+    """BM25 over all segments; returns (number of matching lectures, best results)"""
+    terms = list(dict.fromkeys(tokenize(query)))
+    doc_count = sum(len(segment.docs) for segment in segments)
+    if not terms or not doc_count:
+        return 0, []
+    average_length = sum(segment.total_length for segment in segments) / doc_count
+    
+    matches = []
+    for term in terms:
+        found = [(segment, segment.find(term)) for segment in segments]
+        found = [(segment, index) for segment, index in found if index >= 0]
+        frequency = sum(segment.posting_offsets[index + 1] - segment.posting_offsets[index] for segment, index in found)
+        if frequency:
+            matches.append((math.log(1 + (doc_count - frequency + 0.5) / (frequency + 0.5)), found))
+    
+    scores = {}
+    for idf, found in matches:
+        for segment, index in found:
+            for doc, frequency in segment.postings(index):
+                length = segment.doc_lengths[doc]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                key = (id(segment), doc)
+                scores[key] = scores.get(key, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+    
+    # A task indexed twice (before a merge dropped the older copy) is listed once
+    segment_by_id = {id(segment): segment for segment in segments}
+    best = {}
+    for (segment_id, doc), score in scores.items():
+        task_id, title = segment_by_id[segment_id].docs[doc]
+        if task_id not in best or score > best[task_id]['score']:
+            best[task_id] = {'task_id': task_id, 'title': title, 'score': score}
+    
+    results = sorted(best.values(), key=lambda result: result['score'], reverse=True)[:limit]
+    for result in results:
+        result['score'] = round(result['score'], 4)
+    return len(best), results
+
+
+def handler(event, context):
+    """
+    Main handler for Cloud Function
+    
+    Args:
+        event: Request event from API Gateway
+        context: Function execution context
+    
+    Returns:
+        dict: HTTP response with status code, headers, and body
+    """
+    try:
+        started = time.perf_counter()
+        params = event.get('queryStringParameters') or {}
+        query = (params.get('q') or '').strip()
+        if not query:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': 'Query parameter q is required'}),
+            }
+        try:
+            limit = min(MAX_LIMIT, max(1, int(params.get('limit', DEFAULT_LIMIT))))
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        
+        total, results = search(load_segments(get_s3()), query, limit)
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Cache-Control': 'max-age=10'},
+            'body': json.dumps({
+                'query': query,
+                'total': total,
+                'results': results,
+                'took_ms': round((time.perf_counter() - started) * 1000, 1),
+            }, ensure_ascii=False),
+        }
+    
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': f'Internal server error: {str(e)}'}),
+        }
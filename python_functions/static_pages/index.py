@@ -63,6 +63,15 @@ INDEX_HTML = """<!DOCTYPE html>
         .link a:hover {
             text-decoration: underline;
         }
+        #upload-form {
+            margin-top: 20px;
+        }
+        input[type="file"] {
+            margin-bottom: 15px;
+        }
+        #upload-progress {
+            margin-top: 10px;
+        }
     </style>
 </head>
 <body>
@@ -79,9 +88,106 @@ INDEX_HTML = """<!DOCTYPE html>
         <button type="submit">Generate Notes</button>
     </form>
     
+    <form id="upload-form">
+        <label for="upload_title">Lecture Title:</label>
+        <input type="text" id="upload_title" required>
+        
+        <label for="video_file">Or Upload a Video File:</label>
+        <input type="file" id="video_file" accept="video/*" required>
+        
+        <button type="submit">Upload and Generate Notes</button>
+        <div id="upload-progress"></div>
+    </form>
+    
     <div class="link">
         <a href="/tasks">View All Tasks</a>
     </div>
+    
+    <script>
+        // Parts go straight to Object Storage; an interrupted upload of the same file resumes
+        const PARALLEL_PARTS = 4;
+        const PART_RETRIES = 3;
+        const progress = document.getElementById('upload-progress');
+        
+        async function api(method, url, body) {
+            const response = await fetch(url, {
+                method: method,
+                headers: body ? {'Content-Type': 'application/json'} : {},
+                body: body ? JSON.stringify(body) : undefined,
+            });
+            const data = await response.json();
+            if (!response.ok && response.status !== 409) {
+                throw new Error(data.error || response.statusText);
+            }
+            return data;
+        }
+        
+        async function putPart(file, partSize, part) {
+            const chunk = file.slice((part.part_number - 1) * partSize, part.part_number * partSize);
+            for (let attempt = 1; ; attempt++) {
+                try {
+                    const response = await fetch(part.url, {method: 'PUT', body: chunk});
+                    if (response.ok) {
+                        return;
+                    }
+                    throw new Error(`part ${part.part_number}: HTTP ${response.status}`);
+                } catch (error) {
+                    if (attempt >= PART_RETRIES) {
+                        throw error;
+                    }
+                    await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+                }
+            }
+        }
+        
+        async function uploadParts(file, partSize, parts, total) {
+            let done = total - parts.length;
+            const queue = parts.slice();
+            async function worker() {
+                while (queue.length > 0) {
+                    await putPart(file, partSize, queue.shift());
+                    done++;
+                    progress.textContent = `Uploaded ${done} of ${total} parts`;
+                }
+            }
+            await Promise.all(Array.from({length: PARALLEL_PARTS}, worker));
+        }
+        
+        document.getElementById('upload-form').addEventListener('submit', async event => {
+            event.preventDefault();
+            const file = document.getElementById('video_file').files[0];
+            const title = document.getElementById('upload_title').value;
+            const resumeKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+            try {
+                let upload = null;
+                const taskId = localStorage.getItem(resumeKey);
+                if (taskId) {
+                    upload = await api('GET', `/api/uploads/${taskId}`).catch(() => null);
+                    if (upload) {
+                        upload.task_id = taskId;
+                    }
+                }
+                if (!upload || upload.status !== 'uploading') {
+                    upload = await api('POST', '/api/uploads', {
+                        title: title, filename: file.name, size: file.size, content_type: file.type,
+                    });
+                    localStorage.setItem(resumeKey, upload.task_id);
+                    progress.textContent = `Estimated start: ${new Date(upload.estimated_start).toLocaleTimeString()}`;
+                }
+                const total = Math.max(1, Math.ceil(file.size / upload.part_size));
+                await uploadParts(file, upload.part_size, upload.parts, total);
+                
+                const result = await api('POST', `/api/uploads/${upload.task_id}/complete`);
+                if (result.missing_parts) {
+                    throw new Error(`parts ${result.missing_parts.join(', ')} are missing, submit again to resume`);
+                }
+                localStorage.removeItem(resumeKey);
+                location.href = '/tasks';
+            } catch (error) {
+                progress.textContent = `Upload failed: ${error.message}`;
+            }
+        });
+    </script>
 </body>
 </html>
 """
@@ -124,6 +230,10 @@ TASKS_HTML = """<!DOCTYPE html>
             border-radius: 4px;
             font-weight: bold;
         }
+        .status-uploading {
+            background-color: #6c757d;
+            color: #fff;
+        }
         .status-queued {
             background-color: #ffc107;
             color: #000;
@@ -162,17 +272,34 @@ TASKS_HTML = """<!DOCTYPE html>
             color: #dc3545;
             font-size: 0.9em;
         }
+        #search-form input {
+            width: 300px;
+            padding: 6px;
+        }
+        .search-result {
+            margin: 8px 0;
+        }
     </style>
     <script>
-        // Auto-refresh every 10 seconds
-        setTimeout(function() {
-            location.reload();
-        }, 10000);
+        // Auto-refresh every 10 seconds, except while showing search results
+        const searchQuery = new URLSearchParams(location.search).get('q');
+        if (!searchQuery) {
+            setTimeout(function() {
+                location.reload();
+            }, 10000);
+        }
     </script>
 </head>
 <body>
     <h1>Lecture Notes Tasks</h1>
     <p>Tasks are automatically refreshed every 10 seconds</p>
+    <p id="stats"></p>
+    
+    <form id="search-form" action="/tasks" method="get">
+        <input type="search" name="q" placeholder="Find a lecture by topic">
+        <button type="submit">Search</button>
+    </form>
+    <div id="search-results"></div>
     
     <div id="tasks-container">
         <p>Loading tasks...</p>
@@ -183,6 +310,39 @@ TASKS_HTML = """<!DOCTYPE html>
     </div>
     
     <script>
+        // Counts per status from the materialized counters
+        fetch('/api/stats')
+            .then(response => response.json())
+            .then(data => {
+                const statuses = ['uploading', 'queued', 'processing', 'completed', 'error'];
+                document.getElementById('stats').innerHTML = statuses
+                    .map(status => `<span class="status status-${status}">${status}: ${(data.statuses || {})[status] || 0}</span>`)
+                    .join(' ');
+            })
+            .catch(error => console.error('Error fetching stats:', error));
+        
+        // Lectures matching the query, best first
+        if (searchQuery) {
+            document.querySelector('#search-form input').value = searchQuery;
+            fetch('/api/search?q=' + encodeURIComponent(searchQuery))
+                .then(response => response.json())
+                .then(data => {
+                    const container = document.getElementById('search-results');
+                    if (!data.results || data.results.length === 0) {
+                        container.innerHTML = '<p>Nothing found. <a href="/tasks">Show all tasks</a></p>';
+                        return;
+                    }
+                    let html = `<h2>Found in ${data.total} lectures</h2>`;
+                    data.results.forEach(result => {
+                        html += `<div class="search-result">${result.title} - `;
+                        html += `<a href="/api/tasks/${result.task_id}/pdf" class="download-link">Download PDF</a></div>`;
+                    });
+                    html += '<p><a href="/tasks">Show all tasks</a></p>';
+                    container.innerHTML = html;
+                })
+                .catch(error => console.error('Error searching:', error));
+        }
+        
         // Fetch tasks from API
         fetch('/api/tasks')
             .then(response => response.json())
@@ -201,7 +361,8 @@ TASKS_HTML = """<!DOCTYPE html>
                         html += '<tr>';
                         html += `<td>${new Date(task.created_at).toLocaleString()}</td>`;
                         html += `<td>${task.title}</td>`;
-                        html += `<td><span class="status status-${task.status}">${task.status}</span></td>`;
+                        html += `<td><span class="status status-${task.status}">${task.status}</span>`;
+                        html += task.progress ? ` ${task.progress}</td>` : '</td>';
                         html += '<td>';
                         
                         if (task.status === 'completed' && task.pdf_url) {
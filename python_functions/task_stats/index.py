@@ -0,0 +1,149 @@
+"""
+Cloud Function: Task Stats
+Handles GET /api/stats requests (JSON API)
+
+Reads the task_counters rows maintained by create_task and the worker, so
+the cost does not grow with the tasks table, plus the depth of both queues.
+"""
+import json
+import os
+from datetime import datetime, timedelta, timezone
+import ydb
+import ydb.iam
+import boto3
+
+DEFAULT_DAYS = 7
+MAX_DAYS = 90
+
+
+def read_counters(pool, since: str, until: str):
+    """Current status counts and the day rows from since to until (inclusive)"""
+    def callee(session):
+        prepared_query = session.prepare(
+            """
+            DECLARE $since AS Utf8;
+            DECLARE $until AS Utf8;
+            
+            SELECT period, name, value FROM task_counters WHERE period = 'current';
+            SELECT period, name, value FROM task_counters WHERE period >= $since AND period <= $until;
+            """
+        )
+        result_sets = session.transaction(ydb.OnlineReadOnly()).execute(
+            prepared_query,
+            {'$since': since, '$until': until},
+            commit_tx=True,
+        )
+        return result_sets[0].rows, result_sets[1].rows
+    
+    return pool.retry_operation_sync(callee)
+
+
+def queue_depth(sqs, queue_url: str) -> dict:
+    attributes = sqs.get_queue_attributes(
+        QueueUrl=queue_url,
+        AttributeNames=['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible'],
+    )['Attributes']
+    return {
+        'waiting': int(attributes.get('ApproximateNumberOfMessages', 0)),
+        'in_flight': int(attributes.get('ApproximateNumberOfMessagesNotVisible', 0)),
+    }
+
+
+def build_stats(current_rows, day_rows, since: str, until: str) -> dict:
+    statuses = {}
+    for row in current_rows:
+        if row.name.startswith('status:'):
+            statuses[row.name[len('status:'):]] = row.value
+    
+    days = {}
+    stage_runs, stage_wall_ms = {}, {}
+    task_runs, task_wall_ms = {}, {}
+    for row in day_rows:
+        day = days.setdefault(row.period, {'date': row.period})
+        kind, _, name = row.name.partition(':')
+        if kind in ('status', 'created'):
+            day[name or kind] = row.value
+        elif kind == 'stage_runs':
+            stage_runs[name] = stage_runs.get(name, 0) + row.value
+        elif kind == 'stage_wall_ms':
+            stage_wall_ms[name] = stage_wall_ms.get(name, 0) + row.value
+        elif kind == 'task_runs':
+            task_runs[name] = task_runs.get(name, 0) + row.value
+        elif kind == 'task_wall_ms':
+            task_wall_ms[name] = task_wall_ms.get(name, 0) + row.value
+    
+    return {
+        'since': since,
+        'until': until,
+        'statuses': statuses,
+        'days': [days[date] for date in sorted(days)],
+        'stage_avg_ms': {
+            stage: round(stage_wall_ms.get(stage, 0) / runs, 1)
+            for stage, runs in sorted(stage_runs.items()) if runs
+        },
+        'task_avg_seconds': {
+            lane: round(task_wall_ms.get(lane, 0) / runs / 1000, 1)
+            for lane, runs in sorted(task_runs.items()) if runs
+        },
+    }
+
+
+def handler(event, context):
+    """
+    Main handler for Cloud Function
+    
+    Args:
+        event: Request event from API Gateway
+        context: Function execution context
+        
+    Returns:
+        dict: HTTP response with status code, headers, and body
+    """
+    try:
+        query = event.get('queryStringParameters') or {}
+        try:
+            days = min(MAX_DAYS, max(1, int(query.get('days', DEFAULT_DAYS))))
+        except ValueError:
+            days = DEFAULT_DAYS
+        today = datetime.now(timezone.utc).date()
+        since = (today - timedelta(days=days - 1)).isoformat()
+        until = today.isoformat()
+        
+        # Initialize YDB driver
+        driver = ydb.Driver(
+            endpoint=os.environ['YDB_ENDPOINT'],
+            database=os.environ['YDB_DATABASE'],
+            credentials=ydb.iam.MetadataUrlCredentials(),
+        )
+        driver.wait(fail_fast=True, timeout=5)
+        pool = ydb.SessionPool(driver)
+        try:
+            current_rows, day_rows = read_counters(pool, since, until)
+        finally:
+            driver.stop()
+        
+        stats = build_stats(current_rows, day_rows, since, until)
+        
+        # Queue depth comes from Message Queue itself, not from task statuses
+        sqs = boto3.client(
+            'sqs',
+            endpoint_url=os.environ.get('MQ_ENDPOINT', 'https://message-queue.api.cloud.yandex.net'),
+            region_name=os.environ.get('AWS_REGION', 'ru-central1'),
+        )
+        stats['queues'] = {'short': queue_depth(sqs, os.environ['MQ_QUEUE_URL'])}
+        long_queue_url = os.environ.get('MQ_LONG_QUEUE_URL')
+        if long_queue_url:
+            stats['queues']['long'] = queue_depth(sqs, long_queue_url)
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Cache-Control': 'max-age=5'},
+            'body': json.dumps(stats),
+        }
+        
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': f'Internal server error: {str(e)}'}),
+        }
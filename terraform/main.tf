@@ -63,6 +63,12 @@ resource "yandex_resourcemanager_folder_iam_member" "functions_ydb_editor" {
   member    = "serviceAccount:${yandex_iam_service_account.functions_sa.id}"
 }
 
+resource "yandex_resourcemanager_folder_iam_member" "functions_containers_invoker" {
+  folder_id = var.folder_id
+  role      = "serverless.containers.invoker"
+  member    = "serviceAccount:${yandex_iam_service_account.functions_sa.id}"
+}
+
 resource "yandex_resourcemanager_folder_iam_member" "functions_ymq_writer" {
   folder_id = var.folder_id
   role      = "ymq.writer"
@@ -138,6 +144,26 @@ resource "yandex_message_queue" "tasks_queue" {
   ]
 }
 
+# Message Queue for the long lane (videos over the short-lane limits)
+resource "yandex_message_queue" "tasks_long_queue" {
+  name                       = "${var.prefix}-tasks-long-queue"
+  visibility_timeout_seconds = 900    # 15 minutes
+  message_retention_seconds  = 345600 # 4 days
+  receive_wait_time_seconds  = 20     # Long polling
+
+  access_key = yandex_iam_service_account_static_access_key.functions_sa_key.access_key
+  secret_key = yandex_iam_service_account_static_access_key.functions_sa_key.secret_key
+
+  lifecycle {
+    create_before_destroy = false
+  }
+
+  depends_on = [
+    yandex_resourcemanager_folder_iam_member.functions_ymq_admin,
+    yandex_resourcemanager_folder_iam_member.functions_ymq_writer
+  ]
+}
+
 # Object Storage Bucket
 resource "yandex_storage_bucket" "main" {
   bucket        = "${var.prefix}-storage-${random_string.bucket_suffix.result}"
@@ -150,6 +176,27 @@ resource "yandex_storage_bucket" "main" {
     list = false
   }
 
+  # Browsers PUT upload parts straight to presigned URLs and need the ETag back
+  cors_rule {
+    allowed_headers = ["*"]
+    allowed_methods = ["PUT"]
+    allowed_origins = ["*"]
+    expose_headers  = ["ETag"]
+    max_age_seconds = 3600
+  }
+
+  # Abandoned uploads: drop unfinished parts after a day, uploaded videos after a week
+  lifecycle_rule {
+    id                                     = "uploads"
+    enabled                                = true
+    prefix                                 = "uploads/"
+    abort_incomplete_multipart_upload_days = 1
+
+    expiration {
+      days = 7
+    }
+  }
+
   lifecycle {
     create_before_destroy = false
   }
@@ -192,6 +239,33 @@ data "archive_file" "list_tasks_function" {
   output_path = "${path.module}/.terraform/list_tasks.zip"
 }
 
+data "archive_file" "task_stats_function" {
+  type        = "zip"
+  source_dir  = "${path.module}/../python_functions/task_stats"
+  output_path = "${path.module}/.terraform/task_stats.zip"
+}
+
+# search_text.py is the worker's module: queries must be tokenized exactly as the index was built
+data "archive_file" "search_tasks_function" {
+  type        = "zip"
+  output_path = "${path.module}/.terraform/search_tasks.zip"
+
+  source {
+    content  = file("${path.module}/../python_functions/search_tasks/index.py")
+    filename = "index.py"
+  }
+
+  source {
+    content  = file("${path.module}/../python_functions/search_tasks/requirements.txt")
+    filename = "requirements.txt"
+  }
+
+  source {
+    content  = file("${path.module}/../worker/search_text.py")
+    filename = "search_text.py"
+  }
+}
+
 data "archive_file" "static_pages_function" {
   type        = "zip"
   source_dir  = "${path.module}/../python_functions/static_pages"
@@ -209,18 +283,37 @@ resource "yandex_function" "create_task" {
   service_account_id = yandex_iam_service_account.functions_sa.id
 
   environment = {
-    YDB_ENDPOINT          = yandex_ydb_database_serverless.main.ydb_full_endpoint
-    YDB_DATABASE          = yandex_ydb_database_serverless.main.database_path
-    MQ_QUEUE_URL          = yandex_message_queue.tasks_queue.id
-    MQ_ENDPOINT           = "https://message-queue.api.cloud.yandex.net"
-    AWS_REGION            = "ru-central1"
-    AWS_ACCESS_KEY_ID     = yandex_iam_service_account_static_access_key.functions_sa_key.access_key
-    AWS_SECRET_ACCESS_KEY = yandex_iam_service_account_static_access_key.functions_sa_key.secret_key
+    YDB_ENDPOINT           = yandex_ydb_database_serverless.main.ydb_full_endpoint
+    YDB_DATABASE           = yandex_ydb_database_serverless.main.database_path
+    MQ_QUEUE_URL           = yandex_message_queue.tasks_queue.id
+    MQ_LONG_QUEUE_URL      = yandex_message_queue.tasks_long_queue.id
+    MQ_ENDPOINT            = "https://message-queue.api.cloud.yandex.net"
+    SHORT_LANE_MAX_SECONDS = var.short_lane_max_seconds
+    SHORT_LANE_MAX_BYTES   = var.short_lane_max_bytes
+    MAX_UPLOAD_BYTES       = var.max_upload_bytes
+    MAX_BACKLOG_SECONDS    = var.max_backlog_seconds
+    SHORT_LANE_PARALLELISM = var.short_lane_parallelism
+    LONG_LANE_PARALLELISM  = var.long_lane_parallelism
+    S3_BUCKET              = yandex_storage_bucket.main.bucket
+    S3_ENDPOINT            = "https://storage.yandexcloud.net"
+    AWS_REGION             = "ru-central1"
+    AWS_ACCESS_KEY_ID      = yandex_iam_service_account_static_access_key.functions_sa_key.access_key
+    AWS_SECRET_ACCESS_KEY  = yandex_iam_service_account_static_access_key.functions_sa_key.secret_key
   }
 
   content {
     zip_filename = data.archive_file.create_task_function.output_path
   }
+
+  depends_on = [
+    yandex_storage_bucket.main
+  ]
+
+  lifecycle {
+    replace_triggered_by = [
+      yandex_storage_bucket.main
+    ]
+  }
 }
 
 # Allow unauthenticated invoke for create_task
@@ -272,6 +365,75 @@ resource "yandex_function_iam_binding" "list_tasks_public" {
   members     = ["system:allUsers"]
 }
 
+# Cloud Function: Task Stats
+resource "yandex_function" "task_stats" {
+  name               = "${var.prefix}-task-stats"
+  user_hash          = data.archive_file.task_stats_function.output_base64sha256
+  runtime            = "python312"
+  entrypoint         = "index.handler"
+  memory             = 128
+  execution_timeout  = "10"
+  service_account_id = yandex_iam_service_account.functions_sa.id
+
+  environment = {
+    YDB_ENDPOINT          = yandex_ydb_database_serverless.main.ydb_full_endpoint
+    YDB_DATABASE          = yandex_ydb_database_serverless.main.database_path
+    MQ_QUEUE_URL          = yandex_message_queue.tasks_queue.id
+    MQ_LONG_QUEUE_URL     = yandex_message_queue.tasks_long_queue.id
+    MQ_ENDPOINT           = "https://message-queue.api.cloud.yandex.net"
+    AWS_REGION            = "ru-central1"
+    AWS_ACCESS_KEY_ID     = yandex_iam_service_account_static_access_key.functions_sa_key.access_key
+    AWS_SECRET_ACCESS_KEY = yandex_iam_service_account_static_access_key.functions_sa_key.secret_key
+  }
+
+  content {
+    zip_filename = data.archive_file.task_stats_function.output_path
+  }
+}
+
+# Allow unauthenticated invoke for task_stats
+resource "yandex_function_iam_binding" "task_stats_public" {
+  function_id = yandex_function.task_stats.id
+  role        = "functions.functionInvoker"
+  members     = ["system:allUsers"]
+}
+
+# Cloud Function: Search Tasks
+resource "yandex_function" "search_tasks" {
+  name               = "${var.prefix}-search-tasks"
+  user_hash          = data.archive_file.search_tasks_function.output_base64sha256
+  runtime            = "python312"
+  entrypoint         = "index.handler"
+  memory             = 256
+  execution_timeout  = "10"
+  service_account_id = yandex_iam_service_account.functions_sa.id
+
+  environment = {
+    YDB_ENDPOINT          = yandex_ydb_database_serverless.main.ydb_full_endpoint
+    YDB_DATABASE          = yandex_ydb_database_serverless.main.database_path
+    S3_BUCKET             = yandex_storage_bucket.main.bucket
+    S3_ENDPOINT           = "https://storage.yandexcloud.net"
+    AWS_REGION            = "ru-central1"
+    AWS_ACCESS_KEY_ID     = yandex_iam_service_account_static_access_key.functions_sa_key.access_key
+    AWS_SECRET_ACCESS_KEY = yandex_iam_service_account_static_access_key.functions_sa_key.secret_key
+  }
+
+  content {
+    zip_filename = data.archive_file.search_tasks_function.output_path
+  }
+
+  depends_on = [
+    yandex_storage_bucket.main
+  ]
+}
+
+# Allow unauthenticated invoke for search_tasks
+resource "yandex_function_iam_binding" "search_tasks_public" {
+  function_id = yandex_function.search_tasks.id
+  role        = "functions.functionInvoker"
+  members     = ["system:allUsers"]
+}
+
 # Cloud Function: Static Pages
 resource "yandex_function" "static_pages" {
   name               = "${var.prefix}-static-pages"
@@ -367,30 +529,45 @@ resource "yandex_iam_service_account_api_key" "worker_api_key" {
   description        = "API key for YandexGPT and SpeechKit access"
 }
 
+locals {
+  # Shared by the short- and long-lane worker containers
+  worker_environment = {
+    YDB_ENDPOINT               = yandex_ydb_database_serverless.main.ydb_full_endpoint
+    YDB_DATABASE               = yandex_ydb_database_serverless.main.database_path
+    MQ_QUEUE_URL               = yandex_message_queue.tasks_queue.id
+    MQ_LONG_QUEUE_URL          = yandex_message_queue.tasks_long_queue.id
+    MQ_ENDPOINT                = "https://message-queue.api.cloud.yandex.net"
+    LONG_LANE_MAX_WAIT_SECONDS = var.long_lane_max_wait_seconds
+    STT_RATE_PER_SECOND        = var.stt_rate_per_second
+    GPT_RATE_PER_SECOND        = var.gpt_rate_per_second
+    VAD_ENABLED                = var.vad_enabled
+    WORKER_RUNTIME             = var.worker_runtime
+    AWS_REGION                 = "ru-central1"
+    AWS_ACCESS_KEY_ID          = yandex_iam_service_account_static_access_key.worker_sa_key.access_key
+    AWS_SECRET_ACCESS_KEY      = yandex_iam_service_account_static_access_key.worker_sa_key.secret_key
+    S3_BUCKET                  = yandex_storage_bucket.main.bucket
+    S3_ENDPOINT                = "https://storage.yandexcloud.net"
+    FOLDER_ID                  = var.folder_id
+    YANDEX_API_KEY             = yandex_iam_service_account_api_key.worker_api_key.secret_key
+  }
+}
+
 resource "yandex_serverless_container" "worker" {
   name               = "${var.prefix}-worker"
   folder_id          = var.folder_id
   service_account_id = yandex_iam_service_account.worker_sa.id
   memory             = 2048   # 2GB for video processing
   execution_timeout  = "900s" # 15 minutes (maximum allowed)
-  concurrency        = 2      # Process up to 2 requests per container instance
+  concurrency        = var.worker_concurrency
 
   image {
     url = docker_registry_image.worker.name
 
-    environment = {
-      YDB_ENDPOINT          = yandex_ydb_database_serverless.main.ydb_full_endpoint
-      YDB_DATABASE          = yandex_ydb_database_serverless.main.database_path
-      MQ_QUEUE_URL          = yandex_message_queue.tasks_queue.id
-      MQ_ENDPOINT           = "https://message-queue.api.cloud.yandex.net"
-      AWS_REGION            = "ru-central1"
-      AWS_ACCESS_KEY_ID     = yandex_iam_service_account_static_access_key.worker_sa_key.access_key
-      AWS_SECRET_ACCESS_KEY = yandex_iam_service_account_static_access_key.worker_sa_key.secret_key
-      S3_BUCKET             = yandex_storage_bucket.main.bucket
-      S3_ENDPOINT           = "https://storage.yandexcloud.net"
-      FOLDER_ID             = var.folder_id
-      YANDEX_API_KEY        = yandex_iam_service_account_api_key.worker_api_key.secret_key
-    }
+    # The container runs on the default single core; ffmpeg sizes its process count from it
+    environment = merge(local.worker_environment, {
+      WORKER_CORES  = 1
+      MEDIA_WORKERS = min(var.worker_concurrency, 2)
+    })
   }
 
   depends_on = [
@@ -435,6 +612,87 @@ resource "yandex_function_trigger" "worker_trigger" {
   }
 }
 
+# Long-lane worker: same image, its own trigger and concurrency
+resource "yandex_serverless_container" "worker_long" {
+  name               = "${var.prefix}-worker-long"
+  folder_id          = var.folder_id
+  service_account_id = yandex_iam_service_account.worker_sa.id
+  memory             = 2048
+  cores              = var.long_lane_cores
+  execution_timeout  = "900s"
+  concurrency        = var.long_lane_concurrency
+
+  image {
+    url = docker_registry_image.worker.name
+
+    environment = merge(local.worker_environment, {
+      WORKER_CORES  = var.long_lane_cores
+      MEDIA_WORKERS = var.long_lane_concurrency
+    })
+  }
+
+  depends_on = [
+    docker_registry_image.worker,
+    yandex_container_registry_iam_binding.worker_puller,
+    yandex_storage_bucket.main
+  ]
+
+  lifecycle {
+    replace_triggered_by = [
+      yandex_storage_bucket.main
+    ]
+    create_before_destroy = false
+  }
+}
+
+resource "yandex_function_trigger" "worker_long_trigger" {
+  name        = "${var.prefix}-worker-long-trigger"
+  folder_id   = var.folder_id
+  description = "Trigger long-lane worker container on new messages in the long queue"
+
+  message_queue {
+    queue_id           = yandex_message_queue.tasks_long_queue.arn
+    service_account_id = yandex_iam_service_account.worker_sa.id
+    batch_size         = 1
+    batch_cutoff       = 0
+  }
+
+  container {
+    id                 = yandex_serverless_container.worker_long.id
+    service_account_id = yandex_iam_service_account.worker_sa.id
+  }
+
+  depends_on = [
+    yandex_serverless_container.worker_long,
+    yandex_message_queue.tasks_long_queue
+  ]
+
+  lifecycle {
+    create_before_destroy = false
+  }
+}
+
+# Aging: periodically promote long-lane tasks that waited too long and fail abandoned uploads
+resource "yandex_function_trigger" "promote_trigger" {
+  name        = "${var.prefix}-promote-trigger"
+  folder_id   = var.folder_id
+  description = "Promote aged long-lane tasks to the short lane and expire abandoned uploads"
+
+  timer {
+    cron_expression = "*/5 * ? * * *"
+  }
+
+  container {
+    id                 = yandex_serverless_container.worker.id
+    service_account_id = yandex_iam_service_account.worker_sa.id
+    path               = "/promote"
+  }
+
+  depends_on = [
+    yandex_serverless_container.worker
+  ]
+}
+
 # API Gateway
 resource "yandex_api_gateway" "main" {
   name        = "${var.prefix}-api-gateway"
@@ -445,12 +703,18 @@ resource "yandex_api_gateway" "main" {
     static_pages_function_id = yandex_function.static_pages.id
     list_tasks_function_id   = yandex_function.list_tasks.id
     create_task_function_id  = yandex_function.create_task.id
+    task_stats_function_id   = yandex_function.task_stats.id
+    search_tasks_function_id = yandex_function.search_tasks.id
+    worker_container_id      = yandex_serverless_container.worker.id
     functions_sa_id          = yandex_iam_service_account.functions_sa.id
   })
 
   depends_on = [
     yandex_function.static_pages,
     yandex_function.list_tasks,
-    yandex_function.create_task
+    yandex_function.create_task,
+    yandex_function.task_stats,
+    yandex_function.search_tasks,
+    yandex_serverless_container.worker
   ]
 }
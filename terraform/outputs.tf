@@ -16,6 +16,12 @@ output "queue_url" {
   sensitive   = true
 }
 
+output "long_queue_url" {
+  description = "Message Queue URL of the long lane"
+  value       = yandex_message_queue.tasks_long_queue.id
+  sensitive   = true
+}
+
 output "bucket_name" {
   description = "Object Storage bucket name"
   value       = yandex_storage_bucket.main.bucket
@@ -48,6 +54,16 @@ output "list_tasks_function_id" {
   value       = yandex_function.list_tasks.id
 }
 
+output "task_stats_function_id" {
+  description = "Task Stats Function ID"
+  value       = yandex_function.task_stats.id
+}
+
+output "search_tasks_function_id" {
+  description = "Search Tasks Function ID"
+  value       = yandex_function.search_tasks.id
+}
+
 output "static_pages_function_id" {
   description = "Static Pages Function ID"
   value       = yandex_function.static_pages.id
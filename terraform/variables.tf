@@ -41,3 +41,87 @@ variable "yc_token" {
   type        = string
   sensitive   = true
 }
+
+variable "short_lane_max_seconds" {
+  description = "Videos up to this duration (or up to short_lane_max_bytes when duration is unknown) go to the short lane"
+  type        = number
+  default     = 1800
+}
+
+variable "short_lane_max_bytes" {
+  description = "Size limit for the short lane when Disk does not report the video duration"
+  type        = number
+  default     = 104857600 # 100 MB
+}
+
+variable "max_backlog_seconds" {
+  description = "create_task answers 429 when the estimated wait in a lane exceeds this; 0 disables admission control"
+  type        = number
+  default     = 7200
+}
+
+variable "short_lane_parallelism" {
+  description = "Tasks the short lane processes at once, used to estimate queue wait"
+  type        = number
+  default     = 4
+}
+
+variable "long_lane_parallelism" {
+  description = "Tasks the long lane processes at once, used to estimate queue wait"
+  type        = number
+  default     = 2
+}
+
+variable "max_upload_bytes" {
+  description = "Largest video accepted through direct upload to Object Storage"
+  type        = number
+  default     = 209715200 # 200 MB
+}
+
+variable "long_lane_max_wait_seconds" {
+  description = "Long-lane tasks waiting longer than this are promoted to the short lane"
+  type        = number
+  default     = 3600
+}
+
+variable "worker_runtime" {
+  description = "Worker runtime: \"threads\" (waitress, a thread per task) or \"async\" (one event loop drives all tasks of a container; opt-in until load-tested)"
+  type        = string
+  default     = "threads"
+}
+
+variable "worker_concurrency" {
+  description = "Requests per short-lane worker container instance; keep at 4 or less with the threads runtime"
+  type        = number
+  default     = 2
+}
+
+variable "long_lane_concurrency" {
+  description = "Requests per long-lane worker container instance"
+  type        = number
+  default     = 1
+}
+
+variable "long_lane_cores" {
+  description = "vCPUs per long-lane worker instance; audio of long videos is extracted by one ffmpeg process per core"
+  type        = number
+  default     = 2
+}
+
+variable "stt_rate_per_second" {
+  description = "SpeechKit recognition requests per second shared by all workers (0 disables the limiter)"
+  type        = number
+  default     = 0.5
+}
+
+variable "gpt_rate_per_second" {
+  description = "YandexGPT completion requests per second shared by all workers (0 disables the limiter)"
+  type        = number
+  default     = 1
+}
+
+variable "vad_enabled" {
+  description = "Trim long silences from the audio before sending it to SpeechKit"
+  type        = bool
+  default     = false
+}
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Worker modules import each other by bare name, as they do in the container
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "worker"))
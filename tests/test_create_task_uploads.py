@@ -0,0 +1,111 @@
+import importlib.util
+import json
+import os
+import sys
+
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from standins import fake_ydb
+
+FUNCTION_PATH = os.path.join(os.path.dirname(__file__), "..", "python_functions", "create_task", "index.py")
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code}}, "operation")
+
+
+class FakeS3:
+    """Multipart upload of one object; upload_id None means the upload is gone."""
+
+    def __init__(self, part_sizes, upload_id="upload-1"):
+        self.parts = {n: {"PartNumber": n, "ETag": f"etag-{n}", "Size": size} for n, size in enumerate(part_sizes, 1)}
+        self.upload_id = upload_id
+        self.object_size = None
+
+    def list_parts(self, Bucket, Key, UploadId, PartNumberMarker):
+        if UploadId != self.upload_id:
+            raise client_error("NoSuchUpload")
+        return {"Parts": list(self.parts.values()), "IsTruncated": False}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        if UploadId != self.upload_id:
+            raise client_error("NoSuchUpload")
+        self.object_size = sum(self.parts[part["PartNumber"]]["Size"] for part in MultipartUpload["Parts"])
+        self.upload_id = None
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.upload_id = None
+        self.parts = {}
+
+    def head_object(self, Bucket, Key):
+        if self.object_size is None:
+            raise client_error("404")
+        return {"ContentLength": self.object_size}
+
+    def delete_object(self, Bucket, Key):
+        self.object_size = None
+
+
+def load_create_task(monkeypatch, s3, size_bytes):
+    monkeypatch.setenv("YDB_ENDPOINT", "grpc://localhost:2136")
+    monkeypatch.setenv("YDB_DATABASE", "/local")
+    monkeypatch.setenv("S3_BUCKET", "bucket")
+    spec = importlib.util.spec_from_file_location("fn_create_task_uploads", FUNCTION_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    fake_ydb.install(module)
+    fake_ydb.DATABASE.tables.clear()
+
+    queued = []
+    monkeypatch.setattr(module, "s3_client", lambda: s3)
+    monkeypatch.setattr(module, "enqueue_task", lambda task_id, lane: queued.append(task_id))
+    driver, pool = module.connect_ydb()
+    module.insert_task(pool, {
+        "task_id": "t1", "title": "Лекция", "video_link": "lecture.mp4", "status": "uploading",
+        "created_at": "2026-01-01T00:00:00+00:00", "updated_at": "2026-01-01T00:00:00+00:00",
+        "size_bytes": size_bytes, "duration_seconds": None, "lane": "short",
+        "upload_key": "uploads/t1/video.mp4", "upload_id": "upload-1",
+    })
+    return module, queued
+
+
+def task_status(module):
+    driver, pool = module.connect_ydb()
+    return module.get_upload_task(pool, "t1").status
+
+
+def test_upload_of_declared_size_is_queued(monkeypatch):
+    s3 = FakeS3([1000])
+    module, queued = load_create_task(monkeypatch, s3, 1000)
+
+    response = module.complete_upload("t1")
+
+    assert response["statusCode"] == 200
+    assert queued == ["t1"]
+    assert task_status(module) == "queued"
+
+
+def test_upload_larger_than_declared_is_rejected(monkeypatch):
+    s3 = FakeS3([5000])
+    module, queued = load_create_task(monkeypatch, s3, 1000)
+
+    response = module.complete_upload("t1")
+
+    assert response["statusCode"] == 413
+    assert queued == []
+    assert s3.parts == {} and s3.object_size is None
+    assert task_status(module) == "error"
+
+
+def test_expired_upload_is_not_queued(monkeypatch):
+    s3 = FakeS3([1000], upload_id=None)
+    module, queued = load_create_task(monkeypatch, s3, 1000)
+
+    response = module.complete_upload("t1")
+
+    assert response["statusCode"] == 410
+    assert "expired" in json.loads(response["body"])["error"]
+    assert queued == []
+    assert task_status(module) == "error"
@@ -0,0 +1,46 @@
+import pytest
+import requests
+
+import resilience
+from rate_limiter import RateLimitExceeded
+
+
+def half_open_breaker(name):
+    circuit = resilience.breaker(name)
+    for _ in range(circuit.failure_threshold):
+        circuit.record_failure()
+    circuit.opened_at -= circuit.reset_seconds
+    return circuit
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(response=response)
+
+
+def raising(error):
+    def fn():
+        raise error
+    return fn
+
+
+def test_error_raised_before_the_dependency_answered_keeps_the_circuit_open():
+    circuit = half_open_breaker("test-rate-limited")
+
+    with pytest.raises(RateLimitExceeded):
+        resilience.call("test-rate-limited", raising(RateLimitExceeded("booked")))
+
+    assert circuit.opened_at is not None
+    # The trial slot is free again, so the next call still probes
+    assert resilience.call("test-rate-limited", lambda: "ok") == "ok"
+    assert circuit.opened_at is None
+
+
+def test_non_retryable_response_closes_the_circuit():
+    circuit = half_open_breaker("test-bad-request")
+
+    with pytest.raises(requests.HTTPError):
+        resilience.call("test-bad-request", raising(http_error(400)))
+
+    assert circuit.opened_at is None
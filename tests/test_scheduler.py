@@ -0,0 +1,67 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from standins import fake_ydb
+import scheduler
+import ydb_client
+
+
+def make_client(monkeypatch):
+    monkeypatch.setenv("YDB_ENDPOINT", "grpc://localhost:2136")
+    monkeypatch.setenv("YDB_DATABASE", "/local")
+    fake_ydb.install(ydb_client)
+    fake_ydb.DATABASE.tables.clear()
+    session = fake_ydb.Session(fake_ydb.DATABASE)
+    session.execute_scheme("""
+        CREATE TABLE tasks (
+            task_id Utf8, status Utf8, lane Utf8, created_at Utf8, updated_at Utf8, error_message Utf8,
+            PRIMARY KEY (task_id),
+            INDEX idx_lane_status_created GLOBAL ASYNC ON (lane, status, created_at)
+        );
+    """)
+    session.execute_scheme("CREATE TABLE task_counters (period Utf8, name Utf8, value Int64, PRIMARY KEY (period, name));")
+    client = ydb_client.YDBClient()
+    monkeypatch.setattr(scheduler, "get_shared_client", lambda: client)
+    return client
+
+
+def add_task(task_id, status, age_seconds):
+    created_at = (datetime.now(timezone.utc) - timedelta(seconds=age_seconds)).isoformat()
+    fake_ydb.DATABASE.execute(
+        """
+        UPSERT INTO tasks (task_id, status, lane, created_at, updated_at)
+        VALUES ($task_id, $status, $lane, $created_at, $created_at);
+        UPSERT INTO task_counters (period, name, value) VALUES ('current', $name, 1);
+        """,
+        {"$task_id": task_id, "$status": status, "$lane": "short", "$created_at": created_at, "$name": f"status:{status}"},
+    )
+
+
+def counter(name):
+    rows = fake_ydb.DATABASE.execute(
+        "SELECT value FROM task_counters WHERE period = 'current' AND name = $name;", {"$name": name}
+    )[0].rows
+    return rows[0].value if rows else 0
+
+
+def test_stale_upload_becomes_error_and_leaves_counter(monkeypatch):
+    client = make_client(monkeypatch)
+    add_task("stale", "uploading", scheduler.STALE_UPLOAD_SECONDS + 60)
+
+    assert scheduler.expire_stale_uploads() == 1
+    assert client.get_task("stale")["status"] == "error"
+    assert counter("status:uploading") == 0
+    assert counter("status:error") == 1
+
+
+def test_recent_upload_and_queued_task_are_kept(monkeypatch):
+    client = make_client(monkeypatch)
+    add_task("recent", "uploading", 60)
+    add_task("queued", "queued", scheduler.STALE_UPLOAD_SECONDS + 60)
+
+    assert scheduler.expire_stale_uploads() == 0
+    assert client.get_task("recent")["status"] == "uploading"
+    assert client.get_task("queued")["status"] == "queued"
@@ -0,0 +1,36 @@
+import importlib.util
+import os
+
+import search_index
+from search_text import Segment
+
+FUNCTION_PATH = os.path.join(os.path.dirname(__file__), "..", "python_functions", "search_tasks", "index.py")
+
+
+def load_search_function():
+    # Deployed, search_text.py sits next to index.py; here it is found on the worker path
+    spec = importlib.util.spec_from_file_location("search_tasks_index", FUNCTION_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_query_finds_other_word_forms():
+    search = load_search_function().search
+    segment = Segment(search_index.task_segment("t1", "Лекция", "Нейронных сетей обучение", "о нейронных сетях"))
+    other = Segment(search_index.task_segment("t2", "Другая", "Линейная алгебра", "матрицы"))
+
+    total, results = search([segment, other], "нейронная сеть", 10)
+
+    assert total == 1
+    assert results[0]["task_id"] == "t1"
+
+
+def test_merged_segment_keeps_latest_copy():
+    old = search_index.task_segment("t1", "Старое", "старый текст", "")
+    new = search_index.task_segment("t1", "Новое", "новый текст", "")
+    merged = Segment(search_index.merge_segments([Segment(old), Segment(new)]))
+
+    assert merged.docs == [["t1", "Новое"]]
+    assert merged.find("стар") == -1
+    assert merged.find("нов") >= 0
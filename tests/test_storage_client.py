@@ -0,0 +1,19 @@
+from storage_client import content_disposition
+
+
+def test_non_ascii_title_gets_ascii_fallback_and_utf8_name():
+    header = content_disposition("Лекция 1: введение.pdf")
+
+    assert header.isascii()
+    assert 'filename="1.pdf"' in header
+    assert "filename*=UTF-8''%D0%9B%D0%B5%D0%BA%D1%86%D0%B8%D1%8F%201%3A%20" in header
+
+
+def test_quotes_and_separators_do_not_escape_the_header():
+    header = content_disposition('Intro"; filename="evil.exe.pdf')
+
+    fallback = header.split('filename="')[1].split('"')[0]
+    assert fallback == "Intro filenameevil.exe.pdf"
+    assert header.count('"') == 2
+    assert "filename*=UTF-8''Intro%22%3B%20filename%3D%22evil.exe.pdf" in header
+    assert content_disposition("Лекция.pdf").startswith('attachment; filename="download.pdf"')
@@ -0,0 +1,41 @@
+import summary
+from summary import SummaryResult
+
+
+def fake_run(calls):
+    def run(request):
+        calls.append(request)
+        return SummaryResult(f"конспект {len(calls)}", request.model, 10, 5, 1.0)
+    return run
+
+
+def test_short_transcript_is_one_request():
+    calls = []
+    result = summary.summarize("Короткая лекция.", fake_run(calls))
+
+    assert len(calls) == 1
+    assert "Короткая лекция." in calls[0].prompt
+    assert result.input_tokens == 10
+
+
+def test_long_transcript_is_summarized_in_full():
+    sentences = [f"Предложение номер {number}." for number in range(60000)]
+    text = " ".join(sentences)
+    calls = []
+    result = summary.summarize(text, fake_run(calls))
+
+    part_prompts = [call.prompt for call in calls if "часть" in call.prompt.split("\n")[0]]
+    assert len(part_prompts) > 1
+    assert all(sentence in "".join(part_prompts) for sentence in (sentences[0], sentences[30000], sentences[-1]))
+    assert all(len(prompt) // summary.CHARS_PER_TOKEN < summary.CONTEXT_WINDOW_TOKENS for prompt in part_prompts)
+    # The last request merges every part summary
+    assert all(f"конспект {number}" in calls[-1].prompt for number in range(1, len(part_prompts) + 1))
+    assert result.input_tokens == 10 * len(calls)
+
+
+def test_split_keeps_every_word_within_the_limit():
+    text = "слово " * 10000
+    parts = summary.split_transcript(text, 7000)
+
+    assert all(len(part) <= 7000 for part in parts)
+    assert sum(len(part.split()) for part in parts) == 10000
@@ -0,0 +1,49 @@
+import importlib.util
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from standins import fake_ydb
+
+FUNCTION_PATH = os.path.join(os.path.dirname(__file__), "..", "python_functions", "create_task", "index.py")
+
+
+def load_create_task():
+    spec = importlib.util.spec_from_file_location("fn_create_task_counters", FUNCTION_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    fake_ydb.install(module)
+    fake_ydb.DATABASE.tables.clear()
+    return module
+
+
+def current_counters():
+    rows = fake_ydb.DATABASE.execute("SELECT name, value FROM task_counters WHERE period = 'current';")[0].rows
+    return {row.name: row.value for row in rows}
+
+
+def test_existing_tasks_seed_the_status_counts_once():
+    module = load_create_task()
+    session = fake_ydb.Session(fake_ydb.DATABASE)
+    session.execute_scheme("CREATE TABLE tasks (task_id Utf8, status Utf8, PRIMARY KEY (task_id));")
+    session.execute_scheme("CREATE TABLE task_counters (period Utf8, name Utf8, value Int64, PRIMARY KEY (period, name));")
+    for task_id, status in [("a", "completed"), ("b", "completed"), ("c", "queued")]:
+        fake_ydb.DATABASE.execute(
+            "UPSERT INTO tasks (task_id, status) VALUES ($task_id, $status);",
+            {"$task_id": task_id, "$status": status},
+        )
+    # Deltas written before the seeding, for a task that predates the counters
+    fake_ydb.DATABASE.execute("UPSERT INTO task_counters (period, name, value) VALUES ('current', 'status:error', -1);")
+
+    pool = fake_ydb.SessionPool(fake_ydb.Driver())
+    module.ensure_table_exists(pool)
+
+    counters = current_counters()
+    assert counters["status:completed"] == 2
+    assert counters["status:queued"] == 1
+    assert counters["status:error"] == 0
+
+    fake_ydb.DATABASE.execute("UPSERT INTO tasks (task_id, status) VALUES ('d', 'queued');")
+    assert module.seed_status_counters(pool) is False
+    assert current_counters()["status:queued"] == 1
@@ -0,0 +1,49 @@
+from transcript_store import TimedTranscript
+
+
+def chunk(text, words):
+    return {
+        "alternatives": [{
+            "text": text,
+            "words": [
+                {"word": word, "startTime": f"{start}s", "endTime": f"{start + 0.5}s"}
+                for word, start in words
+            ],
+        }]
+    }
+
+
+def offsets(transcript):
+    return list(transcript.word_offsets)
+
+
+def test_word_inside_previous_word_gets_its_own_offset():
+    transcript = TimedTranscript.from_chunks([chunk("вопрос в том", [("вопрос", 10), ("в", 20), ("том", 30)])])
+
+    assert offsets(transcript) == [0, len("вопрос ".encode()), len("вопрос в ".encode())]
+    assert transcript.slice(0, 20) == "вопрос"
+    assert transcript.slice(20, 50) == "в том"
+
+
+def test_repeated_words_do_not_collapse():
+    transcript = TimedTranscript.from_chunks([chunk("да да нет", [("да", 1), ("да", 2), ("нет", 3)])])
+
+    assert offsets(transcript) == [0, len("да ".encode()), len("да да ".encode())]
+    assert transcript.slice(2, 4) == "да нет"
+
+
+def test_word_is_not_matched_inside_a_later_word():
+    transcript = TimedTranscript.from_chunks([chunk("Твой вопрос в том", [("твой", 1), ("вопрос", 2), ("в", 3), ("том", 4)])])
+
+    assert transcript.slice(3, 5) == "в том"
+
+
+def test_offsets_continue_across_chunks():
+    transcript = TimedTranscript.from_chunks([
+        chunk("да да", [("да", 1), ("да", 2)]),
+        chunk("да нет", [("да", 3), ("нет", 4)]),
+    ])
+
+    assert transcript.text == "да да да нет"
+    assert transcript.slice(2, 3.5) == "да да"
+    assert TimedTranscript.from_bytes(transcript.to_bytes()).slice(3, 5) == "да нет"
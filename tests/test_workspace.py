@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+from workspace import WorkspaceBusy, WorkspaceManager
+
+
+def test_second_workspace_of_a_running_task_is_refused(tmp_path):
+    manager = WorkspaceManager(str(tmp_path / "tasks"), limit_bytes=10_000)
+
+    with manager.open("t1", 1_000) as workspace:
+        with open(workspace.path("video.mp4"), "wb") as f:
+            f.write(b"video")
+        with pytest.raises(WorkspaceBusy):
+            with manager.open("t1", 1_000):
+                pass
+        assert os.path.exists(workspace.path("video.mp4"))
+        assert manager.reserved == {"t1": 1_000}
+        first_directory = workspace.directory
+
+    assert manager.reserved == {}
+    assert not os.path.exists(first_directory)
+    with manager.open("t1", 1_000) as workspace:
+        assert workspace.directory != first_directory
@@ -0,0 +1,154 @@
+"""
+Task I/O of the async worker runtime (WORKER_RUNTIME=async).
+
+Tasks run processor.run_task, the same pipeline as the synchronous runtime,
+as coroutines on one event loop with AsyncTaskIO. Disk and SpeechKit
+requests share an aiohttp session, task state goes through AsyncYDBClient,
+YandexGPT through the SDK's asyncio client, and the waits between STT
+polls, retries and rate-limit tokens are asyncio sleeps, so a task waiting
+on the network holds no thread.
+
+Blocking work runs in executors: ffmpeg (audio extraction and silence
+trimming) in MEDIA_WORKERS threads, boto3 transfers and the search index in
+the default pool. Download, extraction and audio upload of a task happen
+under one of MEDIA_WORKERS slots, in a task workspace booked from the shared
+/tmp limit (see workspace), so however many tasks are waiting on SpeechKit
+only a few videos and WAVs sit in /tmp; the workspace is deleted as soon as
+the audio is uploaded.
+
+Stage CPU time is measured on the event loop thread and may include other
+tasks' work. Profiled tasks run with BlockingTaskIO in a thread of their
+own, since cProfile and tracemalloc cannot tell apart tasks sharing the loop.
+"""
+import os
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from async_ydb_client import get_shared_async_client
+from ydb_client import get_shared_client
+from storage_client import StorageClient
+from video_processor import MEDIA_WORKERS, download_video_async
+from transcription import recognize_chunks_async
+from summary import generate_summary_async
+from workspace import Workspace, get_workspace_manager
+from processor import DISK_API_URL, check_video_metadata, process_task, run_task
+from resilience import end_task_budget, start_task_budget
+from structured_logging import bind, unbind
+import resilience
+from metrics import TASKS_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+_media_executor = ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix="media")
+_media_slots = asyncio.Semaphore(MEDIA_WORKERS)
+_http_session = None
+
+
+async def get_http_session():
+    """aiohttp session shared by all tasks, created on first use inside the loop."""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        import aiohttp
+        _http_session = aiohttp.ClientSession()
+    return _http_session
+
+
+async def close_http_session() -> None:
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+
+
+async def get_disk_metadata_async(session, video_link: str) -> Dict[str, Any]:
+    import aiohttp
+    
+    api_url = f"{DISK_API_URL}/v1/disk/public/resources"
+    async with session.get(api_url, params={"public_key": video_link}, timeout=aiohttp.ClientTimeout(total=10)) as response:
+        if response.status == 429 or response.status >= 500:
+            # Disk itself is failing, not the link; let the retry layer see it
+            response.raise_for_status()
+        if response.status != 200:
+            raise Exception("Invalid or inaccessible video link")
+        return await response.json()
+
+
+async def validate_yandex_disk_link_async(session, video_link: str) -> Dict[str, Any]:
+    return check_video_metadata(await get_disk_metadata_async(session, video_link))
+
+
+async def get_download_url_async(session, video_link: str) -> str:
+    import aiohttp
+    
+    api_url = f"{DISK_API_URL}/v1/disk/public/resources/download"
+    async with session.get(api_url, params={"public_key": video_link}, timeout=aiohttp.ClientTimeout(total=10)) as response:
+        response.raise_for_status()
+        return (await response.json())["href"]
+
+
+def progress_reporter(loop: asyncio.AbstractEventLoop) -> Callable[[str, str], None]:
+    """StageTimer callback; unbuffered progress (PROGRESS_FLUSH_SECONDS=0) is written off the loop."""
+    ydb_client = get_shared_client()
+    if ydb_client.progress.flush_seconds > 0:
+        return ydb_client.report_progress
+    return lambda task_id, stage: loop.run_in_executor(None, ydb_client.report_progress, task_id, stage)
+
+
+class AsyncTaskIO:
+    """Task I/O of the async runtime; same interface as processor.BlockingTaskIO."""
+    
+    def __init__(self, db, session, loop: asyncio.AbstractEventLoop):
+        self.db = db
+        self.session = session
+        # Search index and progress stay on the synchronous client
+        self.ydb = get_shared_client()
+        self.storage = StorageClient()
+        self.report_progress = progress_reporter(loop)
+    
+    @classmethod
+    async def create(cls) -> "AsyncTaskIO":
+        return cls(await get_shared_async_client(), await get_http_session(), asyncio.get_running_loop())
+    
+    async def blocking(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    
+    async def media(self, fn: Callable[..., Any], *args) -> Any:
+        # run_in_executor does not carry context variables (the task's log fields) over
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(_media_executor, context.run, fn, *args)
+    
+    @asynccontextmanager
+    async def workspace(self, task_id: str, size_bytes: int) -> AsyncIterator[Workspace]:
+        # The slot first: a task waiting for one holds no /tmp booking
+        async with _media_slots, get_workspace_manager().open_async(task_id, size_bytes) as workspace:
+            yield workspace
+    
+    async def validate_link(self, video_link: str) -> Dict[str, Any]:
+        return await resilience.call_async("disk", validate_yandex_disk_link_async, self.session, video_link)
+    
+    async def download_video(self, video_link: str, path: str) -> int:
+        download_url = await resilience.call_async("disk", get_download_url_async, self.session, video_link)
+        return await resilience.call_async("disk", download_video_async, self.session, download_url, path)
+    
+    async def recognize(self, audio_s3_uri: str, folder_id: str):
+        return await recognize_chunks_async(self.session, audio_s3_uri, folder_id, self.db)
+    
+    async def summarize(self, text: str, folder_id: str):
+        return await generate_summary_async(text, folder_id, self.db)
+
+
+async def process_task_async(task_id: str, profile: bool = False, lane: Optional[str] = None, releases: int = 0) -> None:
+    if profile:
+        await asyncio.to_thread(process_task, task_id, True, lane, releases)
+        return
+    
+    TASKS_IN_FLIGHT.inc()
+    log_context = bind(task_id=task_id, lane=lane, attempt=releases + 1)
+    budget = start_task_budget()
+    try:
+        await run_task(task_id, await AsyncTaskIO.create(), lane=lane, releases=releases)
+    finally:
+        end_task_budget(budget)
+        unbind(log_context)
+        TASKS_IN_FLIGHT.dec()
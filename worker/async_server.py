@@ -0,0 +1,149 @@
+"""
+HTTP server of the async worker runtime (WORKER_RUNTIME=async).
+
+aiohttp answers the Message Queue trigger itself: each task runs as a
+coroutine on the server's event loop (see async_processor), so a container
+can take as many concurrent trigger requests as its `concurrency` setting
+allows without a thread per task. /health and /metrics are served on the
+loop as well. Every other route goes to the Flask app through WSGI in the
+default thread pool, so the PDF and re-summary endpoints behave exactly as
+they do under waitress.
+"""
+import io
+import sys
+import json
+import logging
+import asyncio
+from aiohttp import web
+from multidict import CIMultiDict
+import metrics
+import warmup
+from structured_logging import Lazy, flush_logs
+
+logger = logging.getLogger(__name__)
+
+# Set by the server from the response body
+HOP_HEADERS = {"content-length", "transfer-encoding", "connection"}
+
+
+async def handle_trigger(request: web.Request) -> web.Response:
+    # Pipeline modules are imported on first use (or by the pre-warm thread)
+    from async_processor import process_task_async
+    from trigger import task_messages
+    
+    try:
+        data = await request.json()
+        
+        if not data or "messages" not in data:
+            logger.error("Invalid request format: missing 'messages' field")
+            return web.json_response({"status": "error", "message": "Invalid request format"})
+        
+        logger.info("Received trigger request with %d messages", len(data["messages"]))
+        logger.debug("Trigger request: %s", Lazy(json.dumps, data))
+        
+        for task_id, options in task_messages(data["messages"]):
+            try:
+                logger.info(f"Processing task: {task_id}")
+                await process_task_async(task_id, **options)
+                logger.info(f"Task {task_id} processed successfully")
+            except Exception as e:
+                logger.error(f"Error processing message: {str(e)}", exc_info=True)
+                continue
+        
+        return web.json_response({"status": "ok"})
+    
+    except Exception as e:
+        logger.error(f"Error handling trigger request: {str(e)}", exc_info=True)
+        return web.json_response({"status": "error", "message": str(e)})
+    
+    finally:
+        await asyncio.to_thread(flush_logs)
+
+
+async def health_check(request: web.Request) -> web.Response:
+    return web.json_response(warmup.status(), status=200 if warmup.is_ready() else 503)
+
+
+async def metrics_endpoint(request: web.Request) -> web.Response:
+    return web.Response(body=metrics.render().encode("utf-8"), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+
+def wsgi_environ(request: web.Request, body: bytes) -> dict:
+    host, _, port = (request.host or "localhost").partition(":")
+    environ = {
+        "REQUEST_METHOD": request.method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": request.path,
+        "QUERY_STRING": request.query_string,
+        "SERVER_NAME": host,
+        "SERVER_PORT": port or "80",
+        "SERVER_PROTOCOL": f"HTTP/{request.version.major}.{request.version.minor}",
+        "REMOTE_ADDR": request.remote or "",
+        "CONTENT_TYPE": request.headers.get("Content-Type", ""),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": request.scheme,
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name in request.headers.keys():
+        key = "HTTP_" + name.upper().replace("-", "_")
+        if key not in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+            environ[key] = ",".join(request.headers.getall(name))
+    return environ
+
+
+def wsgi_handler(wsgi_app):
+    """Serve a WSGI app from aiohttp, running each request in the default thread pool."""
+    
+    def call(environ: dict):
+        response = {}
+        
+        def start_response(status, headers, exc_info=None):
+            response["status"], response["headers"] = status, headers
+        
+        chunks = wsgi_app(environ, start_response)
+        try:
+            body = b"".join(chunks)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        return response["status"], response["headers"], body
+    
+    async def handler(request: web.Request) -> web.Response:
+        environ = wsgi_environ(request, await request.read())
+        status, headers, body = await asyncio.to_thread(call, environ)
+        code, _, reason = status.partition(" ")
+        return web.Response(
+            status=int(code),
+            reason=reason or None,
+            body=body,
+            headers=CIMultiDict((name, value) for name, value in headers if name.lower() not in HOP_HEADERS),
+        )
+    
+    return handler
+
+
+async def close_clients(app: web.Application) -> None:
+    from async_processor import close_http_session
+    from async_ydb_client import close_shared_async_client
+    
+    await close_http_session()
+    await close_shared_async_client()
+
+
+def build_app(flask_app) -> web.Application:
+    app = web.Application()
+    app.router.add_post("/", handle_trigger)
+    app.router.add_get("/health", health_check)
+    app.router.add_get("/metrics", metrics_endpoint)
+    app.router.add_route("*", "/{path:.*}", wsgi_handler(flask_app.wsgi_app))
+    app.on_cleanup.append(close_clients)
+    return app
+
+
+def serve(flask_app, port: int) -> None:
+    web.run_app(build_app(flask_app), host="0.0.0.0", port=port, print=None)
@@ -0,0 +1,302 @@
+"""
+asyncio YDB client for the async worker runtime.
+
+Covers the task state changes on the pipeline's critical path with
+`ydb.aio`, so waiting on YDB does not hold a thread. Queries and counter
+rules are shared with YDBClient; everything else (search segments, lane
+promotion, progress) stays on the synchronous client.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import ydb
+import ydb.aio
+from typing import Optional, Dict, Any, List
+from datetime import datetime, timezone
+from ydb_client import (
+    COMPLETE_TASK_QUERY, GET_TASK_QUERY, SAVE_STAGES_QUERY, SELECT_BUCKET_QUERY, SELECT_LANE_QUERY,
+    SELECT_STATUS_QUERY, UPDATE_STATUS_QUERY, UPSERT_BUCKET_QUERY, ProgressBuffer, reserve_from_bucket,
+    get_shared_client, stage_counter_deltas, status_counter_deltas, task_from_row,
+)
+
+logger = logging.getLogger(__name__)
+
+SESSION_POOL_SIZE = int(os.environ.get("YDB_ASYNC_POOL_SIZE", "50"))
+
+
+class AsyncYDBClient:
+    """Async counterpart of YDBClient for the processing pipeline."""
+    
+    def __init__(self, progress: ProgressBuffer):
+        """
+        Build the driver; call connect() from the event loop before use.
+        
+        Args:
+            progress: Progress buffer of the shared YDBClient, so a status
+                change still drops the task's pending progress update
+        """
+        self.endpoint = os.environ.get("YDB_ENDPOINT")
+        self.database = os.environ.get("YDB_DATABASE")
+        
+        if not self.endpoint or not self.database:
+            raise ValueError("YDB_ENDPOINT and YDB_DATABASE environment variables must be set")
+        
+        self.driver_config = ydb.DriverConfig(
+            endpoint=self.endpoint,
+            database=self.database,
+            credentials=ydb.iam.MetadataUrlCredentials(),
+            table_client_settings=ydb.TableClientSettings().with_client_query_cache(True)
+        )
+        self.progress = progress
+        self.driver: Optional[ydb.aio.Driver] = None
+        self.pool: Optional[ydb.aio.SessionPool] = None
+    
+    async def connect(self) -> None:
+        self.driver = ydb.aio.Driver(self.driver_config)
+        await self.driver.wait(timeout=5, fail_fast=True)
+        self.pool = ydb.aio.SessionPool(self.driver, SESSION_POOL_SIZE)
+    
+    async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get task by ID from YDB.
+        
+        Args:
+            task_id: Task UUID
+        
+        Returns:
+            Task dictionary or None if not found
+        """
+        async def callee(session):
+            result_sets = await session.transaction().execute(
+                await session.prepare(GET_TASK_QUERY),
+                {"$task_id": task_id},
+                commit_tx=True
+            )
+            
+            for row in result_sets[0].rows:
+                return task_from_row(row)
+            return None
+        
+        return await self.pool.retry_operation(callee)
+    
+    async def update_task_status(self, task_id: str, status: str, error_message: Optional[str] = None) -> None:
+        """
+        Update task status in YDB, as YDBClient.update_task_status does.
+        
+        Args:
+            task_id: Task UUID
+            status: New status (queued, processing, completed, error)
+            error_message: Optional error message for error status
+        """
+        self.progress.discard(task_id)
+        
+        async def callee(session):
+            updated_at = datetime.now(timezone.utc).isoformat()
+            tx = session.transaction(ydb.SerializableReadWrite())
+            rows = (await tx.execute(await session.prepare(SELECT_STATUS_QUERY), {"$task_id": task_id}))[0].rows
+            if not rows:
+                await tx.commit()
+                return
+            await tx.execute(
+                await session.prepare(UPDATE_STATUS_QUERY),
+                {
+                    "$task_id": task_id,
+                    "$status": status,
+                    "$error_message": error_message or None,
+                    "$updated_at": updated_at,
+                    "$counters": status_counter_deltas(rows[0].status, status, updated_at)
+                },
+                commit_tx=True
+            )
+        
+        await self.pool.retry_operation(callee)
+    
+    async def claim_task(self, task_id: str, lane: Optional[str] = None) -> bool:
+        """
+        Mark task as processing unless it was promoted away from the message's lane.
+        
+        Args:
+            task_id: Task UUID
+            lane: Lane of the queue message; None for messages without one
+        
+        Returns:
+            True if the task was claimed
+        """
+        async def callee(session):
+            tx = session.transaction(ydb.SerializableReadWrite())
+            rows = (await tx.execute(await session.prepare(SELECT_LANE_QUERY), {"$task_id": task_id}))[0].rows
+            if not rows or (lane == "long" and rows[0].lane == "short"):
+                await tx.commit()
+                return False
+            
+            updated_at = datetime.now(timezone.utc).isoformat()
+            await tx.execute(
+                await session.prepare(UPDATE_STATUS_QUERY),
+                {
+                    "$task_id": task_id,
+                    "$status": "processing",
+                    "$error_message": None,
+                    "$updated_at": updated_at,
+                    "$counters": status_counter_deltas(rows[0].status, "processing", updated_at)
+                },
+                commit_tx=True
+            )
+            return True
+        
+        return await self.pool.retry_operation(callee)
+    
+    async def update_task_complete(
+        self,
+        task_id: str,
+        summary_key: str,
+        summary_sha256: str,
+        summary_model: str,
+        summary_input_tokens: int,
+        summary_output_tokens: int,
+        summary_latency_ms: float
+    ) -> None:
+        """
+        Update task as completed with its summary artifact.
+        
+        Args:
+            task_id: Task UUID
+            summary_key: S3 key of the summary Markdown
+            summary_sha256: SHA-256 of the summary, used to version rendered PDFs
+            summary_model: YandexGPT model that wrote the summary
+            summary_input_tokens: Prompt tokens billed for the summary
+            summary_output_tokens: Completion tokens billed for the summary
+            summary_latency_ms: Summary request latency, including retries
+        """
+        self.progress.discard(task_id)
+        
+        async def callee(session):
+            updated_at = datetime.now(timezone.utc).isoformat()
+            tx = session.transaction(ydb.SerializableReadWrite())
+            rows = (await tx.execute(await session.prepare(SELECT_STATUS_QUERY), {"$task_id": task_id}))[0].rows
+            old_status = rows[0].status if rows else None
+            await tx.execute(
+                await session.prepare(COMPLETE_TASK_QUERY),
+                {
+                    "$task_id": task_id,
+                    "$status": "completed",
+                    "$summary_key": summary_key,
+                    "$summary_sha256": summary_sha256,
+                    "$summary_model": summary_model,
+                    "$summary_input_tokens": summary_input_tokens,
+                    "$summary_output_tokens": summary_output_tokens,
+                    "$summary_latency_ms": summary_latency_ms,
+                    "$updated_at": updated_at,
+                    "$counters": status_counter_deltas(old_status, "completed", updated_at) if rows else []
+                },
+                commit_tx=True
+            )
+        
+        await self.pool.retry_operation(callee)
+    
+    async def save_task_stages(
+        self,
+        task_id: str,
+        stage_rows: List[Dict[str, Any]],
+        stage_timings_json: str,
+        lane: Optional[str] = None
+    ) -> None:
+        """
+        Persist per-stage measurements of a task, as YDBClient.save_task_stages does.
+        
+        Args:
+            task_id: Task UUID
+            stage_rows: Rows as produced by StageTimer.to_rows
+            stage_timings_json: JSON array as produced by StageTimer.to_json
+            lane: Lane the task was processed in
+        """
+        counters = stage_counter_deltas(stage_rows, lane, datetime.now(timezone.utc).date().isoformat())
+        
+        async def callee(session):
+            await session.transaction(ydb.SerializableReadWrite()).execute(
+                await session.prepare(SAVE_STAGES_QUERY),
+                {
+                    "$task_id": task_id,
+                    "$stage_timings": stage_timings_json,
+                    "$stages": stage_rows,
+                    "$counters": counters
+                },
+                commit_tx=True
+            )
+        
+        await self.pool.retry_operation(callee)
+    
+    async def reserve_token(self, bucket: str, rate: float, capacity: float, max_wait: float) -> Optional[float]:
+        """
+        Reserve one token from a shared token bucket, as YDBClient.reserve_token does.
+        
+        Args:
+            bucket: Bucket name, e.g. "stt:<folder_id>"
+            rate: Tokens added per second
+            capacity: Bucket size (burst)
+            max_wait: Longest wait a reservation may take, seconds
+        
+        Returns:
+            Seconds to wait before using the token, or None if that would
+            exceed max_wait (nothing is reserved then)
+        """
+        async def callee(session):
+            tx = session.transaction(ydb.SerializableReadWrite())
+            rows = (await tx.execute(await session.prepare(SELECT_BUCKET_QUERY), {"$bucket": bucket}))[0].rows
+            
+            now = time.time()
+            tokens, wait = reserve_from_bucket(rows, now, rate, capacity)
+            if wait > max_wait:
+                await tx.commit()
+                return None
+            
+            await tx.execute(
+                await session.prepare(UPSERT_BUCKET_QUERY),
+                {
+                    "$bucket": bucket,
+                    "$tokens": tokens,
+                    "$refreshed_at": now
+                },
+                commit_tx=True
+            )
+            return wait
+        
+        return await self.pool.retry_operation(callee)
+    
+    async def close(self) -> None:
+        """Close the session pool and the driver."""
+        if self.pool:
+            await self.pool.stop()
+        if self.driver:
+            await self.driver.stop()
+
+
+_shared_client: Optional[AsyncYDBClient] = None
+_shared_client_lock = asyncio.Lock()
+
+
+async def get_shared_async_client() -> AsyncYDBClient:
+    """
+    Client shared by the tasks of the async runtime's event loop.
+    
+    Returns:
+        Connected AsyncYDBClient
+    """
+    global _shared_client
+    if _shared_client is None:
+        async with _shared_client_lock:
+            if _shared_client is None:
+                # Connecting the synchronous client blocks; it is usually pre-warmed already
+                shared = await asyncio.to_thread(get_shared_client)
+                client = AsyncYDBClient(shared.progress)
+                await client.connect()
+                _shared_client = client
+    return _shared_client
+
+
+async def close_shared_async_client() -> None:
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.close()
+        _shared_client = None
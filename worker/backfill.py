@@ -0,0 +1,305 @@
+"""
+Batch backfill: run the lecture pipeline over local recordings or Yandex
+Disk links, without the queue and the serverless container.
+
+    python worker/backfill.py recordings/ --output backfill-out
+    python worker/backfill.py --links links.txt --output backfill-out --cpu-workers 8
+
+Each recording gets a directory under --output with transcript.txt,
+summary.md and summary.pdf. The CPU-bound stages (audio extraction and
+silence trimming with ffmpeg, PDF rendering with ReportLab) run in a
+process pool. The network stages (Disk download, S3 upload, SpeechKit,
+YandexGPT) run on a thread pool awaited from an asyncio loop, so many
+recordings can wait on the network while every core is busy.
+
+Finished stages are appended to <output>/manifest.jsonl. A rerun with the
+same --output skips what is already done and restarts failed or
+interrupted recordings from the first unfinished stage.
+
+SpeechKit reads audio from Object Storage, so the S3 settings (S3_BUCKET,
+S3_ENDPOINT, AWS_*), FOLDER_ID and YANDEX_API_KEY must be set as for the
+worker. With YDB_ENDPOINT set, the shared SpeechKit/YandexGPT rate limits
+apply. Without it they are off, and --network-workers bounds concurrency.
+"""
+import os
+import re
+import sys
+import json
+import asyncio
+import hashlib
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import video_processor
+from vad import VAD_ENABLED, trim_silence
+
+logger = logging.getLogger("backfill")
+
+VIDEO_EXTENSIONS = {".mp4", ".mkv", ".mov", ".avi", ".webm", ".m4v", ".mpg", ".mpeg"}
+MANIFEST_NAME = "manifest.jsonl"
+STAGE_FILES = {
+    "audio": "audio.wav",
+    "transcript": "transcript.txt",
+    "summary": "summary.md",
+    "pdf": "summary.pdf",
+}
+
+
+class Item:
+    """One recording: a local video file or a public Yandex Disk link."""
+
+    def __init__(self, source: str, output_dir: str):
+        self.source = source
+        self.is_link = source.startswith(("http://", "https://"))
+        self.item_id = hashlib.sha256(source.encode("utf-8")).hexdigest()[:12]
+        self.name = os.path.splitext(os.path.basename(source.rstrip("/")))[0] or self.item_id
+        slug = re.sub(r"[^\w.-]+", "_", self.name)[:60]
+        self.dir = os.path.join(output_dir, f"{slug}-{self.item_id}")
+
+    def path(self, stage: str) -> str:
+        return os.path.join(self.dir, STAGE_FILES[stage])
+
+
+class Manifest:
+    """Append-only JSON Lines log of finished stages; the last record of a stage wins."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn last line of an interrupted run
+                        continue
+                    self.records.setdefault(record["item"], {})[record["stage"]] = record
+        self.file = open(path, "a", encoding="utf-8")
+
+    def get(self, item_id: str, stage: str) -> Optional[Dict[str, Any]]:
+        return self.records.get(item_id, {}).get(stage)
+
+    def record(self, item: Item, stage: str, **fields: Any) -> None:
+        record = {
+            "item": item.item_id,
+            "source": item.source,
+            "stage": stage,
+            "at": datetime.now(timezone.utc).isoformat(),
+            **fields,
+        }
+        self.records.setdefault(item.item_id, {})[stage] = record
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self) -> None:
+        self.file.close()
+
+
+# --- CPU stages (process pool) ------------------------------------------------
+
+def _init_cpu_worker() -> None:
+    # The pool already runs one ffmpeg per core; segmented extraction would oversubscribe
+    video_processor.EXTRACT_SEGMENTS = 1
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+
+def extract_stage(video_path: str, audio_path: str, delete_video: bool) -> Optional[Dict[str, Any]]:
+    video_processor.extract_audio(video_path, audio_path)
+    if delete_video:
+        os.remove(video_path)
+    if VAD_ENABLED:
+        return trim_silence(audio_path).to_dict()
+    return None
+
+
+def render_stage(title: str, summary_path: str, pdf_path: str) -> None:
+    from pdf_generator import generate_pdf
+
+    with open(summary_path, encoding="utf-8") as f:
+        summary_text = f.read()
+    generate_pdf(title, summary_text, pdf_path)
+
+
+# --- Network stages (thread pool) -------------------------------------------
+
+def disk_title(link: str) -> Optional[str]:
+    import resilience
+    from processor import get_disk_metadata
+
+    name = resilience.call("disk", get_disk_metadata, link).get("name")
+    return os.path.splitext(name)[0] if name else None
+
+
+def download_stage(link: str, video_path: str) -> int:
+    import resilience
+    from processor import get_download_url
+
+    download_url = resilience.call("disk", get_download_url, link)
+    return resilience.call("disk", video_processor.download_video, download_url, video_path)
+
+
+def transcribe_stage(audio_path: str, item_id: str, folder_id: str) -> str:
+    from storage_client import StorageClient
+    from transcription import transcribe_audio
+
+    storage_client = StorageClient()
+    audio_key = f"temp/backfill/{item_id}/audio.wav"
+    storage_client.upload_file(audio_path, audio_key)
+    try:
+        return transcribe_audio(f"{storage_client.endpoint}/{storage_client.bucket}/{audio_key}", folder_id)
+    finally:
+        try:
+            storage_client.delete(audio_key)
+        except Exception as e:
+            logger.warning(f"Could not delete {audio_key}: {str(e)}")
+
+
+def summary_stage(transcript: str, folder_id: str) -> Dict[str, Any]:
+    from summary import generate_summary
+
+    summary = generate_summary(transcript, folder_id)
+    return summary._asdict()
+
+
+# --- Orchestration -------------------------------------------------------------
+
+class Backfill:
+    def __init__(self, manifest: Manifest, cpu_pool: Executor, network_pool: Executor, folder_id: str, concurrency: int):
+        self.manifest = manifest
+        self.cpu_pool = cpu_pool
+        self.network_pool = network_pool
+        self.folder_id = folder_id
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.finished = 0
+        self.failed = 0
+
+    def complete(self, item: Item, stage: str) -> bool:
+        return self.manifest.get(item.item_id, stage) is not None and os.path.exists(item.path(stage))
+
+    async def run_item(self, item: Item, total: int) -> None:
+        async with self.semaphore:
+            try:
+                await self.process(item)
+                self.finished += 1
+                logger.info(f"[{self.finished + self.failed}/{total}] {item.name}: done ({item.dir})")
+            except Exception as e:
+                self.failed += 1
+                self.manifest.record(item, "failed", error=str(e))
+                logger.error(f"[{self.finished + self.failed}/{total}] {item.name}: failed: {str(e)}")
+
+    async def process(self, item: Item) -> None:
+        loop = asyncio.get_running_loop()
+        os.makedirs(item.dir, exist_ok=True)
+        audio_record = self.manifest.get(item.item_id, "audio") or {}
+        title = audio_record.get("title") or item.name
+
+        if not self.complete(item, "transcript"):
+            if not self.complete(item, "audio"):
+                video_path = item.source
+                if item.is_link:
+                    title = await loop.run_in_executor(self.network_pool, disk_title, item.source) or title
+                    video_path = os.path.join(item.dir, "video")
+                    await loop.run_in_executor(self.network_pool, download_stage, item.source, video_path)
+                offsets = await loop.run_in_executor(
+                    self.cpu_pool, extract_stage, video_path, item.path("audio"), item.is_link
+                )
+                self.manifest.record(item, "audio", title=title, vad_offsets=offsets)
+
+            transcript = await loop.run_in_executor(
+                self.network_pool, transcribe_stage, item.path("audio"), item.item_id, self.folder_id
+            )
+            with open(item.path("transcript"), "w", encoding="utf-8") as f:
+                f.write(transcript)
+            self.manifest.record(item, "transcript", characters=len(transcript))
+            os.remove(item.path("audio"))
+
+        if not self.complete(item, "summary"):
+            with open(item.path("transcript"), encoding="utf-8") as f:
+                transcript = f.read()
+            summary = await loop.run_in_executor(self.network_pool, summary_stage, transcript, self.folder_id)
+            with open(item.path("summary"), "w", encoding="utf-8") as f:
+                f.write(summary.pop("text"))
+            self.manifest.record(item, "summary", **summary)
+
+        if not self.complete(item, "pdf"):
+            await loop.run_in_executor(self.cpu_pool, render_stage, title, item.path("summary"), item.path("pdf"))
+            self.manifest.record(item, "pdf")
+
+
+def collect_sources(paths: List[str], links_file: Optional[str]) -> List[str]:
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS:
+                        sources.append(os.path.abspath(os.path.join(root, name)))
+        else:
+            sources.append(os.path.abspath(path))
+    if links_file:
+        with open(links_file, encoding="utf-8") as f:
+            sources.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    # Same source twice would race on one output directory
+    return list(dict.fromkeys(sources))
+
+
+async def run(items: List[Item], manifest: Manifest, args: argparse.Namespace, folder_id: str) -> Backfill:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(args.cpu_workers, mp_context=context, initializer=_init_cpu_worker) as cpu_pool, \
+            ThreadPoolExecutor(args.network_workers, thread_name_prefix="backfill-net") as network_pool:
+        backfill = Backfill(manifest, cpu_pool, network_pool, folder_id, args.cpu_workers + args.network_workers)
+        await asyncio.gather(*(backfill.run_item(item, len(items)) for item in items))
+    return backfill
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="Video files or directories (searched recursively)")
+    parser.add_argument("--links", help="File with one public Yandex Disk link per line")
+    parser.add_argument("--output", required=True, help="Output directory; holds the manifest used to resume")
+    parser.add_argument("--cpu-workers", type=int, default=os.cpu_count() or 1, help="Processes for ffmpeg and PDF rendering")
+    parser.add_argument("--network-workers", type=int, default=8, help="Concurrent Disk, S3, SpeechKit and YandexGPT calls")
+    args = parser.parse_intermixed_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stdout,
+        force=True
+    )
+
+    folder_id = os.environ.get("FOLDER_ID")
+    if not folder_id:
+        parser.error("FOLDER_ID environment variable must be set")
+
+    if not os.environ.get("YDB_ENDPOINT"):
+        import rate_limiter
+        logger.warning("YDB_ENDPOINT is not set: shared SpeechKit and YandexGPT rate limits are off")
+        for api in rate_limiter.BUCKETS:
+            rate_limiter.BUCKETS[api] = (0.0, 0.0)
+
+    os.makedirs(args.output, exist_ok=True)
+    items = [Item(source, args.output) for source in collect_sources(args.paths, args.links)]
+    if not items:
+        parser.error("no recordings found")
+
+    manifest = Manifest(os.path.join(args.output, MANIFEST_NAME))
+    try:
+        pending = [item for item in items if manifest.get(item.item_id, "pdf") is None or not os.path.exists(item.path("pdf"))]
+        logger.info(f"{len(items)} recordings, {len(items) - len(pending)} already done, {len(pending)} to process")
+        backfill = asyncio.run(run(pending, manifest, args, folder_id))
+    finally:
+        manifest.close()
+
+    logger.info(f"Backfill finished: {backfill.finished} done, {backfill.failed} failed")
+    return 1 if backfill.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
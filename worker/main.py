@@ -1,16 +1,12 @@
 import os
-import sys
 import json
 import logging
-from flask import Flask, request, jsonify
-from processor import process_task
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stdout,
-    force=True
-)
+from flask import Flask, Response, request, jsonify, redirect
+import metrics
+import warmup
+from structured_logging import Lazy, flush_logs, setup_logging
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
@@ -18,31 +14,25 @@ app = Flask(__name__)
 
 @app.route("/", methods=["POST"])
 def handle_trigger():
+    # Pipeline modules are imported on first use (or by the pre-warm thread)
+    from processor import process_task
+    from trigger import task_messages
+    
     try:
         data = request.get_json()
-        logger.info(f"Received trigger request: {json.dumps(data)}")
         
         if not data or "messages" not in data:
             logger.error("Invalid request format: missing 'messages' field")
             return jsonify({"status": "error", "message": "Invalid request format"}), 200
         
-        messages = data["messages"]
+        logger.info("Received trigger request with %d messages", len(data["messages"]))
+        logger.debug("Trigger request: %s", Lazy(json.dumps, data))
         
-        for message in messages:
+        for task_id, options in task_messages(data["messages"]):
             try:
-                message_body = message.get("details", {}).get("message", {}).get("body", "{}")
-                logger.info(f"Processing message body: {message_body}")
-                
-                message_data = json.loads(message_body)
-                task_id = message_data.get("task_id")
-                
-                if not task_id:
-                    logger.error("Missing task_id in message")
-                    continue
-                
                 logger.info(f"Processing task: {task_id}")
                 
-                process_task(task_id)
+                process_task(task_id, **options)
                 
                 logger.info(f"Task {task_id} processed successfully")
                 
@@ -55,16 +45,124 @@ def handle_trigger():
     except Exception as e:
         logger.error(f"Error handling trigger request: {str(e)}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)}), 200
+    
+    finally:
+        flush_logs()
+
+
+@app.route("/api/tasks/<task_id>/pdf", methods=["GET"])
+def download_pdf(task_id):
+    from ydb_client import get_shared_client
+    from storage_client import StorageClient
+    from pdf_service import ensure_pdf
+    from profiling import finish_profiler, start_profiler
+    
+    try:
+        task = get_shared_client().get_task(task_id)
+        
+        if not task or task["status"] != "completed" or not (task["summary_key"] or task["pdf_key"]):
+            return jsonify({"error": "PDF is not available for this task"}), 404
+        
+        storage_client = StorageClient()
+        profiler = start_profiler(task_id, "pdf") if request.args.get("profile") == "1" else None
+        try:
+            pdf_key = ensure_pdf(task, storage_client)
+        finally:
+            if profiler is not None:
+                finish_profiler(profiler)
+        pdf_url = storage_client.generate_download_url(pdf_key, filename=f"{task['title']}.pdf")
+        return redirect(pdf_url, code=302)
+        
+    except Exception as e:
+        logger.error(f"Error serving PDF for task {task_id}: {str(e)}", exc_info=True)
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
+@app.route("/api/tasks/<task_id>/summary", methods=["POST"])
+def resummarize(task_id):
+    """Summarize a time range (or section) of the stored transcript again, without SpeechKit."""
+    from ydb_client import get_shared_client
+    from storage_client import StorageClient
+    from transcript_store import load_transcript
+    from summary import generate_summary
+    
+    try:
+        body = request.get_json(silent=True) or {}
+        folder_id = os.environ.get("FOLDER_ID")
+        if not folder_id:
+            raise ValueError("FOLDER_ID environment variable must be set")
+        
+        if not get_shared_client().get_task(task_id):
+            return jsonify({"error": "Task not found"}), 404
+        transcript = load_transcript(StorageClient(), task_id)
+        if transcript is None:
+            return jsonify({"error": "Timed transcript is not available for this task"}), 404
+        
+        try:
+            if "section" in body:
+                start, end = transcript.section_bounds(int(body["section"]))
+            else:
+                start, end = float(body.get("start", 0)), float(body.get("end", transcript.duration))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid range: {str(e)}"}), 400
+        
+        text = transcript.slice(start, end)
+        if not text:
+            return jsonify({"error": f"No speech between {start:.0f} and {end:.0f} seconds"}), 400
+        
+        summary = generate_summary(text, folder_id)
+        logger.info(
+            f"Range {start:.0f}-{end:.0f} s of task {task_id} summarized with {summary.model}, "
+            f"{len(text)} characters, {summary.latency_ms:.0f} ms"
+        )
+        return jsonify({
+            "task_id": task_id,
+            "start": start,
+            "end": end,
+            "summary": summary.text,
+            "model": summary.model,
+            "input_tokens": summary.input_tokens,
+            "output_tokens": summary.output_tokens,
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error summarizing a range of task {task_id}: {str(e)}", exc_info=True)
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
+@app.route("/promote", methods=["POST"])
+def promote():
+    from scheduler import expire_stale_uploads, promote_aged_tasks
+    
+    try:
+        promoted = promote_aged_tasks()
+        expired = expire_stale_uploads()
+        return jsonify({"status": "ok", "promoted": promoted, "expired": expired}), 200
+    except Exception as e:
+        logger.error(f"Error running scheduled task maintenance: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 200
 
 
 @app.route("/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "healthy"}), 200
+    # Not ready while the pre-warm step is still importing and connecting
+    return jsonify(warmup.status()), 200 if warmup.is_ready() else 503
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
 
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
-    logger.info(f"Starting Waitress server on 0.0.0.0:{port}")
+    warmup.start()
     
-    from waitress import serve
-    serve(app, host="0.0.0.0", port=port, threads=4)
+    if os.environ.get("WORKER_RUNTIME", "threads") == "async":
+        logger.info(f"Starting async runtime on 0.0.0.0:{port}")
+        from async_server import serve
+        serve(app, port)
+    else:
+        logger.info(f"Starting Waitress server on 0.0.0.0:{port}")
+        from waitress import serve
+        serve(app, host="0.0.0.0", port=port, threads=4)
@@ -0,0 +1,222 @@
+"""
+Single-pass parser for the Markdown subset produced by YandexGPT summaries.
+
+Block structure is recognised line by line in one pass; inline formatting
+(bold, italic, inline code) is converted to ReportLab paragraph markup by a
+linear scanner that escapes text as it goes, so `<` and `&` in the source
+never interfere with the generated tags.
+"""
+import re
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+CODE_FONT = 'DejaVuSansMono'
+
+INLINE_SPECIAL_RE = re.compile(r'[\\`*_&<>]')
+ORDERED_RE = re.compile(r'(\d{1,9})[.)](?=\s|$)')
+TABLE_SEPARATOR_RE = re.compile(r'^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$')
+
+HTML_ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;'}
+BACKSLASH_ESCAPABLE = frozenset('\\`*_{}[]()#+-.!|<>&')
+EMPHASIS_TAGS = {'**': 'b', '__': 'b', '*': 'i', '_': 'i'}
+
+
+class Block(NamedTuple):
+    kind: str
+    text: str = ''
+    level: int = 0
+    marker: str = ''
+    rows: Optional[List[List[str]]] = None
+    header: bool = False
+
+
+def escape(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def render_inline(text: str) -> str:
+    """Convert inline Markdown to escaped ReportLab paragraph markup."""
+    out: List[str] = []
+    # Open emphasis markers as (marker, index of placeholder in out).
+    # A marker is never open twice, so the stack holds at most four entries.
+    stack: List[Tuple[str, int]] = []
+    has_backticks = True
+    i = 0
+    n = len(text)
+
+    while i < n:
+        match = INLINE_SPECIAL_RE.search(text, i)
+        if not match:
+            out.append(text[i:])
+            break
+
+        start = match.start()
+        if start > i:
+            out.append(text[i:start])
+        ch = text[start]
+        i = start + 1
+
+        if ch in HTML_ESCAPES:
+            out.append(HTML_ESCAPES[ch])
+        elif ch == '\\':
+            if i < n and text[i] in BACKSLASH_ESCAPABLE:
+                out.append(HTML_ESCAPES.get(text[i], text[i]))
+                i += 1
+            else:
+                out.append('\\')
+        elif ch == '`':
+            end = text.find('`', i) if has_backticks else -1
+            if end == -1:
+                has_backticks = False
+                out.append('`')
+            else:
+                out.append(f'<font face="{CODE_FONT}">{escape(text[i:end])}</font>')
+                i = end + 1
+        else:
+            marker = ch * 2 if i < n and text[i] == ch else ch
+            i = start + len(marker)
+            prev_char = text[start - 1] if start > 0 else ' '
+            next_char = text[i] if i < n else ' '
+
+            open_at = -1
+            for pos in range(len(stack) - 1, -1, -1):
+                if stack[pos][0] == marker:
+                    open_at = pos
+                    break
+
+            can_close = open_at != -1 and not prev_char.isspace() and not (ch == '_' and next_char.isalnum())
+            can_open = not next_char.isspace() and not (ch == '_' and prev_char.isalnum())
+
+            if can_close:
+                # Markers opened after this one were never closed: keep them literal.
+                del stack[open_at + 1:]
+                _, placeholder = stack.pop()
+                tag = EMPHASIS_TAGS[marker]
+                out[placeholder] = f'<{tag}>'
+                out.append(f'</{tag}>')
+            elif can_open and open_at == -1:
+                stack.append((marker, len(out)))
+                out.append(marker)
+            else:
+                out.append(marker)
+
+    return ''.join(out)
+
+
+def _split_table_row(line: str) -> List[str]:
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return [cell.strip() for cell in re.split(r'(?<!\\)\|', line)]
+
+
+def _is_rule(stripped: str) -> bool:
+    compact = stripped.replace(' ', '')
+    return len(compact) >= 3 and compact[0] in '-*_' and compact == compact[0] * len(compact)
+
+
+def parse_blocks(markdown: str) -> Iterator[Block]:
+    """Yield block tokens for `markdown` in a single pass over its lines."""
+    paragraph: List[str] = []
+    table_rows: List[List[str]] = []
+    table_header = False
+    code_lines: Optional[List[str]] = None
+    code_fence = ''
+    list_indents: List[int] = []
+
+    def flush_paragraph() -> Iterator[Block]:
+        if paragraph:
+            yield Block('paragraph', ' '.join(paragraph))
+            paragraph.clear()
+
+    def flush_table() -> Iterator[Block]:
+        nonlocal table_header
+        if table_rows:
+            yield Block('table', rows=list(table_rows), header=table_header)
+            table_rows.clear()
+            table_header = False
+
+    for raw_line in markdown.split('\n'):
+        line = raw_line.rstrip().expandtabs(4)
+
+        if code_lines is not None:
+            if line.lstrip().startswith(code_fence):
+                yield Block('code', '\n'.join(code_lines))
+                code_lines = None
+            else:
+                code_lines.append(line)
+            continue
+
+        stripped = line.lstrip()
+        indent = len(line) - len(stripped)
+
+        if not stripped:
+            yield from flush_paragraph()
+            yield from flush_table()
+            list_indents.clear()
+            yield Block('blank')
+            continue
+
+        first = stripped[0]
+
+        if first == '|':
+            yield from flush_paragraph()
+            if table_rows and not table_header and len(table_rows) == 1 and TABLE_SEPARATOR_RE.match(stripped):
+                table_header = True
+            else:
+                table_rows.append(_split_table_row(stripped))
+            continue
+        yield from flush_table()
+
+        if stripped.startswith('```') or stripped.startswith('~~~'):
+            yield from flush_paragraph()
+            code_fence = stripped[:3]
+            code_lines = []
+            continue
+
+        if first == '#':
+            level = len(stripped) - len(stripped.lstrip('#'))
+            if level <= 6 and stripped[level:level + 1] in (' ', ''):
+                yield from flush_paragraph()
+                list_indents.clear()
+                yield Block('heading', stripped[level:].strip().rstrip('#').rstrip(), level=level)
+                continue
+
+        if first in '-*_' and _is_rule(stripped):
+            yield from flush_paragraph()
+            list_indents.clear()
+            yield Block('rule')
+            continue
+
+        marker = ''
+        content = ''
+        if first in '-*+' and stripped[1:2] in (' ', ''):
+            marker = '•'
+            content = stripped[2:]
+        elif first.isdigit():
+            match = ORDERED_RE.match(stripped)
+            if match:
+                marker = f'{match.group(1)}.'
+                content = stripped[match.end():].lstrip()
+
+        if marker:
+            yield from flush_paragraph()
+            while list_indents and list_indents[-1] > indent:
+                list_indents.pop()
+            if not list_indents or list_indents[-1] < indent:
+                list_indents.append(indent)
+            yield Block('list_item', content.strip(), level=len(list_indents) - 1, marker=marker)
+            continue
+
+        if first == '>':
+            yield from flush_paragraph()
+            yield Block('quote', stripped.lstrip('>').strip())
+            continue
+
+        paragraph.append(stripped)
+
+    if code_lines is not None:
+        yield Block('code', '\n'.join(code_lines))
+    yield from flush_paragraph()
+    yield from flush_table()
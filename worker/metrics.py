@@ -0,0 +1,255 @@
+"""
+Process-local metrics for the worker, exposed in OpenMetrics text format.
+
+Every metric keeps one shard per thread: the hot path only updates a dict
+owned by the calling thread, so no lock is taken when counting. The lock is
+used once per thread (to register its shard) and when `/metrics` is
+scraped, which sums the shards.
+"""
+import bisect
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, object]] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[LabelValues, object]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _snapshot(self) -> List[Dict[LabelValues, object]]:
+        with self._lock:
+            shards = list(self._shards)
+        # Copy each shard: its owner thread may add keys while we iterate
+        return [dict(shard) for shard in shards]
+
+    def _labels(self, key: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        rendered = ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs)
+        return "{" + rendered + "}"
+
+    def expose(self) -> Iterator[str]:
+        yield f"# TYPE {self.name} {self.metric_type}"
+        yield f"# HELP {self.name} {self.documentation}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _totals(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        if not totals and not self.labelnames:
+            totals[()] = 0
+        return totals
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in sorted(self._totals().items()):
+            yield f"{self.name}_total{self._labels(key)} {_format(value)}"
+
+
+class Gauge(Counter):
+    """Up/down gauge; each thread's shard holds its own delta."""
+
+    metric_type = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in sorted(self._totals().items()):
+            yield f"{self.name}{self._labels(key)} {_format(value)}"
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            # Per-bucket (non-cumulative) counts and the sum of observations
+            state = [[0] * (len(self.buckets) + 1), 0.0]
+            shard[key] = state
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def _samples(self) -> Iterator[str]:
+        merged: Dict[LabelValues, list] = {}
+        for shard in self._snapshot():
+            for key, (counts, total) in shard.items():
+                target = merged.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+                target[0] = [a + b for a, b in zip(target[0], counts)]
+                target[1] += total
+        for key, (counts, total) in sorted(merged.items()):
+            count = sum(counts)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{self._labels(key, ('le', _format(bound)))} {cumulative}"
+            yield f"{self.name}_bucket{self._labels(key, ('le', '+Inf'))} {count}"
+            yield f"{self.name}_sum{self._labels(key)} {_format(total)}"
+            yield f"{self.name}_count{self._labels(key)} {count}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if float(value).is_integer():
+        return f"{value:.1f}" if isinstance(value, float) else str(value)
+    return repr(float(value))
+
+
+STAGE_DURATION = Histogram(
+    "worker_stage_duration_seconds",
+    "Wall time of a pipeline stage.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200),
+    labelnames=("stage", "status"),
+)
+QUEUE_LAG = Histogram(
+    "worker_queue_lag_seconds",
+    "Time from task creation to the start of processing.",
+    buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600),
+)
+TASKS_FINISHED = Counter(
+    "worker_tasks",
+    "Tasks that reached a final status.",
+    labelnames=("status",),
+)
+TASKS_IN_FLIGHT = Gauge(
+    "worker_tasks_in_flight",
+    "Tasks currently being processed.",
+)
+BYTES_DOWNLOADED = Counter(
+    "worker_downloaded_bytes",
+    "Video bytes downloaded from Yandex Disk or, for direct uploads, Object Storage.",
+)
+BYTES_UPLOADED = Counter(
+    "worker_uploaded_bytes",
+    "Bytes uploaded to Object Storage.",
+    labelnames=("artifact",),
+)
+STT_POLLS = Counter(
+    "worker_stt_polls",
+    "SpeechKit operation status requests.",
+)
+GPT_TOKENS = Counter(
+    "worker_gpt_tokens",
+    "YandexGPT tokens used for summaries.",
+    labelnames=("model", "kind"),
+)
+GPT_LATENCY = Histogram(
+    "worker_gpt_latency_seconds",
+    "YandexGPT summary latency, including retries and rate limit waits.",
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300),
+    labelnames=("model",),
+)
+RATE_LIMIT_WAIT = Histogram(
+    "worker_rate_limit_wait_seconds",
+    "Time spent waiting for a shared rate limit token.",
+    buckets=(0, 0.5, 1, 2, 5, 10, 30, 60, 120, 300),
+    labelnames=("api",),
+)
+RETRIES = Counter(
+    "worker_retries",
+    "Retried outbound calls.",
+    labelnames=("dependency",),
+)
+CIRCUIT_OPEN = Gauge(
+    "worker_circuit_open",
+    "1 while the dependency's circuit breaker is open.",
+    labelnames=("dependency",),
+)
+TASKS_RELEASED = Counter(
+    "worker_tasks_released",
+    "Tasks returned to the queue because a dependency was unavailable.",
+)
+AUDIO_SECONDS = Counter(
+    "worker_audio_seconds",
+    "Seconds of extracted audio and of audio sent to SpeechKit after silence trimming.",
+    labelnames=("kind",),
+)
+WORKSPACE_RESERVED = Gauge(
+    "worker_workspace_reserved_bytes",
+    "/tmp space booked by running tasks.",
+)
+WORKSPACE_WAIT = Histogram(
+    "worker_workspace_wait_seconds",
+    "Time a task waited for /tmp space.",
+    buckets=(0, 0.5, 1, 5, 10, 30, 60, 120, 300),
+)
+LOG_RECORDS_DROPPED = Counter(
+    "worker_log_records_dropped",
+    "Log records dropped because the logging queue was full.",
+)
+
+REGISTRY = [
+    STAGE_DURATION,
+    QUEUE_LAG,
+    TASKS_FINISHED,
+    TASKS_IN_FLIGHT,
+    BYTES_DOWNLOADED,
+    BYTES_UPLOADED,
+    STT_POLLS,
+    GPT_TOKENS,
+    GPT_LATENCY,
+    RATE_LIMIT_WAIT,
+    RETRIES,
+    CIRCUIT_OPEN,
+    TASKS_RELEASED,
+    AUDIO_SECONDS,
+    WORKSPACE_RESERVED,
+    WORKSPACE_WAIT,
+    LOG_RECORDS_DROPPED,
+]
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
@@ -1,138 +1,244 @@
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Preformatted, Table, TableStyle
+from reportlab.platypus.flowables import HRFlowable
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+import io
 import os
-import re
+import threading
+from typing import BinaryIO, Optional, Union
+from markdown_parser import Block, CODE_FONT, escape, parse_blocks, render_inline
+
+FONT_PATH = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+BOLD_FONT_PATH = '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'
+MONO_FONT_PATH = '/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf'
+
+# Bump when layout or styles change: cached PDFs are keyed by this version.
+PDF_RENDER_VERSION = "2"
+
+CONTENT_WIDTH = A4[0] - 144
+LIST_INDENT_STEP = 18
+MAX_LIST_LEVEL = 6
+CODE_MAX_LINE_LENGTH = 90
 
 
 def markdown_to_reportlab(text: str) -> str:
-    text = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', text)
-    text = re.sub(r'\*(.+?)\*', r'<i>\1</i>', text)
-    text = text.replace('&', '&amp;').replace('<b>', '<b>').replace('</b>', '</b>').replace('<i>', '<i>').replace('</i>', '</i>')
-    return text
-
-
-def generate_pdf(title: str, summary_text: str, output_path: str) -> None:
-    pdfmetrics.registerFont(TTFont('DejaVuSans', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'))
-    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'))
-    
-    doc = SimpleDocTemplate(
-        output_path,
-        pagesize=A4,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=18
-    )
-    
-    story = []
-    
-    styles = getSampleStyleSheet()
-    
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor='#1a1a1a',
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='DejaVuSans-Bold'
-    )
-    
-    heading2_style = ParagraphStyle(
-        'Heading2',
-        parent=styles['Heading2'],
-        fontSize=18,
-        textColor='#1a1a1a',
-        spaceAfter=12,
-        spaceBefore=12,
-        alignment=TA_LEFT,
-        fontName='DejaVuSans-Bold'
-    )
-    
-    heading3_style = ParagraphStyle(
-        'Heading3',
-        parent=styles['Heading3'],
-        fontSize=14,
-        textColor='#1a1a1a',
-        spaceAfter=10,
-        spaceBefore=10,
-        alignment=TA_LEFT,
-        fontName='DejaVuSans-Bold'
-    )
-    
-    heading4_style = ParagraphStyle(
-        'Heading4',
-        parent=styles['Heading4'],
-        fontSize=12,
-        textColor='#1a1a1a',
-        spaceAfter=8,
-        spaceBefore=8,
-        alignment=TA_LEFT,
-        fontName='DejaVuSans-Bold'
-    )
-    
-    body_style = ParagraphStyle(
-        'CustomBody',
-        parent=styles['BodyText'],
-        fontSize=11,
-        textColor='#333333',
-        spaceAfter=8,
-        alignment=TA_LEFT,
-        fontName='DejaVuSans',
-        leading=14
-    )
-    
-    bullet_style = ParagraphStyle(
-        'Bullet',
-        parent=styles['BodyText'],
-        fontSize=11,
-        textColor='#333333',
-        spaceAfter=6,
-        alignment=TA_LEFT,
-        fontName='DejaVuSans',
-        leading=14,
-        leftIndent=20,
-        bulletIndent=10
-    )
-    
-    title_para = Paragraph(title, title_style)
-    story.append(title_para)
-    story.append(Spacer(1, 0.2 * inch))
-    
-    lines = summary_text.split('\n')
-    for line in lines:
-        line = line.rstrip()
-        
-        if not line.strip():
-            story.append(Spacer(1, 0.1 * inch))
-            continue
-        
-        if line.startswith('### '):
-            text = markdown_to_reportlab(line[4:])
-            story.append(Paragraph(text, heading3_style))
-        elif line.startswith('#### '):
-            text = markdown_to_reportlab(line[5:])
-            story.append(Paragraph(text, heading4_style))
-        elif line.startswith('## '):
-            text = markdown_to_reportlab(line[3:])
-            story.append(Paragraph(text, heading2_style))
-        elif line.startswith('# '):
-            text = markdown_to_reportlab(line[2:])
-            story.append(Paragraph(text, heading2_style))
-        elif line.startswith('- ') or line.startswith('* '):
-            text = markdown_to_reportlab(line[2:])
-            story.append(Paragraph(f'• {text}', bullet_style))
-        elif re.match(r'^\d+\.\s', line):
-            text = markdown_to_reportlab(re.sub(r'^\d+\.\s', '', line))
-            num = re.match(r'^(\d+)\.\s', line).group(1)
-            story.append(Paragraph(f'{num}. {text}', bullet_style))
-        else:
-            text = markdown_to_reportlab(line)
-            story.append(Paragraph(text, body_style))
-    
-    doc.build(story)
+    return render_inline(text)
+
+
+class PDFRenderer:
+    """Renders lecture summaries to PDF, reusing fonts and styles between calls."""
+
+    def __init__(self):
+        pdfmetrics.registerFont(TTFont('DejaVuSans', FONT_PATH))
+        pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', BOLD_FONT_PATH))
+        pdfmetrics.registerFont(TTFont(CODE_FONT, MONO_FONT_PATH))
+
+        styles = getSampleStyleSheet()
+
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor='#1a1a1a',
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            fontName='DejaVuSans-Bold'
+        )
+
+        self.heading2_style = ParagraphStyle(
+            'Heading2',
+            parent=styles['Heading2'],
+            fontSize=18,
+            textColor='#1a1a1a',
+            spaceAfter=12,
+            spaceBefore=12,
+            alignment=TA_LEFT,
+            fontName='DejaVuSans-Bold'
+        )
+
+        self.heading3_style = ParagraphStyle(
+            'Heading3',
+            parent=styles['Heading3'],
+            fontSize=14,
+            textColor='#1a1a1a',
+            spaceAfter=10,
+            spaceBefore=10,
+            alignment=TA_LEFT,
+            fontName='DejaVuSans-Bold'
+        )
+
+        self.heading4_style = ParagraphStyle(
+            'Heading4',
+            parent=styles['Heading4'],
+            fontSize=12,
+            textColor='#1a1a1a',
+            spaceAfter=8,
+            spaceBefore=8,
+            alignment=TA_LEFT,
+            fontName='DejaVuSans-Bold'
+        )
+
+        self.body_style = ParagraphStyle(
+            'CustomBody',
+            parent=styles['BodyText'],
+            fontSize=11,
+            textColor='#333333',
+            spaceAfter=8,
+            alignment=TA_LEFT,
+            fontName='DejaVuSans',
+            leading=14
+        )
+
+        self.bullet_style = ParagraphStyle(
+            'Bullet',
+            parent=styles['BodyText'],
+            fontSize=11,
+            textColor='#333333',
+            spaceAfter=6,
+            alignment=TA_LEFT,
+            fontName='DejaVuSans',
+            leading=14,
+            leftIndent=20,
+            bulletIndent=10
+        )
+
+        self.code_style = ParagraphStyle(
+            'Code',
+            parent=styles['Code'],
+            fontSize=9,
+            leading=11,
+            fontName=CODE_FONT,
+            backColor='#f4f4f4',
+            spaceBefore=4,
+            spaceAfter=8
+        )
+
+        self.quote_style = ParagraphStyle(
+            'Quote',
+            parent=self.body_style,
+            leftIndent=20,
+            textColor='#555555'
+        )
+
+        self.table_cell_style = ParagraphStyle(
+            'TableCell',
+            parent=self.body_style,
+            fontSize=10,
+            leading=12,
+            spaceAfter=0
+        )
+
+        self.table_header_style = ParagraphStyle(
+            'TableHeader',
+            parent=self.table_cell_style,
+            fontName='DejaVuSans-Bold'
+        )
+
+        self.heading_styles = {
+            1: self.heading2_style,
+            2: self.heading2_style,
+            3: self.heading3_style,
+            4: self.heading4_style,
+            5: self.heading4_style,
+            6: self.heading4_style,
+        }
+        self._list_styles = {}
+
+    def list_style(self, level: int) -> ParagraphStyle:
+        level = min(level, MAX_LIST_LEVEL)
+        style = self._list_styles.get(level)
+        if style is None:
+            style = ParagraphStyle(
+                f'Bullet{level}',
+                parent=self.bullet_style,
+                leftIndent=self.bullet_style.leftIndent + LIST_INDENT_STEP * level,
+                bulletIndent=self.bullet_style.bulletIndent + LIST_INDENT_STEP * level
+            )
+            self._list_styles[level] = style
+        return style
+
+    def build_table(self, block: Block) -> Table:
+        width = max(len(row) for row in block.rows)
+        data = [
+            [Paragraph(render_inline(cell), self.table_header_style if block.header and i == 0 else self.table_cell_style)
+             for cell in row + [''] * (width - len(row))]
+            for i, row in enumerate(block.rows)
+        ]
+        table = Table(data, colWidths=[CONTENT_WIDTH / width] * width, repeatRows=1 if block.header else 0)
+        commands = [
+            ('GRID', (0, 0), (-1, -1), 0.5, '#999999'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]
+        if block.header:
+            commands.append(('BACKGROUND', (0, 0), (-1, 0), '#eeeeee'))
+        table.setStyle(TableStyle(commands))
+        return table
+
+    def build_story(self, title: str, summary_text: str) -> list:
+        story = [
+            Paragraph(escape(title), self.title_style),
+            Spacer(1, 0.2 * inch),
+        ]
+
+        for block in parse_blocks(summary_text):
+            kind = block.kind
+            if kind == 'paragraph':
+                story.append(Paragraph(render_inline(block.text), self.body_style))
+            elif kind == 'list_item':
+                story.append(Paragraph(render_inline(block.text), self.list_style(block.level), bulletText=block.marker))
+            elif kind == 'heading':
+                story.append(Paragraph(render_inline(block.text), self.heading_styles[block.level]))
+            elif kind == 'blank':
+                story.append(Spacer(1, 0.1 * inch))
+            elif kind == 'code':
+                story.append(Preformatted(block.text, self.code_style, maxLineLength=CODE_MAX_LINE_LENGTH))
+            elif kind == 'table':
+                story.append(self.build_table(block))
+            elif kind == 'quote':
+                story.append(Paragraph(render_inline(block.text), self.quote_style))
+            elif kind == 'rule':
+                story.append(HRFlowable(width='100%', thickness=0.5, color='#999999', spaceBefore=6, spaceAfter=6))
+
+        return story
+
+    def render(self, title: str, summary_text: str, output: Union[str, BinaryIO]) -> None:
+        doc = SimpleDocTemplate(
+            output,
+            pagesize=A4,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=18
+        )
+        doc.build(self.build_story(title, summary_text))
+
+    def render_to_buffer(self, title: str, summary_text: str) -> io.BytesIO:
+        buffer = io.BytesIO()
+        self.render(title, summary_text, buffer)
+        buffer.seek(0)
+        return buffer
+
+
+_renderer: Optional[PDFRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer() -> PDFRenderer:
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = PDFRenderer()
+    return _renderer
+
+
+def generate_pdf(title: str, summary_text: str, output_path: Union[str, BinaryIO]) -> None:
+    get_renderer().render(title, summary_text, output_path)
+
+
+def generate_pdf_buffer(title: str, summary_text: str) -> io.BytesIO:
+    return get_renderer().render_to_buffer(title, summary_text)
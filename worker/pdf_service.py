@@ -0,0 +1,62 @@
+"""
+Render-on-demand PDF delivery.
+
+The worker stores the summary Markdown as the task artifact. The PDF is
+rendered on the first download request and cached in Object Storage under
+a key derived from the content version, so later requests (and re-styling)
+cost at most one render.
+"""
+import hashlib
+import logging
+from typing import Any, Dict
+from storage_client import StorageClient
+
+logger = logging.getLogger(__name__)
+
+
+def summary_key_for(task_id: str) -> str:
+    return f"summaries/{task_id}.md"
+
+
+def summary_sha256(summary_text: str) -> str:
+    return hashlib.sha256(summary_text.encode("utf-8")).hexdigest()
+
+
+def pdf_cache_key(task: Dict[str, Any]) -> str:
+    """Object Storage key of the rendered PDF for the current title, summary and renderer."""
+    # reportlab is imported on the first PDF request, not when the worker starts
+    from pdf_generator import PDF_RENDER_VERSION
+    
+    version_source = f"{PDF_RENDER_VERSION}\n{task['title']}\n{task['summary_sha256']}"
+    version = hashlib.sha256(version_source.encode("utf-8")).hexdigest()[:16]
+    return f"pdfs/{task['task_id']}/{version}.pdf"
+
+
+def ensure_pdf(task: Dict[str, Any], storage_client: StorageClient) -> str:
+    """
+    Return the S3 key of the task's PDF, rendering and caching it if needed.
+    
+    Args:
+        task: Completed task dictionary from YDBClient.get_task
+        storage_client: Storage client for the task bucket
+        
+    Returns:
+        S3 key of the PDF
+    """
+    if not task.get("summary_key"):
+        # Tasks completed before lazy rendering have the PDF only.
+        return task["pdf_key"]
+    
+    pdf_key = pdf_cache_key(task)
+    if storage_client.exists(pdf_key):
+        logger.info(f"PDF cache hit for task {task['task_id']}: {pdf_key}")
+        return pdf_key
+    
+    logger.info(f"PDF cache miss for task {task['task_id']}, rendering {pdf_key}")
+    summary_text = storage_client.download_bytes(task["summary_key"]).decode("utf-8")
+    from pdf_generator import generate_pdf_buffer
+    
+    pdf_buffer = generate_pdf_buffer(task["title"], summary_text)
+    storage_client.upload_fileobj(pdf_buffer, pdf_key)
+    logger.info(f"PDF rendered and cached: {pdf_key}")
+    return pdf_key
@@ -1,47 +1,115 @@
+"""
+The task pipeline, shared by both worker runtimes.
+
+run_task is written once as a coroutine. Everything it does outside the
+process (YDB, Disk, Object Storage, SpeechKit, YandexGPT, the queue) and
+every blocking step (ffmpeg, the search index) goes through a task I/O
+object, which is the only part that differs between runtimes:
+
+- BlockingTaskIO (here) calls the synchronous clients directly. process_task
+  drives the coroutine with asyncio.run on the calling thread, so a task
+  holds its waitress thread as before, and cProfile, tracemalloc and stage
+  CPU time see only that task. Profiled tasks always run this way.
+- async_processor.AsyncTaskIO awaits aiohttp, ydb.aio and the SDK's asyncio
+  client and sends blocking steps to executors, so many tasks share one
+  event loop.
+"""
 import os
+import json
+import asyncio
 import logging
-from typing import Dict, Any
-from ydb_client import YDBClient
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from ydb_client import get_shared_client
 from storage_client import StorageClient
-from video_processor import download_video, extract_audio, get_temp_paths, cleanup_temp_files
-from transcription import transcribe_audio
+from video_processor import download_video, extract_audio
+from transcription import recognize_chunks
+from transcript_store import TimedTranscript, transcript_key
+from search_index import index_task
 from summary import generate_summary
-from pdf_generator import generate_pdf
+from pdf_service import summary_key_for, summary_sha256
+from stage_timer import StageTimer
+from vad import VAD_ENABLED, OffsetMap, trim_silence
+from workspace import Workspace, WorkspaceBusy, estimate_bytes, get_workspace_manager
+from profiling import TaskProfiler, finish_profiler, start_profiler
+from queue_client import QueueClient
+from resilience import DependencyUnavailable, end_task_budget, start_task_budget
+from structured_logging import bind, unbind
+import resilience
+from metrics import AUDIO_SECONDS, BYTES_DOWNLOADED, BYTES_UPLOADED, QUEUE_LAG, TASKS_FINISHED, TASKS_IN_FLIGHT, TASKS_RELEASED
 
 logger = logging.getLogger(__name__)
 
+DISK_API_URL = os.environ.get("DISK_API_URL", "https://cloud-api.yandex.net")
+# Tasks released while a dependency is down come back after an increasing delay
+MAX_RELEASES = int(os.environ.get("MAX_TASK_RELEASES", "5"))
+RELEASE_DELAY_SECONDS = 60
+MAX_QUEUE_DELAY_SECONDS = 900
+# Serverless container limit; create_task enforces the same for direct uploads
+MAX_VIDEO_BYTES = 200 * 1024 * 1024
 
-def validate_yandex_disk_link(video_link: str) -> Dict[str, Any]:
+
+def get_disk_metadata(video_link: str) -> Dict[str, Any]:
     import requests
     
-    api_url = "https://cloud-api.yandex.net/v1/disk/public/resources"
+    api_url = f"{DISK_API_URL}/v1/disk/public/resources"
     params = {"public_key": video_link}
     
     response = requests.get(api_url, params=params, timeout=10)
     
+    if response.status_code == 429 or response.status_code >= 500:
+        # Disk itself is failing, not the link; let the retry layer see it
+        response.raise_for_status()
     if response.status_code != 200:
         raise Exception("Invalid or inaccessible video link")
     
-    metadata = response.json()
-    
+    return response.json()
+
+
+def validate_yandex_disk_link(video_link: str) -> Dict[str, Any]:
+    return check_video_metadata(get_disk_metadata(video_link))
+
+
+def check_video_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
     mime_type = metadata.get("mime_type", "")
     if not mime_type.startswith("video/"):
         raise Exception(f"File is not a video (mime_type: {mime_type})")
     
-    file_size = metadata.get("size", 0)
-    max_size = 200 * 1024 * 1024  # 200 MB
-    
-    if file_size > max_size:
-        size_mb = file_size / (1024 * 1024)
-        raise Exception(f"Video file is too large ({size_mb:.1f} MB). Maximum supported size is 200 MB due to serverless container limitations. Please use a smaller video file.")
-    
+    check_video_size(metadata.get("size", 0))
     return metadata
 
 
+def check_video_size(file_size: int) -> None:
+    if file_size > MAX_VIDEO_BYTES:
+        size_mb = file_size / (1024 * 1024)
+        raise Exception(f"Video file is too large ({size_mb:.1f} MB). Maximum supported size is {MAX_VIDEO_BYTES // (1024 * 1024)} MB due to serverless container limitations. Please use a smaller video file.")
+
+
+def check_uploaded_video(file_size: int, declared_size: Optional[int]) -> Dict[str, Any]:
+    """Metadata of an uploaded video, as far as the workspace booking needs it."""
+    check_video_size(file_size)
+    if declared_size and file_size != declared_size:
+        raise Exception(f"Uploaded video has {file_size} bytes, but {declared_size} were declared")
+    return {"size": file_size}
+
+
+def workspace_bytes(task: Dict[str, Any], metadata: Optional[Dict[str, Any]]) -> int:
+    """/tmp space to book, from the size and duration stored on the task or the Disk metadata."""
+    metadata = metadata or {}
+    size = metadata.get("size") or task.get("size_bytes")
+    duration = task.get("duration_seconds")
+    if not duration:
+        # Disk reports video duration in milliseconds
+        duration_ms = (metadata.get("video_metadata") or {}).get("duration")
+        duration = duration_ms / 1000 if duration_ms else None
+    return estimate_bytes(size, duration)
+
+
 def get_download_url(video_link: str) -> str:
     import requests
     
-    api_url = "https://cloud-api.yandex.net/v1/disk/public/resources/download"
+    api_url = f"{DISK_API_URL}/v1/disk/public/resources/download"
     params = {"public_key": video_link}
     
     response = requests.get(api_url, params=params, timeout=10)
@@ -50,16 +118,158 @@ def get_download_url(video_link: str) -> str:
     return response.json()["href"]
 
 
-def process_task(task_id: str) -> None:
-    ydb_client = YDBClient()
-    storage_client = StorageClient()
+def observe_queue_lag(created_at: str) -> None:
+    try:
+        created = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError):
+        return
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    QUEUE_LAG.observe(max(0.0, (datetime.now(timezone.utc) - created).total_seconds()))
+
+
+class _BlockingCalls:
+    """Awaitable view of a synchronous client: each method runs on the calling thread."""
+    
+    def __init__(self, client: Any):
+        self._client = client
+    
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self._client, name)
+        
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        
+        return call
+
+
+class BlockingTaskIO:
+    """
+    Task I/O of the synchronous runtime: plain blocking calls.
+    
+    Functions are looked up in this module when called, so they can be
+    wrapped (the pipeline benchmark times them this way).
+    """
+    
+    def __init__(self):
+        self.ydb = get_shared_client()
+        self.db = _BlockingCalls(self.ydb)
+        self.storage = StorageClient()
+        self.report_progress = self.ydb.report_progress
+    
+    async def blocking(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call (Object Storage, the search index, the queue)."""
+        return fn(*args, **kwargs)
+    
+    async def media(self, fn: Callable[..., Any], *args) -> Any:
+        """Run an ffmpeg step."""
+        return fn(*args)
+    
+    @asynccontextmanager
+    async def workspace(self, task_id: str, size_bytes: int) -> AsyncIterator[Workspace]:
+        with get_workspace_manager().open(task_id, size_bytes) as workspace:
+            yield workspace
+    
+    async def validate_link(self, video_link: str) -> Dict[str, Any]:
+        return resilience.call("disk", validate_yandex_disk_link, video_link)
+    
+    async def download_video(self, video_link: str, path: str) -> int:
+        download_url = resilience.call("disk", get_download_url, video_link)
+        return resilience.call("disk", download_video, download_url, path)
+    
+    async def recognize(self, audio_s3_uri: str, folder_id: str):
+        return recognize_chunks(audio_s3_uri, folder_id)
+    
+    async def summarize(self, text: str, folder_id: str):
+        return generate_summary(text, folder_id)
+
+
+async def remove_silence(task_id: str, audio_path: str, timer: StageTimer, io) -> Optional[OffsetMap]:
+    """Trim long pauses from the audio; on failure the untrimmed audio is transcribed and None is returned."""
+    try:
+        with timer.stage("vad") as stage:
+            stage.add_bytes_in(os.path.getsize(audio_path))
+            offset_map = await io.media(trim_silence, audio_path)
+            stage.add_bytes_out(os.path.getsize(audio_path))
+        AUDIO_SECONDS.inc(offset_map.original_duration, kind="extracted")
+        AUDIO_SECONDS.inc(offset_map.duration, kind="transcribed")
+        # Maps transcript times (trimmed audio) back to the original recording
+        offsets_key = f"transcripts/{task_id}/vad_offsets.json"
+        await io.blocking(io.storage.upload_bytes, json.dumps(offset_map.to_dict()).encode("utf-8"), offsets_key, "application/json")
+        logger.info(f"Silence trimmed, offset map uploaded to S3: {offsets_key}")
+        return offset_map
+    except Exception as e:
+        logger.warning(f"Silence trimming failed for task {task_id}, using full audio: {str(e)}")
+        return None
+
+
+def store_transcript(task_id: str, transcript: TimedTranscript, storage_client: StorageClient) -> None:
+    """Keep the timed transcript for range re-summaries; the task does not depend on it."""
+    try:
+        data = transcript.to_bytes()
+        storage_client.upload_bytes(data, transcript_key(task_id))
+        BYTES_UPLOADED.inc(len(data), artifact="transcript")
+        logger.info(f"Transcript uploaded to S3: {transcript_key(task_id)}")
+    except Exception as e:
+        logger.warning(f"Could not store the transcript of task {task_id}: {str(e)}")
+
+
+async def update_search_index(task_id: str, title: str, summary_text: str, transcript_text: str, timer: StageTimer, io) -> None:
+    """Make the lecture findable through /api/search; the task is already completed either way."""
+    try:
+        with timer.stage("index"):
+            await io.blocking(index_task, task_id, title, summary_text, transcript_text, io.storage, io.ydb)
+    except Exception as e:
+        logger.warning(f"Could not index task {task_id} for search: {str(e)}")
+
+
+async def fail_task(io, task_id: str, error_msg: str) -> None:
+    await io.db.update_task_status(task_id, "error", error_msg)
+    TASKS_FINISHED.inc(status="error")
+
+
+async def release_task(io, task_id: str, lane: Optional[str], releases: int, reason: str) -> None:
+    """Put the task back in the queue with a delay, or fail it after MAX_RELEASES."""
+    if releases >= MAX_RELEASES:
+        await fail_task(io, task_id, f"{reason} (gave up after {releases} retries)")
+        return
+    
+    delay = min(MAX_QUEUE_DELAY_SECONDS, RELEASE_DELAY_SECONDS * 2 ** releases)
+    await io.db.update_task_status(task_id, "queued")
+    try:
+        await io.blocking(QueueClient().send_task, task_id, lane or "short", delay_seconds=delay, releases=releases + 1)
+    except Exception as e:
+        await fail_task(io, task_id, f"{reason} (could not requeue: {str(e)})")
+        return
+    TASKS_RELEASED.inc()
+    logger.warning(f"Task {task_id} released back to the queue for {delay} s: {reason}")
+
+
+def process_task(task_id: str, profile: bool = False, lane: Optional[str] = None, releases: int = 0) -> None:
+    """Run a task on the calling thread with blocking I/O."""
+    TASKS_IN_FLIGHT.inc()
+    log_context = bind(task_id=task_id, lane=lane, attempt=releases + 1)
+    profiler = start_profiler(task_id) if profile else None
+    budget = start_task_budget()
+    try:
+        asyncio.run(run_task(task_id, BlockingTaskIO(), profiler, lane, releases))
+    finally:
+        end_task_budget(budget)
+        unbind(log_context)
+        if profiler is not None:
+            finish_profiler(profiler)
+        TASKS_IN_FLIGHT.dec()
+
+
+async def run_task(task_id: str, io, profiler: Optional[TaskProfiler] = None, lane: Optional[str] = None, releases: int = 0) -> None:
+    timer = StageTimer(task_id, profiler, on_stage=io.report_progress)
     folder_id = os.environ.get("FOLDER_ID")
     
     if not folder_id:
         raise ValueError("FOLDER_ID environment variable must be set")
     
     try:
-        task = ydb_client.get_task(task_id)
+        task = await io.db.get_task(task_id)
         if not task:
             logger.warning(f"Task {task_id} not found in database, skipping (likely from old database)")
             return
@@ -70,120 +280,174 @@ def process_task(task_id: str) -> None:
             logger.info(f"Task {task_id} already in final state: {task['status']}")
             return
         
-        ydb_client.update_task_status(task_id, "processing")
+        if not await io.db.claim_task(task_id, lane):
+            logger.info(f"Task {task_id} was promoted out of the {lane} lane, skipping")
+            return
+        observe_queue_lag(task.get("created_at"))
         logger.info(f"Task {task_id} status updated to processing")
         
-        logger.info(f"Validating video link for task {task_id}")
+        # Uploaded videos sit in our bucket; their stored size is checked again here,
+        # before it books the workspace, rather than trusting what the client declared
+        upload_key = task.get("upload_key")
+        logger.info(f"Validating video for task {task_id}")
         try:
-            metadata = validate_yandex_disk_link(task["video_link"])
-            logger.info(f"Video link validated: {metadata.get('name')}")
+            with timer.stage("validate"):
+                if upload_key:
+                    stored_size = await io.blocking(io.storage.size, upload_key)
+                    metadata = check_uploaded_video(stored_size, task.get("size_bytes"))
+                else:
+                    metadata = await io.validate_link(task["video_link"])
+            logger.info(f"Video validated: {metadata.get('name') or upload_key}")
+        except DependencyUnavailable:
+            raise
         except Exception as e:
-            error_msg = f"Video link validation failed: {str(e)}"
+            error_msg = f"Video validation failed: {str(e)}"
             logger.error(error_msg)
-            ydb_client.update_task_status(task_id, "error", error_msg)
+            await fail_task(io, task_id, error_msg)
             return
         
-        logger.info(f"Downloading video for task {task_id}")
-        video_path, audio_path = get_temp_paths(task_id)
-        
-        try:
-            download_url = get_download_url(task["video_link"])
-            download_video(download_url, video_path)
-            logger.info(f"Video downloaded to {video_path}")
+        # Video and audio only exist inside the workspace; leaving it after the
+        # audio upload frees /tmp while the task waits on SpeechKit
+        async with io.workspace(task_id, workspace_bytes(task, metadata)) as workspace:
+            logger.info(f"Downloading video for task {task_id}")
+            video_path, audio_path = workspace.path("video.mp4"), workspace.path("audio.wav")
             
-        except Exception as e:
-            error_msg = f"Video download failed: {str(e)}"
-            logger.error(error_msg)
-            cleanup_temp_files(task_id)
-            ydb_client.update_task_status(task_id, "error", error_msg)
-            return
-        
-        logger.info(f"Extracting audio for task {task_id}")
-        try:
-            extract_audio(video_path, audio_path)
-            logger.info(f"Audio extracted to {audio_path}")
+            try:
+                with timer.stage("download") as stage:
+                    if upload_key:
+                        await io.blocking(io.storage.download_file, upload_key, video_path)
+                        downloaded = os.path.getsize(video_path)
+                    else:
+                        downloaded = await io.download_video(task["video_link"], video_path)
+                    stage.add_bytes_in(downloaded)
+                BYTES_DOWNLOADED.inc(downloaded)
+                logger.info(f"Video downloaded to {video_path}")
+                
+            except DependencyUnavailable:
+                raise
+            except Exception as e:
+                error_msg = f"Video download failed: {str(e)}"
+                logger.error(error_msg)
+                await fail_task(io, task_id, error_msg)
+                return
             
-            if os.path.exists(video_path):
-                os.remove(video_path)
+            logger.info(f"Extracting audio for task {task_id}")
+            try:
+                with timer.stage("extract_audio") as stage:
+                    stage.add_bytes_in(os.path.getsize(video_path))
+                    await io.media(extract_audio, video_path, audio_path)
+                    stage.add_bytes_out(os.path.getsize(audio_path))
+                logger.info(f"Audio extracted to {audio_path}")
+                
+                workspace.remove("video.mp4")
                 logger.info(f"Video file deleted to free up space: {video_path}")
-            
-            audio_s3_key = f"temp/{task_id}/audio.wav"
-            storage_client.upload_file(audio_path, audio_s3_key)
-            logger.info(f"Audio uploaded to S3: {audio_s3_key}")
-            
-            bucket_name = os.environ.get("S3_BUCKET") or os.environ.get("BUCKET_NAME")
-            audio_s3_uri = f"https://storage.yandexcloud.net/{bucket_name}/{audio_s3_key}"
-            logger.info(f"Audio S3 URI: {audio_s3_uri}")
-        except Exception as e:
-            error_msg = f"Audio extraction failed: {str(e)}"
-            logger.error(error_msg)
-            cleanup_temp_files(task_id)
-            ydb_client.update_task_status(task_id, "error", error_msg)
-            return
+                
+                offset_map = None
+                if VAD_ENABLED:
+                    offset_map = await remove_silence(task_id, audio_path, timer, io)
+                
+                audio_s3_key = f"temp/{task_id}/audio.wav"
+                audio_bytes = os.path.getsize(audio_path)
+                with timer.stage("upload_audio") as stage:
+                    await io.blocking(io.storage.upload_file, audio_path, audio_s3_key)
+                    stage.add_bytes_out(audio_bytes)
+                BYTES_UPLOADED.inc(audio_bytes, artifact="audio")
+                logger.info(f"Audio uploaded to S3: {audio_s3_key}")
+                
+                audio_s3_uri = f"{io.storage.endpoint}/{io.storage.bucket}/{audio_s3_key}"
+                logger.info(f"Audio S3 URI: {audio_s3_uri}")
+            except Exception as e:
+                error_msg = f"Audio extraction failed: {str(e)}"
+                logger.error(error_msg)
+                await fail_task(io, task_id, error_msg)
+                return
         
         logger.info(f"Transcribing audio for task {task_id}")
         try:
-            transcribed_text = transcribe_audio(audio_s3_uri, folder_id)
+            with timer.stage("transcribe") as stage:
+                transcript = TimedTranscript.from_chunks(await io.recognize(audio_s3_uri, folder_id), offset_map)
+                transcribed_text = transcript.text
+                stage.add_bytes_in(len(transcript.text_bytes))
             logger.info(f"Audio transcribed, length: {len(transcribed_text)} characters")
+            await io.blocking(store_transcript, task_id, transcript, io.storage)
+        except DependencyUnavailable:
+            raise
         except Exception as e:
             error_msg = f"Transcription failed: {str(e)}"
             logger.error(error_msg)
-            cleanup_temp_files(task_id)
-            ydb_client.update_task_status(task_id, "error", error_msg)
+            await fail_task(io, task_id, error_msg)
             return
         
         logger.info(f"Generating summary for task {task_id}")
         try:
-            summary_text = generate_summary(transcribed_text, folder_id)
-            logger.info(f"Summary generated, length: {len(summary_text)} characters")
+            with timer.stage("summarize") as stage:
+                stage.add_bytes_out(len(transcribed_text.encode("utf-8")))
+                summary = await io.summarize(transcribed_text, folder_id)
+                summary_text = summary.text
+                stage.add_bytes_in(len(summary_text.encode("utf-8")))
+            logger.info(
+                f"Summary generated with {summary.model}, length: {len(summary_text)} characters, "
+                f"tokens: {summary.input_tokens} in / {summary.output_tokens} out, {summary.latency_ms:.0f} ms"
+            )
+        except DependencyUnavailable:
+            raise
         except Exception as e:
             error_msg = f"Summary generation failed: {str(e)}"
             logger.error(error_msg)
-            cleanup_temp_files(task_id)
-            ydb_client.update_task_status(task_id, "error", error_msg)
-            return
-        
-        logger.info(f"Generating PDF for task {task_id}")
-        pdf_path = f"/tmp/{task_id}.pdf"
-        try:
-            generate_pdf(task["title"], summary_text, pdf_path)
-            logger.info(f"PDF generated at {pdf_path}")
-        except Exception as e:
-            error_msg = f"PDF generation failed: {str(e)}"
-            logger.error(error_msg)
-            cleanup_temp_files(task_id)
-            ydb_client.update_task_status(task_id, "error", error_msg)
+            await fail_task(io, task_id, error_msg)
             return
         
-        logger.info(f"Uploading PDF for task {task_id}")
-        pdf_key = f"pdfs/{task_id}.pdf"
+        logger.info(f"Uploading summary for task {task_id}")
+        summary_key = summary_key_for(task_id)
         try:
-            storage_client.upload_file(pdf_path, pdf_key)
-            logger.info(f"PDF uploaded to S3: {pdf_key}")
-            
-            if os.path.exists(pdf_path):
-                os.remove(pdf_path)
+            with timer.stage("upload_summary") as stage:
+                summary_bytes = summary_text.encode("utf-8")
+                await io.blocking(io.storage.upload_bytes, summary_bytes, summary_key, "text/markdown; charset=utf-8")
+                stage.add_bytes_out(len(summary_bytes))
+            BYTES_UPLOADED.inc(len(summary_bytes), artifact="summary")
+            logger.info(f"Summary uploaded to S3: {summary_key}")
         except Exception as e:
-            error_msg = f"PDF upload failed: {str(e)}"
+            error_msg = f"Summary upload failed: {str(e)}"
             logger.error(error_msg)
-            cleanup_temp_files(task_id)
-            ydb_client.update_task_status(task_id, "error", error_msg)
+            await fail_task(io, task_id, error_msg)
             return
         
         logger.info(f"Marking task {task_id} as completed")
-        ydb_client.update_task_complete(task_id, pdf_key)
+        await io.db.update_task_complete(
+            task_id,
+            summary_key,
+            summary_sha256(summary_text),
+            summary.model,
+            summary.input_tokens,
+            summary.output_tokens,
+            summary.latency_ms
+        )
+        TASKS_FINISHED.inc(status="completed")
         
-        cleanup_temp_files(task_id)
+        await update_search_index(task_id, task["title"], summary_text, transcribed_text, timer, io)
         
         logger.info(f"Task {task_id} completed successfully")
         
+    except WorkspaceBusy as e:
+        # A redelivered message: the attempt already running finishes the task; record nothing for this one
+        logger.warning(f"Skipping duplicate delivery: {str(e)}")
+        timer.stages.clear()
+    except DependencyUnavailable as e:
+        logger.warning(f"Dependency unavailable for task {task_id}: {str(e)}")
+        try:
+            await release_task(io, task_id, lane, releases, str(e))
+        except Exception:
+            logger.warning(f"Could not release task {task_id}", exc_info=True)
     except Exception as e:
         error_msg = f"Unexpected error: {str(e)}"
         logger.error(error_msg)
-        cleanup_temp_files(task_id)
         try:
-            ydb_client.update_task_status(task_id, "error", error_msg)
+            await fail_task(io, task_id, error_msg)
         except Exception:
             logger.warning(f"Could not update task status (task may not exist)")
     finally:
-        ydb_client.close()
+        if timer.stages:
+            try:
+                await io.db.save_task_stages(task_id, timer.to_rows(), timer.to_json(), lane)
+            except Exception as e:
+                logger.warning(f"Could not save stage timings for task {task_id}: {str(e)}")
@@ -0,0 +1,158 @@
+"""
+Opt-in profiling of a single task.
+
+Enabled per task by a `profile` message attribute (or `"profile": true` in
+the message body), or for every task with WORKER_PROFILE=1. The task runs
+under cProfile, and tracemalloc records the allocation peak of each stage
+and a snapshot at its end; the report lists the top allocation sites each
+stage added. Reports are uploaded to Object Storage
+under `profiles/{task_id}/`.
+
+When profiling is off the only cost is a `None` check per stage in
+StageTimer. cProfile and tracemalloc are process-wide, so only one task
+is profiled at a time; other requests run unprofiled.
+"""
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from storage_client import StorageClient
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ALL_TASKS = os.environ.get("WORKER_PROFILE", "").lower() in ("1", "true", "yes")
+TRACEMALLOC_FRAMES = int(os.environ.get("WORKER_PROFILE_FRAMES", "10"))
+TOP_FUNCTIONS = 60
+TOP_ALLOCATIONS = 25
+
+_profiling_lock = threading.Lock()
+
+
+def profiling_requested(message: Dict[str, Any], message_data: Dict[str, Any]) -> bool:
+    """Check the env switch, the `profile` message attribute and the message body flag."""
+    if PROFILE_ALL_TASKS:
+        return True
+    attributes = message.get("details", {}).get("message", {}).get("message_attributes", {}) or {}
+    attribute = attributes.get("profile") or {}
+    if str(attribute.get("string_value", "")).lower() in ("1", "true", "yes"):
+        return True
+    return bool(message_data.get("profile"))
+
+
+class TaskProfiler:
+    """cProfile for the whole run plus a tracemalloc snapshot at the end of each stage."""
+
+    def __init__(self, task_id: str, name: str = "pipeline"):
+        self.task_id = task_id
+        self.name = name
+        self.profile = cProfile.Profile()
+        self.started_tracemalloc = False
+        self.workdir = tempfile.mkdtemp(prefix=f"profile_{task_id}_")
+        # (stage, snapshot file, traced bytes at the end, peak during the stage)
+        self.snapshots: List[Tuple[str, str, int, int]] = []
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self.started_tracemalloc = True
+        self._dump_snapshot("start", *tracemalloc.get_traced_memory())
+        self.profile.enable()
+
+    def _dump_snapshot(self, stage: str, current: int, peak: int) -> None:
+        # Snapshots go to disk and are compared only after tracing stops:
+        # grouping ~10^5 traces while tracemalloc is active takes seconds
+        path = os.path.join(self.workdir, f"{len(self.snapshots):02d}-{stage}.tracemalloc")
+        tracemalloc.take_snapshot().dump(path)
+        self.snapshots.append((stage, path, current, peak))
+
+    def stage_started(self, stage: str) -> None:
+        tracemalloc.reset_peak()
+
+    def stage_finished(self, stage: str) -> None:
+        # cProfile is paused so the snapshot does not show up in the profile
+        self.profile.disable()
+        self._dump_snapshot(stage, *tracemalloc.get_traced_memory())
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+
+    def allocation_report(self) -> str:
+        sections = []
+        previous = None
+        for stage, path, current, peak in self.snapshots:
+            snapshot = tracemalloc.Snapshot.load(path)
+            if previous is not None:
+                lines = [
+                    f"== {stage} ==",
+                    f"traced at end: {current / 1024:.1f} KiB, peak during stage: {peak / 1024:.1f} KiB",
+                    f"top {TOP_ALLOCATIONS} allocation sites by growth since the previous snapshot:",
+                ]
+                lines.extend(f"  {stat}" for stat in snapshot.compare_to(previous, "lineno")[:TOP_ALLOCATIONS])
+                sections.append("\n".join(lines))
+            previous = snapshot
+        return "\n\n".join(sections)
+
+    def reports(self) -> Dict[str, bytes]:
+        self.profile.create_stats()
+        # Same format as Profile.dump_stats, readable with pstats / snakeviz.
+        # Serialized first: pstats.Stats takes the stats over from the profile.
+        raw_stats = marshal.dumps(self.profile.stats)
+        summary = io.StringIO()
+        pstats.Stats(self.profile, stream=summary).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        header = f"task {self.task_id}, {self.name}, {datetime.now(timezone.utc).isoformat()}\n\n"
+        return {
+            f"{self.name}.prof": raw_stats,
+            f"{self.name}.txt": (header + summary.getvalue()).encode("utf-8"),
+            f"{self.name}-allocations.txt": (header + self.allocation_report()).encode("utf-8"),
+        }
+
+    def upload(self, storage_client: StorageClient) -> None:
+        for filename, data in self.reports().items():
+            key = f"profiles/{self.task_id}/{filename}"
+            storage_client.upload_bytes(data, key, "text/plain; charset=utf-8" if filename.endswith(".txt") else "application/octet-stream")
+            logger.info(f"Profile report uploaded to S3: {key}")
+        # Raw snapshots, loadable with tracemalloc.Snapshot.load for deeper analysis
+        for _, path, _, _ in self.snapshots:
+            key = f"profiles/{self.task_id}/{self.name}-snapshots/{os.path.basename(path)}"
+            storage_client.upload_file(path, key)
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def start_profiler(task_id: str, name: str = "pipeline") -> Optional[TaskProfiler]:
+    """Start profiling, or return None if another task is already being profiled."""
+    if not _profiling_lock.acquire(blocking=False):
+        logger.warning(f"Profiling of task {task_id} skipped: another task is being profiled")
+        return None
+    profiler = TaskProfiler(task_id, name)
+    try:
+        profiler.start()
+    except Exception:
+        _profiling_lock.release()
+        raise
+    logger.info(f"Profiling task {task_id} ({name})")
+    return profiler
+
+
+def finish_profiler(profiler: TaskProfiler) -> None:
+    """Stop the profiler and upload its reports; failures are logged, never raised."""
+    try:
+        profiler.stop()
+        profiler.upload(StorageClient())
+    except Exception as e:
+        logger.warning(f"Could not upload profile for task {profiler.task_id}: {str(e)}")
+    finally:
+        profiler.cleanup()
+        _profiling_lock.release()
@@ -0,0 +1,35 @@
+import os
+import json
+import boto3
+
+
+class QueueClient:
+    """Sends task messages to the short and long lane queues."""
+    
+    def __init__(self):
+        self.short_queue_url = os.environ.get("MQ_QUEUE_URL")
+        self.long_queue_url = os.environ.get("MQ_LONG_QUEUE_URL") or self.short_queue_url
+        
+        if not self.short_queue_url:
+            raise ValueError("MQ_QUEUE_URL environment variable must be set")
+        
+        self.sqs_client = boto3.client(
+            "sqs",
+            endpoint_url=os.environ.get("MQ_ENDPOINT", "https://message-queue.api.cloud.yandex.net"),
+            aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
+            region_name=os.environ.get("AWS_REGION", "ru-central1")
+        )
+    
+    def queue_url(self, lane: str) -> str:
+        return self.long_queue_url if lane == "long" else self.short_queue_url
+    
+    def send_task(self, task_id: str, lane: str, delay_seconds: int = 0, releases: int = 0) -> None:
+        body = {"task_id": task_id, "lane": lane}
+        if releases:
+            body["releases"] = releases
+        self.sqs_client.send_message(
+            QueueUrl=self.queue_url(lane),
+            MessageBody=json.dumps(body),
+            DelaySeconds=delay_seconds
+        )
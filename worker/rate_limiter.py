@@ -0,0 +1,65 @@
+"""
+Token buckets for SpeechKit and YandexGPT shared by all worker instances.
+
+Buckets live in the YDB `rate_limits` table, one per API and folder
+(e.g. "stt:<folder_id>"), so every container draws from the same quota.
+Callers reserve a token and sleep until it is theirs instead of sending a
+request that would be rejected with 429 (`acquire_async` waits without
+blocking the event loop of the async runtime). Rates are per second and can be
+tuned with env vars; a rate of 0 disables the bucket.
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+from ydb_client import get_shared_client
+from metrics import RATE_LIMIT_WAIT
+from resilience import DependencyUnavailable
+
+logger = logging.getLogger(__name__)
+
+# api -> (tokens per second, burst)
+BUCKETS: Dict[str, Tuple[float, float]] = {
+    "stt": (float(os.environ.get("STT_RATE_PER_SECOND", "0.5")), float(os.environ.get("STT_BURST", "5"))),
+    "gpt": (float(os.environ.get("GPT_RATE_PER_SECOND", "1")), float(os.environ.get("GPT_BURST", "3"))),
+}
+MAX_WAIT_SECONDS = float(os.environ.get("RATE_LIMIT_MAX_WAIT_SECONDS", "300"))
+
+
+class RateLimitExceeded(DependencyUnavailable):
+    """The quota is booked further ahead than MAX_WAIT_SECONDS."""
+
+
+def _checked_wait(api: str, bucket: str, wait: Optional[float]) -> float:
+    if wait is None:
+        raise RateLimitExceeded(f"Rate limit for {bucket} is booked for more than {MAX_WAIT_SECONDS:.0f} s")
+    
+    RATE_LIMIT_WAIT.observe(wait, api=api)
+    if wait > 0:
+        logger.info(f"Waiting {wait:.1f} s for a {api} rate limit token")
+    return wait
+
+
+def acquire(api: str, folder_id: str) -> None:
+    """Block until a token of the api's bucket for this folder is available."""
+    rate, burst = BUCKETS[api]
+    if rate <= 0:
+        return
+    
+    bucket = f"{api}:{folder_id}"
+    wait = _checked_wait(api, bucket, get_shared_client().reserve_token(bucket, rate, burst, MAX_WAIT_SECONDS))
+    if wait > 0:
+        time.sleep(wait)
+
+
+async def acquire_async(api: str, folder_id: str, ydb_client) -> None:
+    """Wait for a token like acquire, reserving it through an AsyncYDBClient."""
+    rate, burst = BUCKETS[api]
+    if rate <= 0:
+        return
+    
+    bucket = f"{api}:{folder_id}"
+    wait = _checked_wait(api, bucket, await ydb_client.reserve_token(bucket, rate, burst, MAX_WAIT_SECONDS))
+    if wait > 0:
+        await asyncio.sleep(wait)
@@ -0,0 +1,209 @@
+"""
+Retries and circuit breakers for outbound calls (Disk, SpeechKit, YandexGPT).
+
+`call(dependency, fn, ...)` (or `call_async` for coroutines) retries retryable failures (connection errors,
+timeouts, 429/5xx, transient gRPC codes) with full-jitter exponential
+backoff, never sleeping past the task's time budget. Each dependency has
+a circuit breaker per worker process: after
+BREAKER_FAILURE_THRESHOLD consecutive retryable failures it opens and
+calls fail immediately with DependencyUnavailable for BREAKER_RESET_SECONDS,
+then a single trial call decides whether it closes again. Only a response
+of the dependency closes it: errors raised before one (rate limits, local
+failures) leave the breaker as it was. Running out of
+attempts or time also raises DependencyUnavailable; the processor releases
+such tasks back to the queue instead of marking them as errors.
+"""
+import os
+import sys
+import time
+import asyncio
+import random
+import logging
+import threading
+import contextvars
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import requests
+from metrics import CIRCUIT_OPEN, RETRIES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Leaves headroom below the container's 900 s execution timeout
+TASK_TIME_BUDGET_SECONDS = float(os.environ.get("TASK_TIME_BUDGET_SECONDS", "840"))
+MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE_SECONDS = float(os.environ.get("RETRY_BACKOFF_BASE", "1"))
+BACKOFF_MAX_SECONDS = float(os.environ.get("RETRY_BACKOFF_MAX", "30"))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", "60"))
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+RETRYABLE_GRPC_CODES = {"UNAVAILABLE", "RESOURCE_EXHAUSTED", "DEADLINE_EXCEEDED", "ABORTED", "INTERNAL"}
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("task_deadline", default=None)
+
+
+class DependencyUnavailable(Exception):
+    """A dependency is down or saturated; the task should be retried later, not failed."""
+
+
+class CircuitOpenError(DependencyUnavailable):
+    pass
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRYABLE_STATUS_CODES
+    # aiohttp errors of the async runtime; only checked once something has imported aiohttp
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp is not None:
+        if isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)):
+            return True
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in RETRYABLE_STATUS_CODES
+    # gRPC errors (YandexGPT SDK) expose code(); checked by name to avoid importing grpc
+    code = getattr(error, "code", None)
+    if callable(code):
+        try:
+            return getattr(code(), "name", "") in RETRYABLE_GRPC_CODES
+        except Exception:
+            return False
+    return False
+
+
+def dependency_answered(error: BaseException) -> bool:
+    """Whether error carries the dependency's own response, rather than failing before or without one."""
+    if isinstance(error, DependencyUnavailable):
+        return False
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp is not None and isinstance(error, aiohttp.ClientResponseError):
+        return True
+    return callable(getattr(error, "code", None))
+
+
+def start_task_budget(seconds: float = TASK_TIME_BUDGET_SECONDS) -> contextvars.Token:
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def end_task_budget(token: contextvars.Token) -> None:
+    _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_progress = False
+        self.lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_seconds or self.trial_in_progress:
+                raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+            # Half-open: let exactly one call through to probe the dependency
+            self.trial_in_progress = True
+
+    def record_success(self) -> None:
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit for {self.name} closed")
+                CIRCUIT_OPEN.dec(dependency=self.name)
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_progress = False
+
+    def release_trial(self) -> None:
+        """The trial call ended without reaching the dependency; let the next call probe instead."""
+        with self.lock:
+            self.trial_in_progress = False
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.opened_at is not None:
+                # Failed trial: stay open for another period
+                self.opened_at = time.monotonic()
+                self.trial_in_progress = False
+            elif self.failures >= self.failure_threshold:
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+                CIRCUIT_OPEN.inc(dependency=self.name)
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(dependency: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if dependency not in _breakers:
+            _breakers[dependency] = CircuitBreaker(dependency, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+        return _breakers[dependency]
+
+
+def _retry_delay(dependency: str, circuit: CircuitBreaker, attempt: int, error: Exception) -> float:
+    """Record a failed attempt and return the backoff before the next one, or raise if there is none."""
+    if not is_retryable(error):
+        if dependency_answered(error):
+            # The dependency answered; the request itself is bad
+            circuit.record_success()
+        else:
+            # Raised before or instead of a response (rate limit, local error): says nothing about its health
+            circuit.release_trial()
+        raise error
+    circuit.record_failure()
+    if attempt >= MAX_ATTEMPTS:
+        raise DependencyUnavailable(f"{dependency} failed after {attempt} attempts: {str(error)}") from error
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+    remaining = remaining_budget()
+    if remaining is not None and delay >= remaining:
+        raise DependencyUnavailable(f"{dependency} failed and the task is out of time: {str(error)}") from error
+    RETRIES.inc(dependency=dependency)
+    logger.warning(f"{dependency} call failed ({str(error)}), retry {attempt} in {delay:.1f} s")
+    return delay
+
+
+def call(dependency: str, fn: Callable[..., T], *args, **kwargs) -> T:
+    """Call fn with retries on retryable errors, guarded by the dependency's circuit breaker."""
+    circuit = breaker(dependency)
+    attempt = 0
+    while True:
+        circuit.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            attempt += 1
+            time.sleep(_retry_delay(dependency, circuit, attempt, e))
+            continue
+        circuit.record_success()
+        return result
+
+
+async def call_async(dependency: str, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+    """Like call, for a coroutine function; the backoff does not block the event loop."""
+    circuit = breaker(dependency)
+    attempt = 0
+    while True:
+        circuit.before_call()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            attempt += 1
+            await asyncio.sleep(_retry_delay(dependency, circuit, attempt, e))
+            continue
+        circuit.record_success()
+        return result
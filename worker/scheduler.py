@@ -0,0 +1,59 @@
+"""
+Aging for the long lane and expiry of abandoned uploads.
+
+create_task routes long videos to a separate queue so they don't hold up
+short ones. To keep long tasks from starving, a timer trigger calls
+`/promote`, which moves tasks that waited longer than
+LONG_LANE_MAX_WAIT_SECONDS to the short lane. The long-lane message stays
+in its queue; the long worker skips it once the task is promoted.
+
+The same timer fails direct uploads that were started but never completed
+within STALE_UPLOAD_SECONDS, so they don't stay `uploading` (and counted as
+such) forever. The bucket aborts incomplete multipart uploads after a day,
+so by then the parts are gone and the upload could not be resumed anyway.
+"""
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from ydb_client import get_shared_client
+from queue_client import QueueClient
+
+logger = logging.getLogger(__name__)
+
+LONG_LANE_MAX_WAIT_SECONDS = int(os.environ.get("LONG_LANE_MAX_WAIT_SECONDS", "3600"))
+# Per timer tick, so a backlog of old long tasks doesn't flood the short lane at once
+PROMOTE_BATCH_SIZE = int(os.environ.get("PROMOTE_BATCH_SIZE", "5"))
+STALE_UPLOAD_SECONDS = int(os.environ.get("STALE_UPLOAD_SECONDS", str(24 * 3600)))
+EXPIRE_BATCH_SIZE = int(os.environ.get("EXPIRE_BATCH_SIZE", "50"))
+LANES = ("short", "long")
+
+
+def promote_aged_tasks() -> int:
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=LONG_LANE_MAX_WAIT_SECONDS)).isoformat()
+    ydb_client = get_shared_client()
+    queue_client = QueueClient()
+    promoted = 0
+    for task_id in ydb_client.list_waiting_tasks("long", cutoff, PROMOTE_BATCH_SIZE):
+        if not ydb_client.move_task_lane(task_id, "long", "short"):
+            continue
+        try:
+            queue_client.send_task(task_id, "short")
+        except Exception as e:
+            logger.error(f"Could not requeue promoted task {task_id}: {str(e)}")
+            ydb_client.move_task_lane(task_id, "short", "long")
+            continue
+        promoted += 1
+        logger.info(f"Task {task_id} promoted to the short lane after waiting over {LONG_LANE_MAX_WAIT_SECONDS} s")
+    return promoted
+
+
+def expire_stale_uploads() -> int:
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=STALE_UPLOAD_SECONDS)).isoformat()
+    ydb_client = get_shared_client()
+    expired = 0
+    for lane in LANES:
+        for task_id in ydb_client.list_waiting_tasks(lane, cutoff, EXPIRE_BATCH_SIZE, status="uploading"):
+            if ydb_client.expire_upload(task_id, "Upload was not completed"):
+                expired += 1
+                logger.info(f"Task {task_id} failed: upload not completed within {STALE_UPLOAD_SECONDS} s")
+    return expired
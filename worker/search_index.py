@@ -0,0 +1,162 @@
+"""
+Full-text search index over lecture summaries and transcripts.
+
+Every completed task is indexed into its own small segment,
+`search/segments/{segment}.seg` in Object Storage, listed in the YDB table
+`search_segments`. When SEARCH_MERGE_FACTOR segments of one level pile up,
+the worker that added the last one merges them into a segment of the next
+level, so the number of segments grows with the logarithm of the number of
+lectures. Segments are immutable: the search function caches them on disk,
+memory-maps them and only downloads the ones it has not seen.
+
+Segment layout (little-endian uint32 arrays, so they can be used straight
+from the mapped file):
+
+    header     magic "LNSX", version, doc/term/posting counts, blob lengths
+    docs       token count of each document (summary words are weighted)
+    terms      byte offsets into the term blob (count + 1)
+    postings   offset of each term's postings (count + 1), in entries
+    entries    (document, term frequency) pairs, grouped by term
+    term blob  UTF-8 terms sorted by bytes, so a term is a binary search away
+    doc blob   JSON list of [task_id, title]
+
+Tokenization, stemming and the segment reader live in search_text.py, which
+python_functions/search_tasks is packaged with, so queries are normalized by
+the same code as the index.
+"""
+import os
+import sys
+import json
+import uuid
+import logging
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+from search_text import HEADER, MAGIC, SEGMENT_PREFIX, VERSION, Segment, uint32_array, tokenize
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MERGE_FACTOR = int(os.environ.get("SEARCH_MERGE_FACTOR", "8"))
+# A summary word counts as this many transcript words
+SUMMARY_WEIGHT = 3
+
+
+def term_counts(summary_text: str, transcript_text: str) -> Counter:
+    counts = Counter(tokenize(transcript_text))
+    for term, count in Counter(tokenize(summary_text)).items():
+        counts[term] += count * SUMMARY_WEIGHT
+    return counts
+
+
+def segment_key(segment: str) -> str:
+    return f"{SEGMENT_PREFIX}{segment}.seg"
+
+
+def new_segment_name() -> str:
+    # Sorts by creation time; merges let newer copies of a document win
+    return f"{datetime.now(timezone.utc):%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+
+def build_segment(docs: List[Tuple[str, str, int]], postings: Dict[bytes, List[Tuple[int, int]]]) -> bytes:
+    """
+    Serialize a segment.
+
+    docs are (task_id, title, length) in document order; postings map UTF-8
+    terms to (document, frequency) pairs in document order.
+    """
+    doc_lengths = uint32_array(length for _, _, length in docs)
+    term_offsets, posting_offsets, entries = uint32_array([0]), uint32_array([0]), uint32_array()
+    terms = []
+    position = 0
+    for term in sorted(postings):
+        terms.append(term)
+        position += len(term)
+        term_offsets.append(position)
+        for doc, frequency in postings[term]:
+            entries.append(doc)
+            entries.append(frequency)
+        posting_offsets.append(len(entries) // 2)
+    terms_blob = b"".join(terms)
+    docs_blob = json.dumps([[task_id, title] for task_id, title, _ in docs], ensure_ascii=False).encode("utf-8")
+
+    header = HEADER.pack(MAGIC, VERSION, 0, len(docs), len(terms), len(entries) // 2, len(terms_blob), len(docs_blob))
+    columns = [doc_lengths, term_offsets, posting_offsets, entries]
+    if sys.byteorder == "big":
+        columns = [array(column.typecode, column) for column in columns]
+        for column in columns:
+            column.byteswap()
+    return header + b"".join(column.tobytes() for column in columns) + terms_blob + docs_blob
+
+
+def task_segment(task_id: str, title: str, summary_text: str, transcript_text: str) -> bytes:
+    counts = term_counts(f"{title}\n{summary_text}", transcript_text)
+    postings = {term.encode("utf-8"): [(0, count)] for term, count in counts.items()}
+    return build_segment([(task_id, title, sum(counts.values()))], postings)
+
+
+def merge_segments(segments: List[Segment]) -> bytes:
+    """One segment with the documents of all; for a task indexed twice the later segment wins."""
+    latest: Dict[str, Tuple[int, int]] = {}
+    for segment_index, segment in enumerate(segments):
+        for doc_index, (task_id, _) in enumerate(segment.docs):
+            latest[task_id] = (segment_index, doc_index)
+
+    docs = []
+    remap: List[Dict[int, int]] = [{} for _ in segments]
+    for task_id, (segment_index, doc_index) in latest.items():
+        segment = segments[segment_index]
+        remap[segment_index][doc_index] = len(docs)
+        docs.append((task_id, segment.docs[doc_index][1], segment.doc_lengths[doc_index]))
+
+    postings: Dict[bytes, List[Tuple[int, int]]] = {}
+    for segment_index, segment in enumerate(segments):
+        doc_map = remap[segment_index]
+        for term, entries in segment.items():
+            kept = [(doc_map[doc], frequency) for doc, frequency in entries if doc in doc_map]
+            if kept:
+                postings.setdefault(term, []).extend(kept)
+    for entries in postings.values():
+        entries.sort()
+    return build_segment(docs, postings)
+
+
+def index_task(task_id: str, title: str, summary_text: str, transcript_text: str, storage_client, ydb_client) -> None:
+    """Add a completed task to the search index, then merge segments if a level is full."""
+    data = task_segment(task_id, title, summary_text, transcript_text)
+    segment = new_segment_name()
+    storage_client.upload_bytes(data, segment_key(segment))
+    ydb_client.add_search_segment(segment, 0, 1, len(data))
+    logger.info(f"Task {task_id} indexed for search in segment {segment} ({len(data)} bytes)")
+    compact(storage_client, ydb_client)
+
+
+def compact(storage_client, ydb_client) -> None:
+    """Merge the oldest SEARCH_MERGE_FACTOR segments of each full level into one of the next level."""
+    while True:
+        levels: Dict[int, List[Dict]] = {}
+        for row in ydb_client.list_search_segments():
+            levels.setdefault(row["level"], []).append(row)
+        full = [level for level, rows in sorted(levels.items()) if len(rows) >= SEARCH_MERGE_FACTOR]
+        if not full:
+            return
+
+        level = full[0]
+        merged_rows = levels[level][:SEARCH_MERGE_FACTOR]
+        merged_names = [row["segment"] for row in merged_rows]
+        data = merge_segments([Segment(storage_client.download_bytes(segment_key(name))) for name in merged_names])
+        segment = new_segment_name()
+        storage_client.upload_bytes(data, segment_key(segment))
+        docs = Segment(data).doc_lengths
+
+        if not ydb_client.replace_search_segments(merged_names, segment, level + 1, len(docs), len(data)):
+            # Another worker merged some of them first; its segment has the same documents
+            storage_client.delete(segment_key(segment))
+            logger.info(f"Search segments of level {level} were merged concurrently, dropped {segment}")
+            return
+        logger.info(f"Merged {len(merged_names)} search segments of level {level} into {segment} ({len(data)} bytes)")
+        for name in merged_names:
+            try:
+                storage_client.delete(segment_key(name))
+            except Exception as e:
+                logger.warning(f"Could not delete merged search segment {name}: {str(e)}")
@@ -0,0 +1,197 @@
+"""
+Text normalization and segment reader shared by the search index writer
+(worker/search_index.py) and the search function (python_functions/search_tasks).
+
+A query only finds what the index holds if both sides turn words into terms
+the same way, so this file is the single copy: the worker image gets it with
+the rest of worker/, and terraform packs it into the search_tasks function
+archive next to index.py. It must stay standard-library only.
+
+Words are lowercased, "ё" is folded into "е", stop words are dropped and the
+rest are stemmed with a compact version of the Snowball Russian stemmer.
+"""
+import re
+import sys
+import json
+import struct
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+MAGIC = b"LNSX"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIII")
+SEGMENT_PREFIX = "search/segments/"
+
+_WORD_RE = re.compile(r"\w+")
+_VOWELS = "аеиоуыэюя"
+
+STOP_WORDS = frozenset("""
+    а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да даже для до его
+    ее ей если есть еще же за здесь и из или им их к как какой когда кто ли либо мы на над надо нам нас не
+    него нее нет ни них но ну о об однако он она они оно от очень по под после при про с со так также такой
+    там те тем то того тоже той только том ты у уже чем что чтобы эта эти это этого этой этом этот я
+    a an and are as at be by for from in is it of on or that the this to with
+""".split())
+
+_PERFECTIVE_GERUND = (("вшись", "вши", "в"), ("ывшись", "ившись", "ывши", "ивши", "ыв", "ив"))
+_REFLEXIVE = ("ся", "сь")
+_ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой",
+    "ем", "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+_PARTICIPLE = (("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+_VERB = (
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"),
+    ("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым", "ен",
+     "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"),
+)
+_NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой",
+    "ий", "ям", "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья", "а", "е", "и", "й", "о", "у",
+    "ы", "ь", "ю", "я",
+)
+_SUPERLATIVE = ("ейше", "ейш")
+_DERIVATIONAL = ("ость", "ост")
+
+
+def _strip_ending(word: str, endings: Tuple[str, ...], after_a: bool = False) -> Optional[str]:
+    """word without its longest ending from endings (that follows "а"/"я" if after_a), or None."""
+    for ending in sorted(endings, key=len, reverse=True):
+        if word.endswith(ending):
+            stem = word[:-len(ending)]
+            if not after_a or stem.endswith(("а", "я")):
+                return stem
+    return None
+
+
+def _region_after_consonant(word: str, start: int) -> int:
+    # Start of R1 (or R2): after the first consonant that follows a vowel
+    for i in range(start + 1, len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            return i + 1
+    return len(word)
+
+
+def stem(word: str) -> str:
+    """Stem a lowercase Russian word; other words are returned unchanged."""
+    rv_start = next((i + 1 for i, char in enumerate(word) if char in _VOWELS), None)
+    if rv_start is None:
+        return word
+    prefix, rv = word[:rv_start], word[rv_start:]
+    r2_start = max(0, _region_after_consonant(word, _region_after_consonant(word, 0)) - rv_start)
+
+    result = _strip_ending(rv, _PERFECTIVE_GERUND[0], after_a=True)
+    if result is None:
+        result = _strip_ending(rv, _PERFECTIVE_GERUND[1])
+    if result is None:
+        reflexive = _strip_ending(rv, _REFLEXIVE)
+        if reflexive is not None:
+            rv = reflexive
+        result = _strip_ending(rv, _ADJECTIVE)
+        if result is not None:
+            participle = _strip_ending(result, _PARTICIPLE[0], after_a=True)
+            if participle is None:
+                participle = _strip_ending(result, _PARTICIPLE[1])
+            if participle is not None:
+                result = participle
+        if result is None:
+            result = _strip_ending(rv, _VERB[0], after_a=True)
+        if result is None:
+            result = _strip_ending(rv, _VERB[1])
+        if result is None:
+            result = _strip_ending(rv, _NOUN)
+    if result is not None:
+        rv = result
+
+    if rv.endswith("и"):
+        rv = rv[:-1]
+    derivational = _strip_ending(rv, _DERIVATIONAL)
+    if derivational is not None and len(derivational) >= r2_start:
+        rv = derivational
+
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        superlative = _strip_ending(rv, _SUPERLATIVE)
+        if superlative is not None:
+            rv = superlative[:-1] if superlative.endswith("нн") else superlative
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized terms of text, in order."""
+    terms = []
+    for word in _WORD_RE.findall(text.lower().replace("ё", "е")):
+        if word in STOP_WORDS or (len(word) < 2 and not word.isdigit()):
+            continue
+        terms.append(stem(word))
+    return terms
+
+
+def uint32_array(values=()) -> array:
+    result = array("I", values)
+    if result.itemsize != 4:
+        result = array("L", values)
+    return result
+
+
+def _uint32_column(buffer, start: int, count: int):
+    """count uint32 values at start of buffer: a zero-copy view where the host allows it."""
+    view = memoryview(buffer)[start:start + count * 4]
+    if sys.byteorder == "little" and array("I").itemsize == 4:
+        return view.cast("I")
+    column = uint32_array()
+    column.frombytes(view)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+class Segment:
+    """Read-only view of a segment (layout in search_index.py) held in bytes or a memory-mapped file."""
+
+    def __init__(self, buffer):
+        magic, version, _, doc_count, term_count, posting_count, terms_length, docs_length = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a search segment (magic {magic!r}, version {version})")
+        position = HEADER.size
+        self.doc_lengths = _uint32_column(buffer, position, doc_count)
+        position += doc_count * 4
+        self.term_offsets = _uint32_column(buffer, position, term_count + 1)
+        position += (term_count + 1) * 4
+        self.posting_offsets = _uint32_column(buffer, position, term_count + 1)
+        position += (term_count + 1) * 4
+        self.entries = _uint32_column(buffer, position, posting_count * 2)
+        position += posting_count * 8
+        self.terms = memoryview(buffer)[position:position + terms_length]
+        position += terms_length
+        self.docs = json.loads(bytes(memoryview(buffer)[position:position + docs_length]))
+        self.term_count = term_count
+        self.total_length = sum(self.doc_lengths)
+
+    def term(self, index: int) -> bytes:
+        return bytes(self.terms[self.term_offsets[index]:self.term_offsets[index + 1]])
+
+    def find(self, term: str) -> int:
+        """Index of term, or -1."""
+        key = term.encode("utf-8")
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.term(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self.term_count and self.term(low) == key else -1
+
+    def postings(self, index: int) -> Iterator[Tuple[int, int]]:
+        """(document, frequency) pairs of the term at index."""
+        entries = self.entries
+        for i in range(self.posting_offsets[index], self.posting_offsets[index + 1]):
+            yield entries[2 * i], entries[2 * i + 1]
+
+    def items(self) -> Iterator[Tuple[bytes, Iterator[Tuple[int, int]]]]:
+        for index in range(self.term_count):
+            yield self.term(index), self.postings(index)
@@ -0,0 +1,112 @@
+"""
+Per-stage timing and resource accounting for the worker pipeline.
+
+Each stage records wall time, CPU time (the processing thread plus child
+processes such as ffmpeg), bytes read and written, and the peak RSS of the
+worker and of its children at the end of the stage. CPU time of children
+and peak RSS come from getrusage and are process-wide, so with several
+tasks running in one container they may include the other tasks' work.
+"""
+import json
+import logging
+import resource
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from metrics import STAGE_DURATION
+from structured_logging import bind, unbind
+
+logger = logging.getLogger(__name__)
+
+
+class StageMeasurement:
+    """Mutable record of one stage; the pipeline adds byte counts while it runs."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.status = "ok"
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.peak_rss_kb = 0
+        self.children_peak_rss_kb = 0
+
+    def add_bytes_in(self, count: int) -> None:
+        self.bytes_in += count
+
+    def add_bytes_out(self, count: int) -> None:
+        self.bytes_out += count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "started_at": self.started_at,
+            "status": self.status,
+            "wall_ms": round(self.wall_ms, 3),
+            "cpu_ms": round(self.cpu_ms, 3),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "peak_rss_kb": self.peak_rss_kb,
+            "children_peak_rss_kb": self.children_peak_rss_kb,
+        }
+
+
+class StageTimer:
+    """
+    Collects stage measurements for one task, notifying an optional profiler
+    at stage bounds and an optional on_stage(task_id, stage) callback when a
+    stage starts.
+    """
+
+    def __init__(self, task_id: str, profiler: Optional[Any] = None,
+                 on_stage: Optional[Callable[[str, str], None]] = None):
+        self.task_id = task_id
+        self.profiler = profiler
+        self.on_stage = on_stage
+        self.stages: List[StageMeasurement] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMeasurement]:
+        measurement = StageMeasurement(name)
+        self.stages.append(measurement)
+        if self.profiler is not None:
+            self.profiler.stage_started(name)
+        if self.on_stage is not None:
+            self.on_stage(self.task_id, name)
+
+        log_context = bind(stage=name)
+        wall_start = time.perf_counter()
+        thread_cpu_start = time.thread_time()
+        children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+        try:
+            yield measurement
+        except BaseException:
+            measurement.status = "error"
+            raise
+        finally:
+            children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+            children_cpu = (children_end.ru_utime + children_end.ru_stime) - (children_start.ru_utime + children_start.ru_stime)
+            measurement.wall_ms = (time.perf_counter() - wall_start) * 1000
+            measurement.cpu_ms = (time.thread_time() - thread_cpu_start + children_cpu) * 1000
+            measurement.peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            measurement.children_peak_rss_kb = children_end.ru_maxrss
+            STAGE_DURATION.observe(measurement.wall_ms / 1000, stage=name, status=measurement.status)
+            if self.profiler is not None:
+                self.profiler.stage_finished(name)
+            logger.info(
+                "Stage %s for task %s: %s, wall %.0f ms, cpu %.0f ms, in %d B, out %d B",
+                name, self.task_id, measurement.status, measurement.wall_ms, measurement.cpu_ms,
+                measurement.bytes_in, measurement.bytes_out,
+                extra={"fields": {"event": "stage", **measurement.to_dict()}},
+            )
+            unbind(log_context)
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        return [dict(measurement.to_dict(), task_id=self.task_id) for measurement in self.stages]
+
+    def to_json(self) -> str:
+        return json.dumps([measurement.to_dict() for measurement in self.stages], separators=(",", ":"))
@@ -1,6 +1,25 @@
 import os
+import re
+import unicodedata
 import boto3
-from typing import BinaryIO
+from botocore.exceptions import ClientError
+from typing import BinaryIO, Optional
+from urllib.parse import quote
+
+
+def _ascii_filename(filename: str) -> str:
+    # Accents are dropped, anything else that is not plain ASCII (Cyrillic, quotes, ";", controls) removed
+    def clean(part: str) -> str:
+        ascii_part = unicodedata.normalize("NFKD", part).encode("ascii", "ignore").decode("ascii")
+        return re.sub(r"[^A-Za-z0-9 ._()-]+", "", ascii_part).strip()
+    
+    name, extension = os.path.splitext(filename)
+    return (clean(name) or "download") + clean(extension)
+
+
+def content_disposition(filename: str) -> str:
+    """Attachment header with an ASCII fallback name and the full name as RFC 5987 filename*."""
+    return f"attachment; filename=\"{_ascii_filename(filename)}\"; filename*=UTF-8''{quote(filename, safe='')}"
 
 
 class StorageClient:
@@ -27,3 +46,31 @@ class StorageClient:
     
     def upload_fileobj(self, file_obj: BinaryIO, s3_key: str) -> None:
         self.s3_client.upload_fileobj(file_obj, self.bucket, s3_key)
+    
+    def upload_bytes(self, data: bytes, s3_key: str, content_type: str = "application/octet-stream") -> None:
+        self.s3_client.put_object(Bucket=self.bucket, Key=s3_key, Body=data, ContentType=content_type)
+    
+    def download_bytes(self, s3_key: str) -> bytes:
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=s3_key)
+        return response["Body"].read()
+    
+    def delete(self, s3_key: str) -> None:
+        self.s3_client.delete_object(Bucket=self.bucket, Key=s3_key)
+    
+    def exists(self, s3_key: str) -> bool:
+        try:
+            self.s3_client.head_object(Bucket=self.bucket, Key=s3_key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+    
+    def size(self, s3_key: str) -> int:
+        return self.s3_client.head_object(Bucket=self.bucket, Key=s3_key)["ContentLength"]
+    
+    def generate_download_url(self, s3_key: str, filename: Optional[str] = None, expires_in: int = 3600) -> str:
+        params = {"Bucket": self.bucket, "Key": s3_key}
+        if filename:
+            params["ResponseContentDisposition"] = content_disposition(filename)
+        return self.s3_client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
@@ -0,0 +1,204 @@
+"""
+Structured, non-blocking logging for the worker.
+
+Processing threads and the event loop only put log records on a queue
+(QueueHandler); a single QueueListener thread formats them and writes to
+stdout. Messages use %-style arguments and are rendered by the listener, so
+a record costs the caller no formatting and no I/O. Arguments should be
+immutable values; wrap anything expensive in Lazy, which is evaluated only if
+the record is written at all. If the queue is full, records are dropped
+(counted in `worker_log_records_dropped_total`) rather than blocking the
+task.
+
+Records carry the fields bound with `bind` for the current context: task_id,
+lane and attempt for the whole task, stage while a StageTimer stage runs.
+They live in a ContextVar, so they follow asyncio tasks and
+`asyncio.to_thread`; code submitting work to an executor itself copies the
+context. `extra={"fields": {...}}` adds per-record fields.
+
+With LOG_FORMAT=json (default) each line is one JSON object, ready for stage
+analytics; LOG_FORMAT=text keeps the previous human-readable lines. DEBUG
+records are sampled: of each logging call site, only every
+LOG_DEBUG_SAMPLE_EVERY-th is written, with `sample_rate` set so counts can be
+scaled back.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import itertools
+import contextvars
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, Optional
+from metrics import LOG_RECORDS_DROPPED
+
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_DEBUG_SAMPLE_EVERY = int(os.environ.get("LOG_DEBUG_SAMPLE_EVERY", "100"))
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Never mutated: bind replaces the whole mapping
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context", default={})
+_listener: Optional[QueueListener] = None
+
+
+def bind(**fields: Any) -> contextvars.Token:
+    """Add fields to every record logged in the current context until unbind."""
+    return _context.set({**_context.get(), **fields})
+
+
+def unbind(token: contextvars.Token) -> None:
+    _context.reset(token)
+
+
+def current_context() -> Dict[str, Any]:
+    return _context.get()
+
+
+class Lazy:
+    """Log argument or field computed only when the record is written."""
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn: Callable[..., Any], *args: Any):
+        self.fn = fn
+        self.args = args
+
+    def value(self) -> Any:
+        return self.fn(*self.args)
+
+    def __str__(self) -> str:
+        return str(self.value())
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps the first and then every n-th DEBUG record logged at each call site."""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self.counters: Dict[tuple, Any] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        # Keyed by call site, not message: f-string messages would grow the dict without bound
+        counter = self.counters.setdefault((record.pathname, record.lineno), itertools.count())
+        if next(counter) % self.every:
+            return False
+        record.sample_rate = self.every
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """Puts records on the queue unformatted, stamped with the caller's context."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is left to the listener; the record never leaves the process
+        record.context = _context.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room: the sentinel must not be dropped like a record
+        self.queue.put(self._sentinel)
+
+
+def _fields(record: logging.LogRecord) -> Dict[str, Any]:
+    fields = dict(getattr(record, "context", {}))
+    for name, value in (getattr(record, "fields", None) or {}).items():
+        fields[name] = value.value() if isinstance(value, Lazy) else value
+    sample_rate = getattr(record, "sample_rate", None)
+    if sample_rate:
+        fields["sample_rate"] = sample_rate
+    return fields
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The previous line format followed by the context fields; per-record fields are JSON-only."""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "context", {})
+        if fields:
+            line += " [" + " ".join(f"{name}={value}" for name, value in fields.items()) + "]"
+        return line
+
+
+def setup_logging() -> None:
+    """Route all logging of the process through the queue; safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = ContextQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(LOG_DEBUG_SAMPLE_EVERY))
+
+    root = logging.getLogger()
+    for old_handler in list(root.handlers):
+        root.removeHandler(old_handler)
+        old_handler.close()
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = _Listener(log_queue, stream)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def flush_logs(timeout: float = 1.0) -> None:
+    """
+    Wait up to timeout for queued records to be written.
+
+    Called at the end of a trigger request: a serverless container may be
+    frozen once it has answered, which would hold back the task's last lines.
+    """
+    if _listener is None:
+        return
+    deadline = time.monotonic() + timeout
+    while not _listener.queue.empty() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def stop_logging() -> None:
+    """Write everything still queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,29 +1,276 @@
+"""
+Lecture summaries with YandexGPT.
+
+The transcript size decides the model: up to GPT_LITE_MAX_INPUT_TOKENS it
+goes to `yandexgpt-lite`, which answers several times faster, longer
+lectures go to `yandexgpt`. The output is capped in proportion to the
+input (SUMMARY_OUTPUT_RATIO, within SUMMARY_MIN/MAX_OUTPUT_TOKENS) through
+`max_tokens` and a length hint in the prompt.
+
+A transcript that does not fit in the context window next to its answer is
+summarized map-reduce style instead of being cut: it is split at sentence
+or word boundaries into parts that fit, each part is summarized on its own
+(concurrently in the async runtime), and the part summaries are merged
+into the final one. If the part summaries together do not fit either,
+they are merged in groups first, until one merge request covers them all.
+
+Token counts are estimated from the text length; YandexGPT reports the
+real usage, which is returned with the summary (summed over all requests
+for a long transcript).
+"""
 import os
-from yandex_cloud_ml_sdk import YCloudML
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, NamedTuple
+from metrics import GPT_LATENCY, GPT_TOKENS
+import rate_limiter
+import resilience
+
+logger = logging.getLogger(__name__)
+
+FULL_MODEL = "yandexgpt"
+LITE_MODEL = "yandexgpt-lite"
+GPT_LITE_MAX_INPUT_TOKENS = int(os.environ.get("GPT_LITE_MAX_INPUT_TOKENS", "6000"))
+SUMMARY_OUTPUT_RATIO = float(os.environ.get("SUMMARY_OUTPUT_RATIO", "0.2"))
+SUMMARY_MIN_OUTPUT_TOKENS = int(os.environ.get("SUMMARY_MIN_OUTPUT_TOKENS", "500"))
+SUMMARY_MAX_OUTPUT_TOKENS = int(os.environ.get("SUMMARY_MAX_OUTPUT_TOKENS", "4000"))
+CONTEXT_WINDOW_TOKENS = 32000
+# Russian text averages about 4 characters per YandexGPT token
+CHARS_PER_TOKEN = 4
+WORDS_PER_TOKEN = 0.5
+
+PROMPT_TEMPLATE = """Создай структурированный конспект лекции на основе следующей транскрипции:
+
+{transcript}
+
+Конспект должен содержать:
+- Основные темы и разделы
+- Ключевые концепции и определения
+- Важные выводы
+
+Оформи конспект в ясной, организованной форме, подходящей для учебных заметок. Объем конспекта - не более {words} слов. Ответ должен быть на русском языке."""
+
+PART_PROMPT_TEMPLATE = """Ниже часть {part} из {parts} транскрипции длинной лекции:
+
+{transcript}
+
+Составь подробный конспект этой части: темы и разделы, ключевые концепции и определения, важные выводы. Не пиши вступление и заключение ко всей лекции. Объем - не более {words} слов. Ответ должен быть на русском языке."""
+
+MERGE_PROMPT_TEMPLATE = """Ниже конспекты последовательных частей одной лекции:
+
+{summaries}
+
+Объедини их в один структурированный конспект лекции. Сохрани все темы в исходном порядке, убери повторы, не добавляй того, чего нет в конспектах частей. Конспект должен содержать основные темы и разделы, ключевые концепции и определения, важные выводы. Объем конспекта - не более {words} слов. Ответ должен быть на русском языке."""
+
+
+class SummaryRequest(NamedTuple):
+    model: str
+    max_tokens: int
+    prompt: str
+
+
+class SummaryResult(NamedTuple):
+    text: str
+    model: str
+    input_tokens: int
+    output_tokens: int
+    latency_ms: float
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def choose_model(input_tokens: int) -> str:
+    return LITE_MODEL if input_tokens <= GPT_LITE_MAX_INPUT_TOKENS else FULL_MODEL
+
+
+def output_budget(input_tokens: int) -> int:
+    return int(min(SUMMARY_MAX_OUTPUT_TOKENS, max(SUMMARY_MIN_OUTPUT_TOKENS, input_tokens * SUMMARY_OUTPUT_RATIO)))
+
+
+def max_input_chars(template: str, max_output_tokens: int) -> int:
+    """Longest text that fits in the context window next to the template and the answer."""
+    return (CONTEXT_WINDOW_TOKENS - max_output_tokens - estimate_tokens(template)) * CHARS_PER_TOKEN
+
 
+def _request(template: str, text: str, max_output_tokens: int, **fields) -> SummaryRequest:
+    words = int(max_output_tokens * WORDS_PER_TOKEN)
+    prompt = template.format(words=words, **fields)
+    return SummaryRequest(choose_model(estimate_tokens(text)), max_output_tokens, prompt)
 
-def generate_summary(transcribed_text: str, folder_id: str) -> str:
+
+def split_transcript(text: str, max_chars: int) -> List[str]:
+    """Split text into parts of at most max_chars, of similar size, at sentence or word boundaries."""
+    parts, start = [], 0
+    while start < len(text):
+        remaining = len(text) - start
+        # Spread what is left evenly over the parts it still needs
+        target = -(-remaining // -(-remaining // max_chars))
+        end = min(len(text), start + target)
+        if end < len(text):
+            # Cut after the last sentence, else the last word, in the second half of the part
+            sentence = text.rfind(". ", start + target // 2, end)
+            space = text.rfind(" ", start + target // 2, end)
+            if sentence >= 0:
+                end = sentence + 1
+            elif space >= 0:
+                end = space
+        part = text[start:end].strip()
+        if part:
+            parts.append(part)
+        start = end
+    return parts
+
+
+def first_requests(transcribed_text: str) -> List[SummaryRequest]:
+    """One request for a transcript that fits the context window, else one per part."""
+    max_output_tokens = output_budget(estimate_tokens(transcribed_text))
+    if len(transcribed_text) <= max_input_chars(PROMPT_TEMPLATE, max_output_tokens):
+        return [_request(PROMPT_TEMPLATE, transcribed_text, max_output_tokens, transcript=transcribed_text)]
+    
+    # Sized for the largest answer a part can get
+    parts = split_transcript(transcribed_text, max_input_chars(PART_PROMPT_TEMPLATE, SUMMARY_MAX_OUTPUT_TOKENS))
+    logger.info(f"Transcript of {len(transcribed_text)} characters does not fit the context window, summarizing {len(parts)} parts")
+    return [
+        _request(PART_PROMPT_TEMPLATE, part, output_budget(estimate_tokens(part)), part=number, parts=len(parts), transcript=part)
+        for number, part in enumerate(parts, start=1)
+    ]
+
+
+def _join_summaries(summaries: List[str]) -> str:
+    return "\n\n".join(summaries)
+
+
+def merge_requests(summaries: List[str], transcript_tokens: int) -> List[SummaryRequest]:
+    """
+    Requests merging consecutive part summaries.
+    
+    A single request, with the answer budget of the whole transcript, when
+    all summaries fit the context window; otherwise one per group of
+    summaries that fits, and the results are merged again.
+    """
+    max_output_tokens = output_budget(transcript_tokens)
+    joined = _join_summaries(summaries)
+    if len(joined) <= max_input_chars(MERGE_PROMPT_TEMPLATE, max_output_tokens):
+        return [_request(MERGE_PROMPT_TEMPLATE, joined, max_output_tokens, summaries=joined)]
+    
+    max_chars = max_input_chars(MERGE_PROMPT_TEMPLATE, SUMMARY_MAX_OUTPUT_TOKENS)
+    groups: List[List[str]] = [[]]
+    for summary in summaries:
+        if groups[-1] and len(_join_summaries(groups[-1] + [summary])) > max_chars:
+            groups.append([])
+        groups[-1].append(summary)
+    requests = []
+    for group in groups:
+        text = _join_summaries(group)
+        requests.append(_request(MERGE_PROMPT_TEMPLATE, text, output_budget(estimate_tokens(text)), summaries=text))
+    logger.info(f"Part summaries do not fit the context window, merging them in {len(groups)} groups first")
+    return requests
+
+
+def _api_key() -> str:
     api_key = os.environ.get("YANDEX_API_KEY")
     if not api_key:
         raise Exception("YANDEX_API_KEY environment variable must be set")
+    return api_key
+
+
+def summarize(transcribed_text: str, run: Callable[[SummaryRequest], SummaryResult]) -> SummaryResult:
+    """Summary of a transcript, sending each request through run."""
+    started = time.perf_counter()
+    calls = [run(request) for request in first_requests(transcribed_text)]
+    results = calls
+    while len(results) > 1:
+        results = [run(request) for request in merge_requests([result.text for result in results], estimate_tokens(transcribed_text))]
+        calls = calls + results
+    return _total(results[0], calls, started)
+
+
+async def summarize_async(transcribed_text: str, run: Callable[[SummaryRequest], Awaitable[SummaryResult]]) -> SummaryResult:
+    """summarize for the async runtime: the requests of one round run concurrently."""
+    started = time.perf_counter()
+    calls = list(await asyncio.gather(*(run(request) for request in first_requests(transcribed_text))))
+    results = calls
+    while len(results) > 1:
+        requests = merge_requests([result.text for result in results], estimate_tokens(transcribed_text))
+        results = list(await asyncio.gather(*(run(request) for request in requests)))
+        calls = calls + results
+    return _total(results[0], calls, started)
+
+
+def _total(final: SummaryResult, calls: List[SummaryResult], started: float) -> SummaryResult:
+    """The final summary with the usage of every request that produced it."""
+    if len(calls) == 1:
+        return final
+    return SummaryResult(
+        final.text,
+        final.model,
+        sum(call.input_tokens for call in calls),
+        sum(call.output_tokens for call in calls),
+        (time.perf_counter() - started) * 1000
+    )
+
+
+def generate_summary(transcribed_text: str, folder_id: str) -> SummaryResult:
+    api_key = _api_key()
+    
+    # Imported here: the SDK pulls in grpc and protobuf, which only this stage needs
+    from yandex_cloud_ml_sdk import YCloudML
     
     sdk = YCloudML(folder_id=folder_id, auth=api_key)
-    model = sdk.models.completions("yandexgpt")
     
-    prompt = f"""Создай структурированный конспект лекции на основе следующей транскрипции:
+    def run(request: SummaryRequest) -> SummaryResult:
+        logger.info(f"Summarizing ~{estimate_tokens(request.prompt)} tokens with {request.model}, answer limit {request.max_tokens} tokens")
+        model = sdk.models.completions(request.model).configure(temperature=0.6, max_tokens=request.max_tokens)
+        
+        def complete():
+            # A token per attempt: retries after 429 must respect the shared quota too
+            rate_limiter.acquire("gpt", folder_id)
+            return model.run(request.prompt)
+        
+        started = time.perf_counter()
+        result = resilience.call("gpt", complete)
+        return _summary_result(result, request, (time.perf_counter() - started) * 1000)
+    
+    return summarize(transcribed_text, run)
 
-{transcribed_text}
 
-Конспект должен содержать:
-- Основные темы и разделы
-- Ключевые концепции и определения
-- Важные выводы
+async def generate_summary_async(transcribed_text: str, folder_id: str, ydb_client) -> SummaryResult:
+    """generate_summary through the SDK's asyncio client, for the async runtime."""
+    api_key = _api_key()
+    
+    from yandex_cloud_ml_sdk import AsyncYCloudML
+    
+    sdk = AsyncYCloudML(folder_id=folder_id, auth=api_key)
+    
+    async def run(request: SummaryRequest) -> SummaryResult:
+        logger.info(f"Summarizing ~{estimate_tokens(request.prompt)} tokens with {request.model}, answer limit {request.max_tokens} tokens")
+        model = sdk.models.completions(request.model).configure(temperature=0.6, max_tokens=request.max_tokens)
+        
+        async def complete():
+            await rate_limiter.acquire_async("gpt", folder_id, ydb_client)
+            return await model.run(request.prompt)
+        
+        started = time.perf_counter()
+        result = await resilience.call_async("gpt", complete)
+        return _summary_result(result, request, (time.perf_counter() - started) * 1000)
+    
+    return await summarize_async(transcribed_text, run)
+
 
-Оформи конспект в ясной, организованной форме, подходящей для учебных заметок. Ответ должен быть на русском языке."""
+def _summary_result(result, request: SummaryRequest, latency_ms: float) -> SummaryResult:
+    GPT_LATENCY.observe(latency_ms / 1000, model=request.model)
     
-    result = model.configure(temperature=0.6).run(prompt)
+    input_tokens, output_tokens = estimate_tokens(request.prompt), 0
+    usage = getattr(result, "usage", None)
+    if usage is not None:
+        input_tokens, output_tokens = usage.input_text_tokens, usage.completion_tokens
+        GPT_TOKENS.inc(input_tokens, model=request.model, kind="input")
+        GPT_TOKENS.inc(output_tokens, model=request.model, kind="completion")
     
     for alternative in result:
-        return alternative.text
+        return SummaryResult(alternative.text, request.model, input_tokens, output_tokens, latency_ms)
     
     raise Exception("No summary generated")
@@ -0,0 +1,191 @@
+"""
+Timestamped transcripts.
+
+SpeechKit returns chunks of recognized speech with per-word start and end
+times; the pipeline used to keep only the joined text. TimedTranscript keeps
+the timings in a compact columnar artifact, `transcripts/{task_id}/transcript.bin`:
+
+    header    magic "LNTR", version, chunk/word counts, text length
+    chunks    byte offsets into the text (count + 1), start ms, end ms
+    words     byte offset into the text, start ms, end ms
+    text      UTF-8 chunk texts joined by spaces (the transcript summarized)
+
+All arrays are little-endian uint32, so loading is a few `array.frombytes`
+calls and a time range is found with two binary searches. Times are in the
+original recording: when silence was trimmed, the OffsetMap is applied
+before saving. A range of the text can then be summarized again without
+running SpeechKit.
+"""
+import os
+import re
+import sys
+import bisect
+import struct
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+TRANSCRIPT_SECTION_SECONDS = int(os.environ.get("TRANSCRIPT_SECTION_SECONDS", "600"))
+
+MAGIC = b"LNTR"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIII")
+
+
+def transcript_key(task_id: str) -> str:
+    return f"transcripts/{task_id}/transcript.bin"
+
+
+def _uint32_array(values=()) -> array:
+    result = array("I", values)
+    if result.itemsize != 4:
+        result = array("L", values)
+    return result
+
+
+def _seconds_to_ms(value: str) -> int:
+    # SpeechKit durations look like "1.159999992s"
+    return max(0, round(float(str(value).rstrip("s") or 0) * 1000))
+
+
+def _find_word(text: str, word: str, start: int) -> Optional[Tuple[int, int]]:
+    """Position and length of the first whole-word occurrence of word in text at or after start."""
+    if not word:
+        return None
+    match = re.compile(r"(?<!\w)" + re.escape(word) + r"(?!\w)", re.IGNORECASE).search(text, start)
+    return (match.start(), match.end() - match.start()) if match else None
+
+
+class TimedTranscript:
+    """Transcript text with chunk and word timings, stored column by column."""
+
+    def __init__(self, text: bytes, chunk_offsets: array, chunk_start_ms: array, chunk_end_ms: array,
+                 word_offsets: array, word_start_ms: array, word_end_ms: array):
+        self.text_bytes = text
+        self.chunk_offsets = chunk_offsets
+        self.chunk_start_ms = chunk_start_ms
+        self.chunk_end_ms = chunk_end_ms
+        self.word_offsets = word_offsets
+        self.word_start_ms = word_start_ms
+        self.word_end_ms = word_end_ms
+
+    @property
+    def text(self) -> str:
+        return self.text_bytes.decode("utf-8")
+
+    @property
+    def duration(self) -> float:
+        ends = self.word_end_ms or self.chunk_end_ms
+        return ends[-1] / 1000 if ends else 0.0
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict[str, Any]], offset_map=None) -> "TimedTranscript":
+        """Build from SpeechKit `response.chunks`; offset_map converts trimmed-audio times to original ones."""
+        def to_ms(value: str) -> int:
+            ms = _seconds_to_ms(value)
+            return round(offset_map.to_original(ms / 1000) * 1000) if offset_map is not None else ms
+
+        parts: List[bytes] = []
+        position = 0
+        chunk_offsets, chunk_start_ms, chunk_end_ms = _uint32_array(), _uint32_array(), _uint32_array()
+        word_offsets, word_start_ms, word_end_ms = _uint32_array(), _uint32_array(), _uint32_array()
+        last_end = 0
+        for chunk in chunks:
+            alternatives = chunk.get("alternatives", [])
+            if not alternatives:
+                continue
+            alternative = alternatives[0]
+            text = alternative.get("text", "")
+            if parts:
+                # Same separator as the plain transcript: " ".join of chunk texts
+                parts.append(b" ")
+                position += 1
+            chunk_offsets.append(position)
+
+            # Words appear in the chunk text in order; find each to record its byte offset,
+            # then move past it so the next word is not matched inside this one
+            search_from, byte_at = 0, position
+            chunk_start = None
+            for word in alternative.get("words", []):
+                match = _find_word(text, word.get("word", ""), search_from)
+                if match is not None:
+                    found, length = match
+                    byte_at += len(text[search_from:found].encode("utf-8"))
+                    word_offsets.append(byte_at)
+                    byte_at += len(text[found:found + length].encode("utf-8"))
+                    search_from = found + length
+                else:
+                    word_offsets.append(byte_at)
+                start, end = to_ms(word.get("startTime", "0s")), to_ms(word.get("endTime", "0s"))
+                word_start_ms.append(start)
+                word_end_ms.append(end)
+                last_end = max(last_end, end)
+                if chunk_start is None:
+                    chunk_start = start
+            chunk_start_ms.append(last_end if chunk_start is None else chunk_start)
+            chunk_end_ms.append(last_end)
+
+            encoded = text.encode("utf-8")
+            parts.append(encoded)
+            position += len(encoded)
+        chunk_offsets.append(position)
+        return cls(b"".join(parts), chunk_offsets, chunk_start_ms, chunk_end_ms, word_offsets, word_start_ms, word_end_ms)
+
+    def to_bytes(self) -> bytes:
+        header = HEADER.pack(MAGIC, VERSION, 0, len(self.chunk_start_ms), len(self.word_offsets), len(self.text_bytes))
+        columns = [self.chunk_offsets, self.chunk_start_ms, self.chunk_end_ms,
+                   self.word_offsets, self.word_start_ms, self.word_end_ms]
+        if sys.byteorder == "big":
+            columns = [array(column.typecode, column) for column in columns]
+            for column in columns:
+                column.byteswap()
+        return header + b"".join(column.tobytes() for column in columns) + self.text_bytes
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TimedTranscript":
+        magic, version, _, chunk_count, word_count, text_length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a transcript artifact (magic {magic!r}, version {version})")
+        position = HEADER.size
+        columns = []
+        for count in (chunk_count + 1, chunk_count, chunk_count, word_count, word_count, word_count):
+            column = _uint32_array()
+            column.frombytes(data[position:position + count * 4])
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns.append(column)
+            position += count * 4
+        text = data[position:position + text_length]
+        return cls(text, *columns)
+
+    def slice(self, start_seconds: float, end_seconds: float) -> str:
+        """Text of the words that start within [start_seconds, end_seconds)."""
+        starts, offsets = self.word_start_ms, self.word_offsets
+        if not starts:
+            # No word timings: fall back to whole chunks
+            starts, offsets = self.chunk_start_ms, self.chunk_offsets
+        first = bisect.bisect_left(starts, round(start_seconds * 1000))
+        last = bisect.bisect_left(starts, round(end_seconds * 1000))
+        if first >= last:
+            return ""
+        end = offsets[last] if last < len(offsets) else len(self.text_bytes)
+        return self.text_bytes[offsets[first]:end].decode("utf-8", errors="ignore").strip()
+
+    def section_bounds(self, section: int) -> Tuple[float, float]:
+        """Start and end, seconds, of a TRANSCRIPT_SECTION_SECONDS-long section (numbered from 0)."""
+        start = section * TRANSCRIPT_SECTION_SECONDS
+        if section < 0 or start >= self.duration:
+            raise ValueError(f"Section {section} is outside the recording")
+        return float(start), float(min(start + TRANSCRIPT_SECTION_SECONDS, self.duration))
+
+
+def load_transcript(storage_client, task_id: str) -> Optional[TimedTranscript]:
+    """The task's stored transcript, or None for tasks transcribed before it was kept."""
+    try:
+        data = storage_client.download_bytes(transcript_key(task_id))
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return TimedTranscript.from_bytes(data)
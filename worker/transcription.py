@@ -1,15 +1,54 @@
 import os
 import time
+import asyncio
+import logging
 import requests
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
+from metrics import STT_POLLS
+import rate_limiter
+import resilience
+
+logger = logging.getLogger(__name__)
+
+STT_API_URL = os.environ.get("STT_API_URL", "https://transcribe.api.cloud.yandex.net")
+OPERATION_API_URL = os.environ.get("OPERATION_API_URL", "https://operation.api.cloud.yandex.net")
+POLL_INTERVAL_SECONDS = float(os.environ.get("STT_POLL_INTERVAL", "5"))
+MAX_WAIT_SECONDS = 300
+
+
+def _request(method: str, url: str, **kwargs) -> requests.Response:
+    response = requests.request(method, url, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def _submit(recognition_url: str, data: dict, headers: dict, folder_id: str) -> requests.Response:
+    # A token per attempt: retries after 429 must respect the shared quota too
+    rate_limiter.acquire("stt", folder_id)
+    return _request("POST", recognition_url, json=data, headers=headers, timeout=30)
+
+
+def chunks_text(chunks: List[Dict[str, Any]]) -> str:
+    text_parts = []
+    
+    for chunk in chunks:
+        alternatives = chunk.get("alternatives", [])
+        if alternatives:
+            text_parts.append(alternatives[0].get("text", ""))
+    
+    return " ".join(text_parts)
 
 
 def transcribe_audio(audio_s3_uri: str, folder_id: str) -> str:
+    return chunks_text(recognize_chunks(audio_s3_uri, folder_id))
+
+
+def _recognition_request(audio_s3_uri: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
     api_key = os.environ.get("YANDEX_API_KEY")
     if not api_key:
         raise ValueError("YANDEX_API_KEY environment variable is not set")
     
-    recognition_url = "https://transcribe.api.cloud.yandex.net/speech/stt/v2/longRunningRecognize"
+    recognition_url = f"{STT_API_URL}/speech/stt/v2/longRunningRecognize"
     
     headers = {
         "Authorization": f"Api-Key {api_key}"
@@ -30,34 +69,77 @@ def transcribe_audio(audio_s3_uri: str, folder_id: str) -> str:
         }
     }
     
-    response = requests.post(recognition_url, json=data, headers=headers, timeout=30)
-    response.raise_for_status()
+    return recognition_url, headers, data
+
+
+def _operation_chunks(operation: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """Chunks of a finished operation, None while it is still running."""
+    if not operation.get("done"):
+        return None
+    if "error" in operation:
+        raise Exception(f"Transcription failed: {operation['error']}")
+    return operation.get("response", {}).get("chunks", [])
+
+
+def recognize_chunks(audio_s3_uri: str, folder_id: str) -> List[Dict[str, Any]]:
+    """SpeechKit `response.chunks`: recognized text with per-word start and end times."""
+    recognition_url, headers, data = _recognition_request(audio_s3_uri)
+    
+    response = resilience.call("stt", _submit, recognition_url, data, headers, folder_id)
     
     operation_id = response.json()["id"]
     
-    operation_url = f"https://operation.api.cloud.yandex.net/operations/{operation_id}"
+    operation_url = f"{OPERATION_API_URL}/operations/{operation_id}"
     
-    max_attempts = 60  # 5 minutes with 5 second intervals
-    for _ in range(max_attempts):
-        time.sleep(5)
+    max_attempts = int(MAX_WAIT_SECONDS / POLL_INTERVAL_SECONDS)  # 5 minutes
+    for attempt in range(max_attempts):
+        time.sleep(POLL_INTERVAL_SECONDS)
         
-        response = requests.get(operation_url, headers=headers, timeout=10)
+        STT_POLLS.inc()
+        response = resilience.call("stt", _request, "GET", operation_url, headers=headers, timeout=10)
+        
+        chunks = _operation_chunks(response.json())
+        if chunks is not None:
+            return chunks
+        logger.debug("Operation %s not done after %d polls", operation_id, attempt + 1)
+    
+    raise Exception("Transcription timeout: operation did not complete in time")
+
+
+async def _request_async(session, method: str, url: str, timeout: float, **kwargs) -> Dict[str, Any]:
+    import aiohttp
+    
+    async with session.request(method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs) as response:
         response.raise_for_status()
+        return await response.json()
+
+
+async def recognize_chunks_async(session, audio_s3_uri: str, folder_id: str, ydb_client) -> List[Dict[str, Any]]:
+    """
+    recognize_chunks for the async runtime: requests go through the aiohttp
+    session, and the task waits for the operation without holding a thread.
+    """
+    recognition_url, headers, data = _recognition_request(audio_s3_uri)
+    
+    async def submit():
+        # A token per attempt: retries after 429 must respect the shared quota too
+        await rate_limiter.acquire_async("stt", folder_id, ydb_client)
+        return await _request_async(session, "POST", recognition_url, 30, json=data, headers=headers)
+    
+    operation = await resilience.call_async("stt", submit)
+    operation_id = operation["id"]
+    operation_url = f"{OPERATION_API_URL}/operations/{operation_id}"
+    
+    max_attempts = int(MAX_WAIT_SECONDS / POLL_INTERVAL_SECONDS)  # 5 minutes
+    for attempt in range(max_attempts):
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
         
-        operation = response.json()
+        STT_POLLS.inc()
+        operation = await resilience.call_async("stt", _request_async, session, "GET", operation_url, 10, headers=headers)
         
-        if operation.get("done"):
-            if "error" in operation:
-                raise Exception(f"Transcription failed: {operation['error']}")
-            
-            chunks = operation.get("response", {}).get("chunks", [])
-            text_parts = []
-            
-            for chunk in chunks:
-                alternatives = chunk.get("alternatives", [])
-                if alternatives:
-                    text_parts.append(alternatives[0].get("text", ""))
-            
-            return " ".join(text_parts)
+        chunks = _operation_chunks(operation)
+        if chunks is not None:
+            return chunks
+        logger.debug("Operation %s not done after %d polls", operation_id, attempt + 1)
     
     raise Exception("Transcription timeout: operation did not complete in time")
@@ -0,0 +1,35 @@
+"""Task messages of a Message Queue trigger request, shared by both worker runtimes."""
+import json
+import logging
+from typing import Any, Dict, Iterator, Tuple
+from profiling import profiling_requested
+
+logger = logging.getLogger(__name__)
+
+
+def task_messages(messages) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield (task_id, process_task keyword arguments) for each message.
+    
+    Messages that cannot be parsed or carry no task_id are logged and skipped.
+    """
+    for message in messages:
+        try:
+            message_body = message.get("details", {}).get("message", {}).get("body", "{}")
+            logger.debug("Processing message body: %s", message_body)
+            
+            message_data = json.loads(message_body)
+            task_id = message_data.get("task_id")
+        except Exception as e:
+            logger.error(f"Error processing message: {str(e)}", exc_info=True)
+            continue
+        
+        if not task_id:
+            logger.error("Missing task_id in message")
+            continue
+        
+        yield task_id, {
+            "profile": profiling_requested(message, message_data),
+            "lane": message_data.get("lane"),
+            "releases": message_data.get("releases", 0),
+        }
@@ -0,0 +1,140 @@
+"""
+Silence trimming before transcription.
+
+ffmpeg's `silencedetect` finds pauses in the extracted 16 kHz mono WAV;
+pauses longer than VAD_MIN_SILENCE_SECONDS are cut out (keeping
+VAD_PADDING_SECONDS of each edge so words are not clipped) and the kept
+regions are copied into a new WAV with the `wave` module. The returned
+OffsetMap maps times in the trimmed audio back to the original recording.
+"""
+import os
+import re
+import bisect
+import logging
+import subprocess
+import wave
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+VAD_ENABLED = os.environ.get("VAD_ENABLED", "").lower() in ("1", "true", "yes")
+VAD_NOISE_DB = float(os.environ.get("VAD_NOISE_DB", "-35"))
+VAD_MIN_SILENCE_SECONDS = float(os.environ.get("VAD_MIN_SILENCE_SECONDS", "1.5"))
+VAD_PADDING_SECONDS = 0.25
+COPY_CHUNK_FRAMES = 16000 * 10
+
+SILENCE_START_RE = re.compile(r"silence_start: (-?[\d.]+)")
+SILENCE_END_RE = re.compile(r"silence_end: (-?[\d.]+)")
+
+
+class OffsetMap:
+    """Kept regions as (trimmed start, original start, length) in seconds."""
+
+    def __init__(self, segments: List[Tuple[float, float, float]], original_duration: float):
+        self.segments = segments
+        self.original_duration = original_duration
+        self._trimmed_starts = [segment[0] for segment in segments]
+
+    @property
+    def duration(self) -> float:
+        if not self.segments:
+            return 0.0
+        trimmed_start, _, length = self.segments[-1]
+        return trimmed_start + length
+
+    def to_original(self, trimmed_time: float) -> float:
+        index = max(0, bisect.bisect_right(self._trimmed_starts, trimmed_time) - 1)
+        trimmed_start, original_start, _ = self.segments[index]
+        return original_start + (trimmed_time - trimmed_start)
+
+    def to_dict(self) -> dict:
+        return {
+            "original_duration": self.original_duration,
+            "segments": [list(segment) for segment in self.segments],
+        }
+
+
+def detect_silences(audio_path: str) -> List[Tuple[float, float]]:
+    """Return (start, end) of silences longer than VAD_MIN_SILENCE_SECONDS."""
+    result = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-nostats", "-i", audio_path,
+            "-af", f"silencedetect=noise={VAD_NOISE_DB}dB:d={VAD_MIN_SILENCE_SECONDS}",
+            "-f", "null", "-",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise Exception(f"Silence detection failed: {result.stderr[-500:]}")
+
+    silences = []
+    start = None
+    for line in result.stderr.splitlines():
+        match = SILENCE_START_RE.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = SILENCE_END_RE.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    if start is not None:
+        # Silence runs to the end of the file
+        silences.append((start, float("inf")))
+    return silences
+
+
+def speech_regions(silences: List[Tuple[float, float]], duration: float) -> List[Tuple[float, float]]:
+    regions = []
+    position = 0.0
+    for start, end in silences:
+        cut_start = start + VAD_PADDING_SECONDS
+        cut_end = min(end, duration) - VAD_PADDING_SECONDS
+        if cut_end <= cut_start:
+            continue
+        if cut_start > position:
+            regions.append((position, cut_start))
+        position = cut_end
+    if position < duration:
+        regions.append((position, duration))
+    return regions
+
+
+def trim_silence(audio_path: str) -> OffsetMap:
+    """Rewrite audio_path without long silences; returns the offset map of what was kept."""
+    with wave.open(audio_path, "rb") as source:
+        rate = source.getframerate()
+        total_frames = source.getnframes()
+    duration = total_frames / rate
+
+    regions = speech_regions(detect_silences(audio_path), duration)
+    if regions == [(0.0, duration)] or not regions:
+        return OffsetMap([(0.0, 0.0, duration)], duration)
+
+    trimmed_path = f"{audio_path}.trimmed.wav"
+    segments = []
+    written_frames = 0
+    with wave.open(audio_path, "rb") as source, wave.open(trimmed_path, "wb") as target:
+        target.setparams(source.getparams())
+        for start, end in regions:
+            start_frame = int(start * rate)
+            end_frame = min(total_frames, int(end * rate))
+            segments.append((written_frames / rate, start_frame / rate, (end_frame - start_frame) / rate))
+            source.setpos(start_frame)
+            remaining = end_frame - start_frame
+            while remaining > 0:
+                frames = source.readframes(min(remaining, COPY_CHUNK_FRAMES))
+                if not frames:
+                    break
+                target.writeframes(frames)
+                remaining -= len(frames) // source.getsampwidth() // source.getnchannels()
+            written_frames += end_frame - start_frame
+    os.replace(trimmed_path, audio_path)
+
+    offset_map = OffsetMap(segments, duration)
+    logger.info(
+        f"Silence trimming kept {offset_map.duration:.1f} s of {duration:.1f} s "
+        f"({len(segments)} regions, {100 * (1 - offset_map.duration / duration):.0f}% removed)"
+    )
+    return offset_map
@@ -1,20 +1,65 @@
 import os
+import wave
+import logging
 import requests
 import ffmpeg
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
+logger = logging.getLogger(__name__)
 
-def download_video(video_url: str, output_path: str) -> None:
+# vCPUs of the container, passed by terraform from its `cores`; sched_getaffinity
+# reports the host's CPUs rather than the container's quota, so it is only a capped fallback
+WORKER_CORES = int(os.environ.get("WORKER_CORES", "0")) or min(len(os.sched_getaffinity(0)), 2)
+# Audio extractions (and other ffmpeg work) running at once in one container
+MEDIA_WORKERS = int(os.environ.get("MEDIA_WORKERS", "2"))
+# Long videos are split into time windows extracted by parallel ffmpeg
+# processes (input seeking with -ss/-t), then joined into one WAV; together
+# the extractions running at once use about one process per core
+EXTRACT_SEGMENTS = int(os.environ.get("EXTRACT_SEGMENTS", "0")) or max(1, WORKER_CORES // MEDIA_WORKERS)
+SEGMENTED_EXTRACT_MIN_SECONDS = float(os.environ.get("SEGMENTED_EXTRACT_MIN_SECONDS", "600"))
+AUDIO_SAMPLE_RATE = 16000
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def download_video(video_url: str, output_path: str) -> int:
     response = requests.get(video_url, stream=True, timeout=300)
     response.raise_for_status()
     
+    bytes_written = 0
     with open(output_path, "wb") as f:
         for chunk in response.iter_content(chunk_size=8192):
             if chunk:
                 f.write(chunk)
+                bytes_written += len(chunk)
+    
+    return bytes_written
+
+
+async def download_video_async(session, video_url: str, output_path: str) -> int:
+    """download_video over an aiohttp session; the body is written as it arrives."""
+    import aiohttp
+    
+    bytes_written = 0
+    async with session.get(video_url, timeout=aiohttp.ClientTimeout(total=300)) as response:
+        response.raise_for_status()
+        with open(output_path, "wb") as f:
+            async for chunk in response.content.iter_chunked(COPY_CHUNK_BYTES):
+                f.write(chunk)
+                bytes_written += len(chunk)
+    
+    return bytes_written
 
 
 def extract_audio(video_path: str, audio_path: str) -> None:
+    duration = probe_duration(video_path) if EXTRACT_SEGMENTS > 1 else None
+    if duration is not None and duration >= SEGMENTED_EXTRACT_MIN_SECONDS:
+        extract_audio_segmented(video_path, audio_path, duration, EXTRACT_SEGMENTS)
+    else:
+        extract_audio_single(video_path, audio_path)
+
+
+def extract_audio_single(video_path: str, audio_path: str) -> None:
     try:
         stream = ffmpeg.input(video_path)
         stream = ffmpeg.output(
@@ -32,17 +77,75 @@ def extract_audio(video_path: str, audio_path: str) -> None:
         raise Exception(f"Audio extraction failed: {error_message}")
 
 
-def get_temp_paths(task_id: str) -> Tuple[str, str]:
-    video_path = f"/tmp/{task_id}_video.mp4"
-    audio_path = f"/tmp/{task_id}_audio.wav"
-    return video_path, audio_path
+def probe_duration(video_path: str) -> Optional[float]:
+    """Container duration in seconds, or None if ffprobe cannot tell."""
+    try:
+        duration = ffmpeg.probe(video_path)["format"].get("duration")
+        return float(duration) if duration else None
+    except Exception as e:
+        logger.warning(f"Could not probe video duration, extracting audio in one pass: {str(e)}")
+        return None
 
 
-def cleanup_temp_files(task_id: str) -> None:
-    video_path, audio_path = get_temp_paths(task_id)
-    
-    if os.path.exists(video_path):
-        os.remove(video_path)
-    
-    if os.path.exists(audio_path):
-        os.remove(audio_path)
+def extract_segment(video_path: str, segment_path: str, start: float, length: Optional[float]) -> None:
+    # -ss/-t before -i: ffmpeg seeks in the input instead of decoding up to start
+    input_options = {'ss': f"{start:.3f}"}
+    if length is not None:
+        input_options['t'] = f"{length:.3f}"
+    try:
+        stream = ffmpeg.input(video_path, **input_options)
+        stream = ffmpeg.output(
+            stream,
+            segment_path,
+            format='s16le',
+            acodec='pcm_s16le',
+            ar=str(AUDIO_SAMPLE_RATE),
+            ac='1',
+            vn=None,
+            **{'threads': '1'}
+        )
+        ffmpeg.run(stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode() if e.stderr else str(e)
+        raise Exception(f"Audio extraction failed at {start:.0f} s: {error_message}")
+
+
+def extract_audio_segmented(video_path: str, audio_path: str, duration: float, segments: int) -> None:
+    """Extract `segments` time windows in parallel and join the raw PCM into one WAV."""
+    window = duration / segments
+    segment_paths: List[str] = [f"{audio_path}.part{index}" for index in range(segments)]
+    logger.info(f"Extracting audio in {segments} segments of {window:.0f} s")
+    try:
+        # Threads only wait on the ffmpeg processes, which do the work in parallel
+        with ThreadPoolExecutor(max_workers=segments) as executor:
+            futures = [
+                executor.submit(
+                    extract_segment,
+                    video_path,
+                    segment_path,
+                    index * window,
+                    # The last window runs to the end so rounding cannot drop the tail
+                    window if index < segments - 1 else None,
+                )
+                for index, segment_path in enumerate(segment_paths)
+            ]
+            for future in futures:
+                future.result()
+
+        with wave.open(audio_path, "wb") as target:
+            target.setnchannels(1)
+            target.setsampwidth(2)
+            target.setframerate(AUDIO_SAMPLE_RATE)
+            for segment_path in segment_paths:
+                with open(segment_path, "rb") as segment:
+                    while True:
+                        chunk = segment.read(COPY_CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        target.writeframes(chunk)
+                # Free /tmp as we go: parts and the WAV together are twice the audio size
+                os.remove(segment_path)
+    finally:
+        for segment_path in segment_paths:
+            if os.path.exists(segment_path):
+                os.remove(segment_path)
@@ -0,0 +1,96 @@
+"""
+Pre-warm of a fresh worker container.
+
+The heavy modules are imported by the code that needs them, so the HTTP
+server starts listening right away. With WORKER_PREWARM on (the default), a
+background thread then imports the pipeline, connects the shared YDB
+client, creates an S3 client (loading botocore's service models) and
+builds the PDF renderer (fonts and styles). `/health` answers 503 until
+that is done. A request that arrives earlier waits on the same imports and
+connections instead of starting them over. A failed step is logged, and
+the first request that needs it builds it again.
+"""
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREWARM_ENABLED = os.environ.get("WORKER_PREWARM", "1").lower() in ("1", "true", "yes")
+
+_ready = threading.Event()
+_step_seconds: Dict[str, float] = {}
+
+
+def _import_pipeline() -> None:
+    import processor
+    import scheduler
+    import profiling
+    if os.environ.get("WORKER_RUNTIME") == "async":
+        import async_processor
+
+
+def _connect_ydb() -> None:
+    from ydb_client import get_shared_client
+    get_shared_client()
+
+
+def _create_storage_client() -> None:
+    from storage_client import StorageClient
+    StorageClient()
+
+
+def _build_pdf_renderer() -> None:
+    from pdf_generator import get_renderer
+    get_renderer()
+
+
+STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("imports", _import_pipeline),
+    ("ydb", _connect_ydb),
+    ("storage", _create_storage_client),
+    ("pdf", _build_pdf_renderer),
+]
+
+
+def _run_step(name: str, step: Callable[[], None]) -> None:
+    started = time.perf_counter()
+    try:
+        step()
+    except Exception as e:
+        logger.warning(f"Pre-warm step {name} failed, it will run on first use: {str(e)}")
+    _step_seconds[name] = time.perf_counter() - started
+
+
+def _prewarm() -> None:
+    started = time.perf_counter()
+    # Steps run side by side: YDB discovery waits on the network while the others import
+    threads = [threading.Thread(target=_run_step, args=step, name=f"prewarm-{step[0]}", daemon=True) for step in STEPS]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    _ready.set()
+    steps = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in _step_seconds.items())
+    logger.info(f"Worker pre-warmed in {(time.perf_counter() - started) * 1000:.0f} ms ({steps})")
+
+
+def start() -> None:
+    """Start pre-warming in the background, or mark the worker ready if it is disabled."""
+    if not PREWARM_ENABLED:
+        _ready.set()
+        return
+    threading.Thread(target=_prewarm, name="prewarm", daemon=True).start()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def status() -> Dict[str, object]:
+    return {
+        "status": "healthy" if is_ready() else "warming",
+        "prewarm_ms": {name: round(seconds * 1000) for name, seconds in _step_seconds.items()},
+    }
@@ -0,0 +1,218 @@
+"""
+Per-task workspaces in /tmp with space reservations.
+
+In a serverless container /tmp lives in the container's memory, so a task
+books the space it will need before downloading anything. The estimate
+comes from the video size and duration (stored on the task by create_task
+from the Disk metadata or the upload, or taken from the Disk metadata at
+validation): the video plus two copies of the 16 kHz mono WAV, which is
+the peak of the segmented extraction (parts and joined WAV next to the
+video) and of silence trimming. Without a known duration the WAV is
+assumed to be as large as the video.
+
+Bookings are held against WORKSPACE_LIMIT_BYTES for the whole worker
+process. A task that does not fit waits up to WORKSPACE_WAIT_SECONDS for
+running tasks to finish, then raises WorkspaceUnavailable; being a
+DependencyUnavailable, it sends the task back to the queue with a delay. A
+booking larger than the limit is cut to the limit, so a huge task still
+runs, alone.
+
+Each task works in its own directory and creates every file through
+Workspace.path. Leaving the context manager deletes the directory with all
+it holds, including partial files of a failed stage, and frees the booking.
+
+A task holds at most one booking. If the queue redelivers its message while
+an attempt is still running in this process, opening a second workspace
+raises WorkspaceBusy and leaves the running attempt's files alone; directory
+names also carry a random suffix, so two attempts never share one.
+"""
+import os
+import time
+import asyncio
+import logging
+import shutil
+import threading
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from metrics import WORKSPACE_RESERVED, WORKSPACE_WAIT
+from resilience import DependencyUnavailable
+
+logger = logging.getLogger(__name__)
+
+WORKSPACE_ROOT = os.environ.get("WORKSPACE_ROOT", "/tmp/tasks")
+WORKSPACE_LIMIT_BYTES = int(os.environ.get("WORKSPACE_LIMIT_BYTES", str(1024 * 1024 * 1024)))
+WORKSPACE_WAIT_SECONDS = float(os.environ.get("WORKSPACE_WAIT_SECONDS", "120"))
+# The largest video the worker accepts, assumed when the size is unknown
+DEFAULT_VIDEO_BYTES = 200 * 1024 * 1024
+# 16 kHz, 16-bit mono PCM
+AUDIO_BYTES_PER_SECOND = 16000 * 2
+POLL_SECONDS = 0.5
+
+
+class WorkspaceUnavailable(DependencyUnavailable):
+    """Not enough /tmp space was freed within WORKSPACE_WAIT_SECONDS."""
+
+
+class WorkspaceBusy(Exception):
+    """The task already has a workspace: another delivery of its message is running."""
+
+
+def estimate_bytes(video_bytes: Optional[int], duration_seconds: Optional[float]) -> int:
+    """Peak /tmp usage of a task: the video and two copies of its audio."""
+    video = video_bytes or DEFAULT_VIDEO_BYTES
+    audio = duration_seconds * AUDIO_BYTES_PER_SECOND if duration_seconds else video
+    return int(video + 2 * audio)
+
+
+class Workspace:
+    """Directory of one task and the files created in it."""
+
+    def __init__(self, task_id: str, directory: str, reserved_bytes: int):
+        self.task_id = task_id
+        self.directory = directory
+        self.reserved_bytes = reserved_bytes
+        self.artifacts: Dict[str, str] = {}
+
+    def path(self, name: str) -> str:
+        """Path of a file in the workspace, tracked for cleanup."""
+        path = os.path.join(self.directory, name)
+        self.artifacts[name] = path
+        return path
+
+    def remove(self, name: str) -> None:
+        """Delete an artifact early to free space for the next stage."""
+        path = self.artifacts.get(name)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def used_bytes(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, file_name))
+                except OSError:
+                    pass
+        return total
+
+    def cleanup(self) -> None:
+        used = self.used_bytes()
+        if used > self.reserved_bytes:
+            logger.warning(f"Workspace of task {self.task_id} holds {used} B, more than the {self.reserved_bytes} B booked")
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class WorkspaceManager:
+    """Books /tmp space for tasks against one limit and hands out their workspaces."""
+
+    def __init__(self, root: str = WORKSPACE_ROOT, limit_bytes: int = WORKSPACE_LIMIT_BYTES):
+        self.root = root
+        self.limit_bytes = limit_bytes
+        self.reserved: Dict[str, int] = {}
+        self.condition = threading.Condition()
+        # One manager per process: whatever is left under root belongs to attempts of an earlier one
+        shutil.rmtree(root, ignore_errors=True)
+
+    def reserved_bytes(self) -> int:
+        with self.condition:
+            return sum(self.reserved.values())
+
+    def try_reserve(self, task_id: str, size_bytes: int) -> bool:
+        size_bytes = min(size_bytes, self.limit_bytes)
+        with self.condition:
+            if task_id in self.reserved:
+                raise WorkspaceBusy(f"Task {task_id} is already being processed in this container")
+            if sum(self.reserved.values()) + size_bytes > self.limit_bytes:
+                return False
+            self.reserved[task_id] = size_bytes
+        WORKSPACE_RESERVED.inc(size_bytes)
+        return True
+
+    def reserve(self, task_id: str, size_bytes: int, timeout: float = WORKSPACE_WAIT_SECONDS) -> None:
+        """Book space for the task, waiting up to timeout for other tasks to release theirs."""
+        started = time.monotonic()
+        deadline = started + timeout
+        with self.condition:
+            while not self.try_reserve(task_id, size_bytes):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._refuse(task_id, size_bytes)
+                self.condition.wait(remaining)
+        WORKSPACE_WAIT.observe(time.monotonic() - started)
+
+    async def reserve_async(self, task_id: str, size_bytes: int, timeout: float = WORKSPACE_WAIT_SECONDS) -> None:
+        """reserve for the async runtime: checks again every POLL_SECONDS instead of blocking."""
+        started = time.monotonic()
+        while not self.try_reserve(task_id, size_bytes):
+            if time.monotonic() - started >= timeout:
+                self._refuse(task_id, size_bytes)
+            await asyncio.sleep(POLL_SECONDS)
+        WORKSPACE_WAIT.observe(time.monotonic() - started)
+
+    def release(self, task_id: str) -> None:
+        with self.condition:
+            size_bytes = self.reserved.pop(task_id, 0)
+            self.condition.notify_all()
+        WORKSPACE_RESERVED.dec(size_bytes)
+
+    def _refuse(self, task_id: str, size_bytes: int) -> None:
+        raise WorkspaceUnavailable(
+            f"No room in /tmp for task {task_id}: needs {size_bytes / 1e6:.0f} MB, "
+            f"{self.reserved_bytes() / 1e6:.0f} of {self.limit_bytes / 1e6:.0f} MB booked"
+        )
+
+    def _create(self, task_id: str) -> Workspace:
+        directory = os.path.join(self.root, f"{task_id}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(directory)
+        workspace = Workspace(task_id, directory, self.reserved.get(task_id, 0))
+        logger.info(f"Workspace for task {task_id}: {workspace.reserved_bytes / 1e6:.0f} MB booked in {directory}")
+        return workspace
+
+    def _close(self, workspace: Workspace) -> None:
+        try:
+            workspace.cleanup()
+        finally:
+            self.release(workspace.task_id)
+
+    @contextmanager
+    def open(self, task_id: str, size_bytes: int) -> Iterator[Workspace]:
+        """Book space, then yield the task's workspace; everything in it is deleted on exit."""
+        self.reserve(task_id, size_bytes)
+        try:
+            workspace = self._create(task_id)
+        except BaseException:
+            self.release(task_id)
+            raise
+        try:
+            yield workspace
+        finally:
+            self._close(workspace)
+
+    @asynccontextmanager
+    async def open_async(self, task_id: str, size_bytes: int) -> AsyncIterator[Workspace]:
+        await self.reserve_async(task_id, size_bytes)
+        try:
+            workspace = self._create(task_id)
+        except BaseException:
+            self.release(task_id)
+            raise
+        try:
+            yield workspace
+        finally:
+            self._close(workspace)
+
+
+_manager: Optional[WorkspaceManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_workspace_manager() -> WorkspaceManager:
+    """Process-wide manager: every task of the container books from the same limit."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = WorkspaceManager()
+    return _manager
@@ -1,10 +1,317 @@
 """YDB client module for task CRUD operations."""
 
 import os
+import time
+import logging
+import threading
 import ydb
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timezone
 
+logger = logging.getLogger(__name__)
+
+# Adds each delta to its task_counters row (a missing row counts as 0)
+UPSERT_COUNTERS = """
+    UPSERT INTO task_counters
+    SELECT d.period AS period, d.name AS name, COALESCE(c.value, 0) + d.delta AS value
+    FROM AS_TABLE($counters) AS d
+    LEFT JOIN task_counters AS c ON d.period = c.period AND d.name = c.name;
+"""
+
+
+# One statement for every status change; $error_message is NULL except for failures
+UPDATE_STATUS_QUERY = """
+    DECLARE $task_id AS Utf8;
+    DECLARE $status AS Utf8;
+    DECLARE $error_message AS Utf8?;
+    DECLARE $updated_at AS Utf8;
+    DECLARE $counters AS List<Struct<period: Utf8, name: Utf8, delta: Int64>>;
+    
+    UPDATE tasks
+    SET status = $status, error_message = COALESCE($error_message, error_message), updated_at = $updated_at
+    WHERE task_id = $task_id;
+""" + UPSERT_COUNTERS
+
+SELECT_STATUS_QUERY = """
+    DECLARE $task_id AS Utf8;
+    SELECT status FROM tasks WHERE task_id = $task_id;
+"""
+
+UPDATE_PROGRESS_QUERY = """
+    DECLARE $progress AS List<Struct<task_id: Utf8, progress: Utf8>>;
+    UPDATE tasks ON SELECT * FROM AS_TABLE($progress);
+"""
+
+GET_TASK_QUERY = """
+    DECLARE $task_id AS Utf8;
+    SELECT task_id, title, video_link, status, created_at, updated_at, error_message, pdf_key,
+           summary_key, summary_sha256, lane, upload_key, size_bytes, duration_seconds
+    FROM tasks
+    WHERE task_id = $task_id;
+"""
+
+SELECT_LANE_QUERY = """
+    DECLARE $task_id AS Utf8;
+    SELECT status, lane FROM tasks WHERE task_id = $task_id;
+"""
+
+# Through the secondary index create_task adds; oldest first
+LIST_WAITING_TASKS_QUERY = """
+    DECLARE $lane AS Utf8;
+    DECLARE $status AS Utf8;
+    DECLARE $created_before AS Utf8;
+    DECLARE $limit AS Uint64;
+    
+    SELECT task_id, created_at
+    FROM tasks VIEW idx_lane_status_created
+    WHERE lane = $lane AND status = $status AND created_at < $created_before
+    ORDER BY created_at
+    LIMIT $limit;
+"""
+
+MOVE_TASK_LANE_QUERY = """
+    DECLARE $task_id AS Utf8;
+    DECLARE $lane AS Utf8;
+    DECLARE $updated_at AS Utf8;
+    
+    UPDATE tasks
+    SET lane = $lane, updated_at = $updated_at
+    WHERE task_id = $task_id;
+"""
+
+COMPLETE_TASK_QUERY = """
+    DECLARE $task_id AS Utf8;
+    DECLARE $status AS Utf8;
+    DECLARE $summary_key AS Utf8;
+    DECLARE $summary_sha256 AS Utf8;
+    DECLARE $summary_model AS Utf8;
+    DECLARE $summary_input_tokens AS Uint64;
+    DECLARE $summary_output_tokens AS Uint64;
+    DECLARE $summary_latency_ms AS Double;
+    DECLARE $updated_at AS Utf8;
+    DECLARE $counters AS List<Struct<period: Utf8, name: Utf8, delta: Int64>>;
+    
+    UPDATE tasks
+    SET status = $status, summary_key = $summary_key, summary_sha256 = $summary_sha256,
+        summary_model = $summary_model, summary_input_tokens = $summary_input_tokens,
+        summary_output_tokens = $summary_output_tokens, summary_latency_ms = $summary_latency_ms,
+        updated_at = $updated_at
+    WHERE task_id = $task_id;
+""" + UPSERT_COUNTERS
+
+SAVE_STAGES_QUERY = """
+    DECLARE $task_id AS Utf8;
+    DECLARE $stage_timings AS Utf8;
+    DECLARE $stages AS List<Struct<
+        task_id: Utf8,
+        stage: Utf8,
+        started_at: Utf8,
+        status: Utf8,
+        wall_ms: Double,
+        cpu_ms: Double,
+        bytes_in: Uint64,
+        bytes_out: Uint64,
+        peak_rss_kb: Uint64,
+        children_peak_rss_kb: Uint64
+    >>;
+    DECLARE $counters AS List<Struct<period: Utf8, name: Utf8, delta: Int64>>;
+    
+    UPSERT INTO task_stages SELECT * FROM AS_TABLE($stages);
+    
+    UPDATE tasks
+    SET stage_timings = $stage_timings
+    WHERE task_id = $task_id;
+""" + UPSERT_COUNTERS
+
+SELECT_BUCKET_QUERY = """
+    DECLARE $bucket AS Utf8;
+    SELECT tokens, refreshed_at FROM rate_limits WHERE bucket = $bucket;
+"""
+
+LIST_SEARCH_SEGMENTS_QUERY = """
+    SELECT segment, level, docs FROM search_segments;
+"""
+
+UPSERT_SEARCH_SEGMENT_QUERY = """
+    DECLARE $segment AS Utf8;
+    DECLARE $level AS Uint32;
+    DECLARE $docs AS Uint32;
+    DECLARE $size_bytes AS Uint64;
+    DECLARE $created_at AS Utf8;
+    
+    UPSERT INTO search_segments (segment, level, docs, size_bytes, created_at)
+    VALUES ($segment, $level, $docs, $size_bytes, $created_at);
+"""
+
+DELETE_SEARCH_SEGMENT_QUERY = """
+    DECLARE $segment AS Utf8;
+    DELETE FROM search_segments WHERE segment = $segment;
+"""
+
+UPSERT_BUCKET_QUERY = """
+    DECLARE $bucket AS Utf8;
+    DECLARE $tokens AS Double;
+    DECLARE $refreshed_at AS Double;
+    
+    UPSERT INTO rate_limits (bucket, tokens, refreshed_at)
+    VALUES ($bucket, $tokens, $refreshed_at);
+"""
+
+# Progress updates (the stage a task is in) are coalesced for this long; 0 writes each one at once
+PROGRESS_FLUSH_SECONDS = float(os.environ.get("PROGRESS_FLUSH_SECONDS", "2"))
+
+
+def status_counter_deltas(old_status: Optional[str], new_status: str, at: str) -> List[Dict[str, Any]]:
+    """
+    task_counters changes for a status transition.
+    
+    The "current" period holds the number of tasks in each status; a
+    day period ("2026-01-31", UTC) counts transitions into each status.
+    
+    Args:
+        old_status: Status before the transition, None for a new task
+        new_status: Status after the transition
+        at: ISO timestamp of the transition
+        
+    Returns:
+        Rows for the $counters parameter of UPSERT_COUNTERS
+    """
+    if old_status == new_status:
+        return []
+    deltas = [
+        {"period": "current", "name": f"status:{new_status}", "delta": 1},
+        {"period": at[:10], "name": f"status:{new_status}", "delta": 1},
+    ]
+    if old_status:
+        deltas.append({"period": "current", "name": f"status:{old_status}", "delta": -1})
+    return deltas
+
+
+def task_from_row(row) -> Dict[str, Any]:
+    return {
+        "task_id": row.task_id,
+        "title": row.title,
+        "video_link": row.video_link,
+        "status": row.status,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "error_message": row.error_message if hasattr(row, 'error_message') else None,
+        "pdf_key": row.pdf_key if hasattr(row, 'pdf_key') else None,
+        "summary_key": row.summary_key if hasattr(row, 'summary_key') else None,
+        "summary_sha256": row.summary_sha256 if hasattr(row, 'summary_sha256') else None,
+        "lane": row.lane if hasattr(row, 'lane') else None,
+        "upload_key": row.upload_key if hasattr(row, 'upload_key') else None,
+        "size_bytes": row.size_bytes if hasattr(row, 'size_bytes') else None,
+        "duration_seconds": row.duration_seconds if hasattr(row, 'duration_seconds') else None
+    }
+
+
+def stage_counter_deltas(stage_rows: List[Dict[str, Any]], lane: Optional[str], day: str) -> List[Dict[str, Any]]:
+    """
+    task_counters changes for the stages of one finished task.
+    
+    Args:
+        stage_rows: Rows as produced by StageTimer.to_rows
+        lane: Lane the task was processed in, counted with the task's total time
+        day: Day period the runs are counted in ("2026-01-31", UTC)
+        
+    Returns:
+        Rows for the $counters parameter of UPSERT_COUNTERS
+    """
+    counters = []
+    for row in stage_rows:
+        counters.append({"period": day, "name": f"stage_runs:{row['stage']}", "delta": 1})
+        counters.append({"period": day, "name": f"stage_wall_ms:{row['stage']}", "delta": round(row["wall_ms"])})
+    if lane:
+        counters.append({"period": day, "name": f"task_runs:{lane}", "delta": 1})
+        counters.append({"period": day, "name": f"task_wall_ms:{lane}", "delta": round(sum(row["wall_ms"] for row in stage_rows))})
+    return counters
+
+
+def reserve_from_bucket(rows, now: float, rate: float, capacity: float) -> Tuple[float, float]:
+    """
+    Take one token from a bucket row read by SELECT_BUCKET_QUERY.
+    
+    Args:
+        rows: Rows of the bucket, empty for a new (full) bucket
+        now: Current UNIX time
+        rate: Tokens added per second
+        capacity: Bucket size (burst)
+        
+    Returns:
+        Tokens left (negative while callers queue up) and seconds to wait
+    """
+    if rows:
+        elapsed = max(0.0, now - rows[0].refreshed_at)
+        tokens = min(capacity, rows[0].tokens + elapsed * rate)
+    else:
+        tokens = capacity
+    tokens -= 1
+    return tokens, max(0.0, -tokens / rate)
+
+
+class ProgressBuffer:
+    """
+    Write-behind buffer for task progress.
+    
+    Keeps the latest stage per task and writes the batch from a background
+    thread every flush_seconds, so a stage change costs no round trip on the
+    task's thread. Status changes stay synchronous and discard the pending
+    progress of their task. With flush_seconds 0 every update is written at once.
+    """
+    
+    def __init__(self, pool, flush_seconds: float):
+        self.pool = pool
+        self.flush_seconds = flush_seconds
+        self.pending: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.closed = False
+        self.thread: Optional[threading.Thread] = None
+    
+    def put(self, task_id: str, stage: str) -> None:
+        if self.flush_seconds <= 0:
+            self._write({task_id: stage})
+            return
+        with self.lock:
+            self.pending[task_id] = stage
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="ydb-progress", daemon=True)
+                self.thread.start()
+    
+    def discard(self, task_id: str) -> None:
+        with self.lock:
+            self.pending.pop(task_id, None)
+    
+    def flush(self) -> None:
+        with self.lock:
+            batch, self.pending = self.pending, {}
+        if batch:
+            self._write(batch)
+    
+    def close(self) -> None:
+        self.closed = True
+        self.wakeup.set()
+        self.flush()
+    
+    def _run(self) -> None:
+        while not self.closed:
+            self.wakeup.wait(self.flush_seconds)
+            self.flush()
+    
+    def _write(self, batch: Dict[str, str]) -> None:
+        def callee(session):
+            session.transaction(ydb.SerializableReadWrite()).execute(
+                session.prepare(UPDATE_PROGRESS_QUERY),
+                {"$progress": [{"task_id": task_id, "progress": stage} for task_id, stage in batch.items()]},
+                commit_tx=True
+            )
+        
+        try:
+            self.pool.retry_operation_sync(callee)
+        except Exception as e:
+            logger.warning(f"Could not write progress of {len(batch)} tasks: {str(e)}")
+
 
 class YDBClient:
     """Client for interacting with YDB database."""
@@ -18,15 +325,19 @@ class YDBClient:
             raise ValueError("YDB_ENDPOINT and YDB_DATABASE environment variables must be set")
         
         # Use MetadataUrlCredentials for service account authentication
+        # Sessions keep prepared queries by text; with the client query cache they are
+        # executed by server-side query ID instead of resending and recompiling the text
         self.driver_config = ydb.DriverConfig(
             endpoint=self.endpoint,
             database=self.database,
-            credentials=ydb.iam.MetadataUrlCredentials()
+            credentials=ydb.iam.MetadataUrlCredentials(),
+            table_client_settings=ydb.TableClientSettings().with_client_query_cache(True)
         )
         
         self.driver = ydb.Driver(self.driver_config)
         self.driver.wait(timeout=5, fail_fast=True)
         self.pool = ydb.SessionPool(self.driver)
+        self.progress = ProgressBuffer(self.pool, PROGRESS_FLUSH_SECONDS)
     
     def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -39,30 +350,14 @@ class YDBClient:
             Task dictionary or None if not found
         """
         def callee(session):
-            query = """
-                DECLARE $task_id AS Utf8;
-                SELECT task_id, title, video_link, status, created_at, updated_at, error_message, pdf_key
-                FROM tasks
-                WHERE task_id = $task_id;
-            """
-            prepared_query = session.prepare(query)
             result_sets = session.transaction().execute(
-                prepared_query,
+                session.prepare(GET_TASK_QUERY),
                 {"$task_id": task_id},
                 commit_tx=True
             )
             
             for row in result_sets[0].rows:
-                return {
-                    "task_id": row.task_id,
-                    "title": row.title,
-                    "video_link": row.video_link,
-                    "status": row.status,
-                    "created_at": row.created_at,
-                    "updated_at": row.updated_at,
-                    "error_message": row.error_message if hasattr(row, 'error_message') else None,
-                    "pdf_key": row.pdf_key if hasattr(row, 'pdf_key') else None
-                }
+                return task_from_row(row)
             return None
         
         return self.pool.retry_operation_sync(callee)
@@ -71,95 +366,434 @@ class YDBClient:
         """
         Update task status in YDB.
         
+        The status counters change in the same transaction as the task.
+        Written synchronously; a pending progress update of the task is dropped.
+        
         Args:
             task_id: Task UUID
             status: New status (queued, processing, completed, error)
             error_message: Optional error message for error status
         """
+        self.progress.discard(task_id)
+        
         def callee(session):
             updated_at = datetime.now(timezone.utc).isoformat()
-            
-            if error_message:
-                query = """
-                    DECLARE $task_id AS Utf8;
-                    DECLARE $status AS Utf8;
-                    DECLARE $error_message AS Utf8;
-                    DECLARE $updated_at AS Utf8;
-                    
-                    UPDATE tasks
-                    SET status = $status, error_message = $error_message, updated_at = $updated_at
-                    WHERE task_id = $task_id;
-                """
-                prepared_query = session.prepare(query)
-                session.transaction().execute(
-                    prepared_query,
-                    {
-                        "$task_id": task_id,
-                        "$status": status,
-                        "$error_message": error_message,
-                        "$updated_at": updated_at
-                    },
-                    commit_tx=True
-                )
-            else:
-                query = """
-                    DECLARE $task_id AS Utf8;
-                    DECLARE $status AS Utf8;
-                    DECLARE $updated_at AS Utf8;
-                    
-                    UPDATE tasks
-                    SET status = $status, updated_at = $updated_at
-                    WHERE task_id = $task_id;
-                """
-                prepared_query = session.prepare(query)
-                session.transaction().execute(
-                    prepared_query,
-                    {
-                        "$task_id": task_id,
-                        "$status": status,
-                        "$updated_at": updated_at
-                    },
-                    commit_tx=True
-                )
+            tx = session.transaction(ydb.SerializableReadWrite())
+            rows = tx.execute(session.prepare(SELECT_STATUS_QUERY), {"$task_id": task_id})[0].rows
+            if not rows:
+                tx.commit()
+                return
+            tx.execute(
+                session.prepare(UPDATE_STATUS_QUERY),
+                {
+                    "$task_id": task_id,
+                    "$status": status,
+                    "$error_message": error_message or None,
+                    "$updated_at": updated_at,
+                    "$counters": status_counter_deltas(rows[0].status, status, updated_at)
+                },
+                commit_tx=True
+            )
         
         self.pool.retry_operation_sync(callee)
     
-    def update_task_complete(self, task_id: str, pdf_key: str) -> None:
+    def report_progress(self, task_id: str, stage: str) -> None:
+        """
+        Record the stage a task has entered, shown while it is processing.
+        
+        Buffered: the latest stage of each task is written within
+        PROGRESS_FLUSH_SECONDS, for all tasks in one statement, off the
+        pipeline's critical path. A lost update only delays the display.
+        
+        Args:
+            task_id: Task UUID
+            stage: Stage name
+        """
+        self.progress.put(task_id, stage)
+    
+    def claim_task(self, task_id: str, lane: Optional[str] = None) -> bool:
+        """
+        Mark task as processing unless it was promoted away from the message's lane.
+        
+        The check and the update run in one serializable transaction, so a
+        concurrent promotion either happens before (and the claim fails) or
+        sees the task as processing (and is skipped).
+        
+        Args:
+            task_id: Task UUID
+            lane: Lane of the queue message; None for messages without one
+            
+        Returns:
+            True if the task was claimed
+        """
+        def callee(session):
+            tx = session.transaction(ydb.SerializableReadWrite())
+            rows = tx.execute(session.prepare(SELECT_LANE_QUERY), {"$task_id": task_id})[0].rows
+            if not rows or (lane == "long" and rows[0].lane == "short"):
+                tx.commit()
+                return False
+            
+            updated_at = datetime.now(timezone.utc).isoformat()
+            tx.execute(
+                session.prepare(UPDATE_STATUS_QUERY),
+                {
+                    "$task_id": task_id,
+                    "$status": "processing",
+                    "$error_message": None,
+                    "$updated_at": updated_at,
+                    "$counters": status_counter_deltas(rows[0].status, "processing", updated_at)
+                },
+                commit_tx=True
+            )
+            return True
+        
+        return self.pool.retry_operation_sync(callee)
+    
+    def list_waiting_tasks(self, lane: str, created_before: str, limit: int, status: str = "queued") -> List[str]:
         """
-        Update task as completed with PDF key.
+        List tasks of a lane in a status created before a timestamp, oldest first.
+        
+        Reads the idx_lane_status_created secondary index (created by
+        create_task) in a stale read-only transaction: the index is
+        asynchronous and may lag a little, which is fine since
+        move_task_lane and expire_upload re-check each task.
+        
+        Args:
+            lane: Lane name (short, long)
+            created_before: ISO timestamp
+            limit: Maximum number of task IDs
+            status: Task status, queued by default
+            
+        Returns:
+            Task IDs
+        """
+        def callee(session):
+            result_sets = session.transaction(ydb.StaleReadOnly()).execute(
+                session.prepare(LIST_WAITING_TASKS_QUERY),
+                {
+                    "$lane": lane,
+                    "$status": status,
+                    "$created_before": created_before,
+                    "$limit": limit
+                },
+                commit_tx=True
+            )
+            return [row.task_id for row in result_sets[0].rows]
+        
+        return self.pool.retry_operation_sync(callee)
+    
+    def expire_upload(self, task_id: str, error_message: str) -> bool:
+        """
+        Fail a task whose direct upload was never completed.
+        
+        The status counters change in the same transaction, so the task
+        stops counting as uploading.
         
         Args:
             task_id: Task UUID
-            pdf_key: S3 key for the generated PDF
+            error_message: Error shown for the task
+            
+        Returns:
+            True if the task was still uploading and is now an error
         """
         def callee(session):
+            tx = session.transaction(ydb.SerializableReadWrite())
+            rows = tx.execute(session.prepare(SELECT_STATUS_QUERY), {"$task_id": task_id})[0].rows
+            if not rows or rows[0].status != "uploading":
+                tx.commit()
+                return False
+            
             updated_at = datetime.now(timezone.utc).isoformat()
+            tx.execute(
+                session.prepare(UPDATE_STATUS_QUERY),
+                {
+                    "$task_id": task_id,
+                    "$status": "error",
+                    "$error_message": error_message,
+                    "$updated_at": updated_at,
+                    "$counters": status_counter_deltas("uploading", "error", updated_at)
+                },
+                commit_tx=True
+            )
+            return True
+        
+        return self.pool.retry_operation_sync(callee)
+    
+    def move_task_lane(self, task_id: str, from_lane: str, to_lane: str) -> bool:
+        """
+        Move a still-queued task from one lane to another.
+        
+        Args:
+            task_id: Task UUID
+            from_lane: Lane the task must currently be in
+            to_lane: New lane
+            
+        Returns:
+            True if the task was queued in from_lane and has been moved
+        """
+        def callee(session):
+            tx = session.transaction(ydb.SerializableReadWrite())
+            rows = tx.execute(session.prepare(SELECT_LANE_QUERY), {"$task_id": task_id})[0].rows
+            if not rows or rows[0].status != "queued" or rows[0].lane != from_lane:
+                tx.commit()
+                return False
             
-            query = """
-                DECLARE $task_id AS Utf8;
-                DECLARE $status AS Utf8;
-                DECLARE $pdf_key AS Utf8;
-                DECLARE $updated_at AS Utf8;
-                
-                UPDATE tasks
-                SET status = $status, pdf_key = $pdf_key, updated_at = $updated_at
-                WHERE task_id = $task_id;
-            """
-            prepared_query = session.prepare(query)
-            session.transaction().execute(
-                prepared_query,
+            tx.execute(
+                session.prepare(MOVE_TASK_LANE_QUERY),
+                {
+                    "$task_id": task_id,
+                    "$lane": to_lane,
+                    "$updated_at": datetime.now(timezone.utc).isoformat()
+                },
+                commit_tx=True
+            )
+            return True
+        
+        return self.pool.retry_operation_sync(callee)
+    
+    def update_task_complete(
+        self,
+        task_id: str,
+        summary_key: str,
+        summary_sha256: str,
+        summary_model: str,
+        summary_input_tokens: int,
+        summary_output_tokens: int,
+        summary_latency_ms: float
+    ) -> None:
+        """
+        Update task as completed with its summary artifact.
+        
+        Args:
+            task_id: Task UUID
+            summary_key: S3 key of the summary Markdown
+            summary_sha256: SHA-256 of the summary, used to version rendered PDFs
+            summary_model: YandexGPT model that wrote the summary
+            summary_input_tokens: Prompt tokens billed for the summary
+            summary_output_tokens: Completion tokens billed for the summary
+            summary_latency_ms: Summary request latency, including retries
+        """
+        self.progress.discard(task_id)
+        
+        def callee(session):
+            updated_at = datetime.now(timezone.utc).isoformat()
+            tx = session.transaction(ydb.SerializableReadWrite())
+            rows = tx.execute(session.prepare(SELECT_STATUS_QUERY), {"$task_id": task_id})[0].rows
+            old_status = rows[0].status if rows else None
+            tx.execute(
+                session.prepare(COMPLETE_TASK_QUERY),
                 {
                     "$task_id": task_id,
                     "$status": "completed",
-                    "$pdf_key": pdf_key,
-                    "$updated_at": updated_at
+                    "$summary_key": summary_key,
+                    "$summary_sha256": summary_sha256,
+                    "$summary_model": summary_model,
+                    "$summary_input_tokens": summary_input_tokens,
+                    "$summary_output_tokens": summary_output_tokens,
+                    "$summary_latency_ms": summary_latency_ms,
+                    "$updated_at": updated_at,
+                    "$counters": status_counter_deltas(old_status, "completed", updated_at) if rows else []
                 },
                 commit_tx=True
             )
         
         self.pool.retry_operation_sync(callee)
     
+    def save_task_stages(
+        self,
+        task_id: str,
+        stage_rows: List[Dict[str, Any]],
+        stage_timings_json: str,
+        lane: Optional[str] = None
+    ) -> None:
+        """
+        Persist per-stage measurements of a task.
+        
+        Rows go to the task_stages table for analytics; the compact JSON copy
+        is stored on the task so list_tasks can return it without extra queries.
+        Runs and wall time per stage are added to the day's task_counters,
+        from which /api/stats computes average stage durations. With a lane,
+        the task's total time is counted per lane as well; create_task uses
+        it to estimate queue wait.
+        
+        Args:
+            task_id: Task UUID
+            stage_rows: Rows as produced by StageTimer.to_rows
+            stage_timings_json: JSON array as produced by StageTimer.to_json
+            lane: Lane the task was processed in
+        """
+        counters = stage_counter_deltas(stage_rows, lane, datetime.now(timezone.utc).date().isoformat())
+        
+        def callee(session):
+            session.transaction(ydb.SerializableReadWrite()).execute(
+                session.prepare(SAVE_STAGES_QUERY),
+                {
+                    "$task_id": task_id,
+                    "$stage_timings": stage_timings_json,
+                    "$stages": stage_rows,
+                    "$counters": counters
+                },
+                commit_tx=True
+            )
+        
+        self.pool.retry_operation_sync(callee)
+    
+    def add_search_segment(self, segment: str, level: int, docs: int, size_bytes: int) -> None:
+        """
+        Register an uploaded search index segment.
+        
+        Args:
+            segment: Segment name (its object is search/segments/{segment}.seg)
+            level: Merge level, 0 for a single task
+            docs: Number of documents in the segment
+            size_bytes: Size of the segment object
+        """
+        def callee(session):
+            session.transaction(ydb.SerializableReadWrite()).execute(
+                session.prepare(UPSERT_SEARCH_SEGMENT_QUERY),
+                {
+                    "$segment": segment,
+                    "$level": level,
+                    "$docs": docs,
+                    "$size_bytes": size_bytes,
+                    "$created_at": datetime.now(timezone.utc).isoformat()
+                },
+                commit_tx=True
+            )
+        
+        self.pool.retry_operation_sync(callee)
+    
+    def list_search_segments(self) -> List[Dict[str, Any]]:
+        """
+        List the live search index segments, oldest first.
+        
+        Merging keeps the table small (under SEARCH_MERGE_FACTOR rows per level),
+        so it is read whole.
+        
+        Returns:
+            Segment dictionaries with segment, level and docs
+        """
+        def callee(session):
+            result_sets = session.transaction(ydb.OnlineReadOnly()).execute(
+                session.prepare(LIST_SEARCH_SEGMENTS_QUERY), {}, commit_tx=True
+            )
+            return [
+                {"segment": row.segment, "level": row.level, "docs": row.docs}
+                for row in result_sets[0].rows
+            ]
+        
+        return sorted(self.pool.retry_operation_sync(callee), key=lambda row: row["segment"])
+    
+    def replace_search_segments(self, merged: List[str], segment: str, level: int, docs: int, size_bytes: int) -> bool:
+        """
+        Swap merged search segments for the segment that contains them.
+        
+        Runs in one serializable transaction, so two workers merging the same
+        segments cannot both succeed.
+        
+        Args:
+            merged: Names of the segments that were merged
+            segment: Name of the merged segment
+            level: Merge level of the merged segment
+            docs: Number of documents in the merged segment
+            size_bytes: Size of the merged segment object
+        
+        Returns:
+            False if some of the merged segments were already replaced
+        """
+        def callee(session):
+            tx = session.transaction(ydb.SerializableReadWrite())
+            live = {row.segment for row in tx.execute(session.prepare(LIST_SEARCH_SEGMENTS_QUERY), {})[0].rows}
+            if not live.issuperset(merged):
+                tx.commit()
+                return False
+            
+            delete_query = session.prepare(DELETE_SEARCH_SEGMENT_QUERY)
+            for name in merged:
+                tx.execute(delete_query, {"$segment": name})
+            
+            tx.execute(
+                session.prepare(UPSERT_SEARCH_SEGMENT_QUERY),
+                {
+                    "$segment": segment,
+                    "$level": level,
+                    "$docs": docs,
+                    "$size_bytes": size_bytes,
+                    "$created_at": datetime.now(timezone.utc).isoformat()
+                },
+                commit_tx=True
+            )
+            return True
+        
+        return self.pool.retry_operation_sync(callee)
+    
+    def reserve_token(self, bucket: str, rate: float, capacity: float, max_wait: float) -> Optional[float]:
+        """
+        Reserve one token from a shared token bucket.
+        
+        The bucket may go negative: each caller takes a token immediately and
+        waits until it would have been refilled, so concurrent callers queue
+        up at exactly `rate` instead of polling. Read and write happen in one
+        serializable transaction; concurrent reservations conflict and the
+        SDK retries them.
+        
+        Args:
+            bucket: Bucket name, e.g. "stt:<folder_id>"
+            rate: Tokens added per second
+            capacity: Bucket size (burst)
+            max_wait: Longest wait a reservation may take, seconds
+            
+        Returns:
+            Seconds to wait before using the token, or None if that would
+            exceed max_wait (nothing is reserved then)
+        """
+        def callee(session):
+            tx = session.transaction(ydb.SerializableReadWrite())
+            rows = tx.execute(session.prepare(SELECT_BUCKET_QUERY), {"$bucket": bucket})[0].rows
+            
+            now = time.time()
+            tokens, wait = reserve_from_bucket(rows, now, rate, capacity)
+            if wait > max_wait:
+                tx.commit()
+                return None
+            
+            tx.execute(
+                session.prepare(UPSERT_BUCKET_QUERY),
+                {
+                    "$bucket": bucket,
+                    "$tokens": tokens,
+                    "$refreshed_at": now
+                },
+                commit_tx=True
+            )
+            return wait
+        
+        return self.pool.retry_operation_sync(callee)
+    
     def close(self) -> None:
-        """Close YDB connection."""
+        """Flush buffered progress and close YDB connection."""
+        self.progress.close()
         if self.driver:
             self.driver.stop()
+
+
+_shared_client: Optional[YDBClient] = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client() -> YDBClient:
+    """
+    Process-wide client, connected on first use and never closed.
+    
+    Driver discovery takes a network round trip, so tasks and requests share
+    one driver and session pool instead of connecting each time.
+    
+    Returns:
+        Shared YDBClient
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = YDBClient()
+    return _shared_client